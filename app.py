@@ -1,20 +1,93 @@
 import streamlit as st
-import re
-import json
 import math
+import queue
+import threading
+import uuid
+from contextvars import copy_context
 from datetime import date
-from trip_graph.langgraph_flow import create_trip_graph
-from langsmith.run_helpers import traceable
-
+from trip_graph.langgraph_flow import create_trip_graph, plan_prefetcher, warm_up
+from trip_graph.result_store import result_store
+from config import PLAN_PREFETCH
+from modules.rate_limiter import request_priority, INTERACTIVE, REGENERATION
+from modules.metrics import start_metrics_server
+from modules.tracing import traceable
+from modules.travel_records import FlightTable, HotelTable
+
+
+# Prometheus/JSON metrics endpoint; Streamlit reruns this script, but it only starts once
+start_metrics_server()
+# Build the graph and clients in the background while the first page renders
+warm_up()
+# Moves idle session results to disk even when nobody is using the app
+result_store.start_sweeper()
+
+# Labels of the sort options -> FlightTable / HotelTable sort names
+FLIGHT_SORTS = {"Best": "best", "Cheapest": "cheapest", "Fastest": "fastest", "Fewest stops": "fewest_stops"}
+HOTEL_SORTS = {"Recommended": "recommended", "Cheapest": "cheapest", "Best rated": "best_rated"}
+FLIGHTS_TO_SHOW = 5
 
 @traceable(name="Trip Planner Streamlit Run", tags=["frontend", "streamlit"])
 def generate_trip(
-    source, destination, start_date, num_days, trip_type, budget, travellers
+    source, destination, start_date, num_days, trip_type, budget, travellers, itinerary_listener=None,
+    thread_id=None,
 ):
     return create_trip_graph(
-        source, destination, start_date, num_days, trip_type, budget, travellers
+        source, destination, start_date, num_days, trip_type, budget, travellers,
+        itinerary_listener=itinerary_listener, thread_id=thread_id,
     )
 
+def generate_trip_streaming(**trip_params):
+    """
+    Runs the trip graph in a worker thread and renders itinerary days in a preview area
+    as the planner streams them, instead of waiting for the whole graph to return.
+    """
+    days = queue.Queue()
+    outcome = {}
+
+    def _worker():
+        try:
+            outcome["result"] = generate_trip(
+                **trip_params, itinerary_listener=lambda day_key, day: days.put((day_key, day))
+            )
+        except Exception as e:
+            outcome["error"] = e
+
+    # The worker inherits the caller's context, and with it the rate-limit priority of this request
+    worker = threading.Thread(target=copy_context().run, args=(_worker,), daemon=True)
+    worker.start()
+
+    # Streamlit calls must stay on the script thread, so the worker only queues days
+    placeholder = st.empty()
+    preview = placeholder.container()
+    started_preview = False
+    while worker.is_alive() or not days.empty():
+        try:
+            day_key, day = days.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        with preview:
+            if not started_preview:
+                st.subheader("🧭 Your itinerary is on its way...")
+                display_itinerary_styles()
+                started_preview = True
+            display_itinerary_day(day_key, day)
+    placeholder.empty()
+
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+def prefetch_alternates(result):
+    """Starts planning every suggested alternate in the background, so its button is (nearly) instant."""
+    if not PLAN_PREFETCH:
+        return
+    suggestions = (result.get("alternate_suggestions") or {}).get("alternate_suggestions", [])
+    base_params = {
+        name: result.get(name)
+        for name in ("source", "start_date", "num_days", "trip_type", "budget", "travellers")
+    }
+    plan_prefetcher.prefetch(base_params, [item["place"] for item in suggestions if item.get("place")])
+
 def add_space(num_spaces=1):
     """Adds vertical space to the app."""
     for _ in range(num_spaces):
@@ -22,55 +95,40 @@ def add_space(num_spaces=1):
 
 def display_flight_card(flights):
     for idx, flight in enumerate(flights):
-        print(flight)
         with st.container(border=True):
 
-            total_duration = flight.get("total_duration", "duration")
-            price = flight.get("price", "N/A")
-            airline_logo = flight.get("airline_logo")
-            carbon_info = flight.get("carbon_emissions", {})
-            this_flight = carbon_info.get("this_flight")
-            typical = carbon_info.get("typical_for_this_route")
-            diff = carbon_info.get("difference_percent", 0)
-            layovers = flight.get("layovers", [])
-            flight_legs = flight.get("flights", [])
+            layovers = flight.layovers
+            flight_legs = flight.legs
 
 
             # --- Each Flight Leg ---
             for i, leg in enumerate(flight_legs):
-                dep = leg.get("departure_airport", {})
-                arr = leg.get("arrival_airport", {})
-                airline = leg.get("airline", "N/A")
-                travel_class = leg.get("travel_class", "N/A")
-                flight_number = leg.get("flight_number", "N/A")
-                airplane = leg.get("airplane", "N/A")
-                duration = leg.get("duration", "N/A")
-                legroom = leg.get("legroom", "")
-                logo = leg.get("airline_logo", airline_logo)
+                dep = leg.departure
+                arr = leg.arrival
 
                 cols = st.columns([1.5, 3, 2])
                 with cols[0]:
-                    if logo:
-                        st.image(logo, width=60)
-                    st.markdown(f"**{airline}**  \n{travel_class}")
+                    if leg.airline_logo:
+                        st.image(leg.airline_logo, width=60)
+                    st.markdown(f"**{leg.airline or 'N/A'}**  \n{leg.travel_class or 'N/A'}")
                 with cols[1]:
                     st.markdown(
-                        f"🕓 **{dep.get('time', '')}** — {arr.get('time', '')}  \n"
-                        f"📍 **{dep.get('id', '')} → {arr.get('id', '')}**"
+                        f"🕓 **{dep.time}** — {arr.time}  \n"
+                        f"📍 **{dep.id} → {arr.id}**"
                     )
                 with cols[2]:
                     st.markdown(
-                        f"⏱️ {duration} min  \n"
-                        f"✈️ {airplane} ({flight_number})"
+                        f"⏱️ {leg.duration} min  \n"
+                        f"✈️ {leg.airplane or 'N/A'} ({leg.flight_number or 'N/A'})"
                     )
-                    if legroom:
-                        st.caption(legroom)
+                    if leg.legroom:
+                        st.caption(leg.legroom)
 
                 # --- Layover After Each Leg (if applicable) ---
                 if i < len(layovers):
                     lay = layovers[i]
-                    lay_text = f"🕒 Layover: {lay['duration']} min at {lay['name']} ({lay['id']})"
-                    if lay.get("overnight"):
+                    lay_text = f"🕒 Layover: {lay.duration} min at {lay.name} ({lay.id})"
+                    if lay.overnight:
                         lay_text += " 🌙 (Overnight)"
                     st.info(lay_text)
 
@@ -122,22 +180,22 @@ def display_flight_options(flights):
     """, unsafe_allow_html=True)
 
     for flight in flights:
-        price = flight.get("price")
-        flight_legs = flight.get("flights", [])
-        layovers = flight.get("layovers", [])
+        price = flight.price
+        flight_legs = flight.legs
+        layovers = flight.layovers
         if not flight_legs:
             continue
 
-        main_logo = flight_legs[0].get("airline_logo", "")
+        main_logo = flight_legs[0].airline_logo
 
         # --- FIX: Build Timeline and Details HTML separately ---
         timeline_html = ""
         details_html = ""
 
         for i, leg in enumerate(flight_legs):
-            dep = leg.get("departure_airport", {})
-            arr = leg.get("arrival_airport", {})
-            duration_min = leg.get("duration", 0)
+            dep = leg.departure
+            arr = leg.arrival
+            duration_min = leg.duration
             travel_time = f"{math.floor(duration_min / 60)} hr {duration_min % 60} min"
             
             # 1. Build the timeline part for this leg
@@ -146,18 +204,18 @@ def display_flight_options(flights):
             # 2. Build the details part for this leg
             details_html += f"""
                 <div class="leg-block">
-                    <div class="airport-info"><span class="time">{dep.get('time', '')}</span><span>{dep.get('name', '')} ({dep.get('id', '')})</span></div>
+                    <div class="airport-info"><span class="time">{dep.time}</span><span>{dep.name} ({dep.id})</span></div>
                     <div class="travel-time-info">Travel time: {travel_time}</div>
-                    <div class="airport-info"><span class="time">{arr.get('time', '')}</span><span>{arr.get('name', '')} ({arr.get('id', '')})</span></div>
+                    <div class="airport-info"><span class="time">{arr.time}</span><span>{arr.name} ({arr.id})</span></div>
                 </div>
             """
 
             # 3. Add layover info to both timeline and details if it exists
             if i < len(layovers):
                 lay = layovers[i]
-                lay_duration_min = lay.get('duration', 0)
+                lay_duration_min = lay.duration
                 layover_time = f"{math.floor(lay_duration_min / 60)} hr {lay_duration_min % 60} min"
-                layover_text = f"🕒 {layover_time} layover in {lay.get('name', '')}"
+                layover_text = f"🕒 {layover_time} layover in {lay.name}"
                 
                 timeline_html += '<div class="timeline-layover-space"></div>'
                 details_html += f'<div class="layover-details">{layover_text}</div>'
@@ -170,7 +228,7 @@ def display_flight_options(flights):
         <div class="flight-card-container">
             <div class="flight-header">
                 <div class="header-left"><img src="{main_logo}" width="30" class="airline-logo-bg"><span>Departure</span></div>
-                <div>{leg.get("airline", "N/A")} · {leg.get("travel_class", "N/A")} · {leg.get("airplane", "N/A")} · {leg.get("flight_number", "N/A")}</div>
+                <div>{leg.airline or "N/A"} · {leg.travel_class or "N/A"} · {leg.airplane or "N/A"} · {leg.flight_number or "N/A"}</div>
                 <div class="flight-price">₹{price if price else 'N/A'}</div>
             </div>
             <div class="flight-body">
@@ -182,13 +240,12 @@ def display_flight_options(flights):
 
 def display_hotel_card(hotel):
     """Displays a single hotel in a styled card."""
-    name = hotel.get("name", "Unnamed Hotel")
-    images = hotel.get("images", [])
-    hotel_img = images[0].get("thumbnail") if images else "https://upload.wikimedia.org/wikipedia/commons/a/ac/No_image_available.svg"
-    total_rate = hotel.get("total_rate", {}).get("lowest", "N/A")
-    rating = hotel.get("overall_rating", "N/A")
-    link = hotel.get("link", "#")
-    amenities = ''.join([f'<span style="border:1px solid #ddd; border-radius:8px; padding:3px 8px; font-size:0.8rem;">{a}</span>' for a in hotel.get("amenities", [])[:5]])
+    name = hotel.name
+    hotel_img = hotel.thumbnail or "https://upload.wikimedia.org/wikipedia/commons/a/ac/No_image_available.svg"
+    total_rate = hotel.rate or "N/A"
+    rating = hotel.rating if hotel.rating is not None else "N/A"
+    link = hotel.link or "#"
+    amenities = ''.join([f'<span style="border:1px solid #ddd; border-radius:8px; padding:3px 8px; font-size:0.8rem;">{a}</span>' for a in hotel.amenities[:5]])
     
     st.markdown(f"""
         <a href="{link}" target="_blank" style="text-decoration: none; color: inherit;">
@@ -203,30 +260,7 @@ def display_hotel_card(hotel):
         </a>
     """, unsafe_allow_html=True)
 
-def parse_llm_json_response(response_text):
-    """Extracts and parses a JSON object from a string."""
-    if isinstance(response_text, (dict, list)):
-        return response_text
-    
-    # If it's not a string, we can't parse it
-    if not isinstance(response_text, str):
-        print(f"Warning: Cannot parse data of type {type(response_text)}")
-        return None
-    
-    match = re.search(r"\{[\s\S]*\}", response_text)
-    if match:
-        # print(match)
-        try:
-            return json.loads(match.group(0))
-        except json.JSONDecodeError:
-            # st.error("Failed to parse JSON from the model's response.")
-            # return {}
-            return None
-    # st.error("No JSON object found in the model's response.")
-    # return {}
-    return None
-
-def display_itinerary(itinerary_data):    
+def display_itinerary_styles():
     card_style = """
     <style>
     .itinerary-card { background-color: #2F2F2F; border-radius: 18px; box-shadow: 0 4px 15px rgba(0,0,0,0.1); padding: 10px; margin-bottom: 25px; }
@@ -237,21 +271,28 @@ def display_itinerary(itinerary_data):
     """
     st.markdown(card_style, unsafe_allow_html=True)
 
+def display_itinerary_day(day_key, day_content):
+    """Renders one day of the itinerary; used both for the final plan and while streaming."""
     icons = {"Morning": "🌅", "Lunch": "🍽️", "Afternoon": "🌇", "Evening": "🌃"}
 
+    day_number = day_key.replace("day", "")
+    day_number = day_number.replace("Day", "")
+    st.markdown(f'<div class="itinerary-card"><div class="itinerary-header"><h3>🗓️ Day {day_number}</h3></div></div>', unsafe_allow_html=True)
+    
+    with st.expander("View Daily Plan", expanded=True):
+        cols = st.columns(4)
+        day_parts = ['Morning', 'Lunch', 'Afternoon', 'Evening']
+        for i, part in enumerate(day_parts):
+            with cols[i]:
+                st.markdown(f'<p class="day-part-title">{icons[part]} {part.capitalize()}</p>', unsafe_allow_html=True)
+                st.markdown(f'<p class="day-part-content">{day_content.get(part, "No plan available.")}</p>', unsafe_allow_html=True)
+    add_space()
+
+def display_itinerary(itinerary_data):    
+    display_itinerary_styles()
+
     for day_key, day_content in itinerary_data.items():
-        day_number = day_key.replace("day", "")
-        day_number = day_number.replace("Day", "")
-        st.markdown(f'<div class="itinerary-card"><div class="itinerary-header"><h3>🗓️ Day {day_number}</h3></div></div>', unsafe_allow_html=True)
-        
-        with st.expander("View Daily Plan", expanded=True):
-            cols = st.columns(4)
-            day_parts = ['Morning', 'Lunch', 'Afternoon', 'Evening']
-            for i, part in enumerate(day_parts):
-                with cols[i]:
-                    st.markdown(f'<p class="day-part-title">{icons[part]} {part.capitalize()}</p>', unsafe_allow_html=True)
-                    st.markdown(f'<p class="day-part-content">{day_content.get(part, "No plan available.")}</p>', unsafe_allow_html=True)
-        add_space()
+        display_itinerary_day(day_key, day_content)
 
 def display_trip_summary(summary_data):
     st.markdown("## 🧳 Trip Summary Overview")
@@ -356,21 +397,41 @@ with st.form("trip_form"):
     submitted = st.form_submit_button("🚀 Plan My Trip")
 
 if submitted or st.session_state.get("rerun_with_alternate"):
+    alternate_clicked = st.session_state.get("rerun_with_alternate")
     st.session_state["rerun_with_alternate"] = False
+    # One checkpoint thread per browser session, so editing a field only reruns what depends on it
+    plan_thread_id = st.session_state.setdefault("plan_thread_id", f"session-{uuid.uuid4().hex}")
+    trip_params = dict(
+        source=st.session_state.get("source", source),
+        destination=st.session_state.get("destination", destination),
+        start_date=start_date.strftime("%Y-%m-%d"),
+        num_days=num_days,
+        trip_type=trip_type,
+        budget=budget,
+        travellers=travellers
+    )
     
     try:
         with st.spinner("Generating your personalized trip plan..."):
-            result = generate_trip(
-                source=st.session_state.get("source", source),
-                destination=st.session_state.get("destination", destination),
-                start_date=start_date.strftime("%Y-%m-%d"),
-                num_days=num_days,
-                trip_type=trip_type,
-                budget=budget,
-                travellers=travellers
-            )
-
-        st.session_state["trip_result"] = result
+            # An alternate's plan was most likely started in the background when it was suggested;
+            # only a finished one is handed over, since an unfinished one runs at the lowest priority
+            prefetched = plan_prefetcher.take(trip_params) if alternate_clicked else None
+            result = None
+            if prefetched is not None:
+                try:
+                    result = prefetched.result()
+                except Exception as e:
+                    print(f"---Prefetched plan failed, planning again: {e}---")
+            if result is None:
+                # Re-planning for a suggested alternate queues behind fresh plans when quotas run short
+                with request_priority(REGENERATION if alternate_clicked else INTERACTIVE):
+                    result = generate_trip_streaming(**trip_params, thread_id=plan_thread_id)
+
+        # The result itself lives in the server-side store; the session only keeps its ID
+        st.session_state["trip_result_id"] = result_store.put(result, st.session_state.get("trip_result_id"))
+
+        if result.get("status") == "unfavorable":
+            prefetch_alternates(result)
     
     except Exception as e:
         st.error("An error occurred while planning your trip. Please check your inputs and try again.")
@@ -378,8 +439,10 @@ if submitted or st.session_state.get("rerun_with_alternate"):
 
 
 # If result exists
-if "trip_result" in st.session_state:
-    result = st.session_state["trip_result"]
+result = result_store.get(st.session_state.get("trip_result_id"))
+if result is None and st.session_state.pop("trip_result_id", None):
+    st.info("Your previous trip plan has expired. Plan it again to see it here.")
+if result is not None:
     # print(result)
     if result.get("status") == "unfavorable":
         st.error(
@@ -403,56 +466,40 @@ if "trip_result" in st.session_state:
         st.markdown("---")
         st.subheader("🧭 Alternate Destinations Suggested")
         
-        suggestions_output = result.get("alternate_suggestions")
-        parsed_suggestions = parse_llm_json_response(suggestions_output)
-
-        # Determine the actual list of suggestions, whether it's a dict or a list
-        suggestions_list = []
-        if isinstance(parsed_suggestions, dict):
-            suggestions_list = parsed_suggestions.get('alternate_suggestions', [])
-        elif isinstance(parsed_suggestions, list):
-            suggestions_list = parsed_suggestions
+        # The node returns schema-validated suggestions, or None if the Gemini call failed
+        suggestions_list = (result.get("alternate_suggestions") or {}).get("alternate_suggestions", [])
 
         if suggestions_list:
             for item in suggestions_list:
-                # --- THIS IS THE FIX ---
-                # Check if the item in the list is a dictionary or just a string
-                if isinstance(item, dict):
-                    place = item.get('place', 'N/A')
-                    reason = item.get('reason', '')
-                    cols = st.columns([1, 2, 1])
-                    with cols[0]:
-                        st.markdown(f"**🏖 {place}**")
-                    with cols[1]:
-                        st.markdown(reason)
-                    with cols[2]:
-                        if st.button(f"Plan for {place}", key=f"alt_{place}"):
-                            st.session_state["destination"] = place
-                            st.session_state.rerun_with_alternate = True
-                            st.rerun()
-                
-                elif isinstance(item, str):
-                    # If it's just a string, display it simply and provide a button
-                    cols = st.columns([3, 1])
-                    with cols[0]:
-                        st.markdown(f"- **{item}**")
-                    with cols[1]:
-                        if st.button(f"Plan for {item}", key=f"alt_{item}"):
-                            st.session_state.trip_params["destination"] = item
-                            st.session_state.rerun_with_alternate = True
-                            st.rerun()
+                place = item.get('place', 'N/A')
+                reason = item.get('reason', '')
+                cols = st.columns([1, 2, 1])
+                with cols[0]:
+                    st.markdown(f"**🏖 {place}**")
+                with cols[1]:
+                    st.markdown(reason)
+                with cols[2]:
+                    if st.button(f"Plan for {place}", key=f"alt_{place}"):
+                        st.session_state["destination"] = place
+                        st.session_state.rerun_with_alternate = True
+                        st.rerun()
 
         else:
-            # --- REGENERATION LOGIC (as requested) ---
-            st.error("⚠️ Failed to load or parse alternate suggestions.")
-            if st.button("🔁 Regenerate Suggestions"):
+            st.error("⚠️ Couldn't find alternate destinations with better weather for these dates.")
+            if st.button("🔁 Retry Suggestions"):
                 with st.spinner("Rethinking some alternatives..."):
                     from trip_graph.nodes.alternate_suggestion_node import alternate_suggestion_node
+                    from trip_graph.nodes.alternate_validation_node import alternate_validation_node
                     
-                    alt_sugg_node = alternate_suggestion_node()
-                    new_suggestions = alt_sugg_node.invoke(st.session_state.trip_result)
+                    # Fresh candidates are checked against their forecasts just like in the graph
+                    alt_sugg_node = alternate_suggestion_node() | alternate_validation_node()
+                    # Skip the prompt cache so the retry really goes back to Gemini
+                    with request_priority(REGENERATION):
+                        new_suggestions = alt_sugg_node.invoke({**result, "bypass_cache": True})
                     
-                    st.session_state.trip_result["alternate_suggestions"] = new_suggestions
+                    result["alternate_suggestions"] = new_suggestions["alternate_suggestions"]
+                    result_store.put(result, st.session_state["trip_result_id"])
+                    prefetch_alternates(result)
                     st.rerun()
         
         st.stop()
@@ -487,46 +534,57 @@ if "trip_result" in st.session_state:
 
     # FLIGHTS
     st.divider()
+    # Sorting and filtering run on the columnar view of the flight records, not the cards
+    flight_sort = st.radio("Sort flights by", list(FLIGHT_SORTS), horizontal=True, key="flight_sort")
+    direct_only = st.checkbox("Non-stop only", key="flight_direct_only")
+
     st.subheader(f"✈️ Outbound Flights: {source} to {st.session_state.get('destination')}")
-    onward_data = result.get("flights", {}).get("onward", {})
-    flights_to_display = onward_data.get("best_flights") or onward_data.get("other_flights")
+    onward = FlightTable((result.get("flights") or {}).get("onward") or [])
+    flights_to_display = onward.rank(
+        FLIGHT_SORTS[flight_sort], onward.select(max_stops=0 if direct_only else None), top_k=FLIGHTS_TO_SHOW
+    )
     # print(flights_to_display)
 
     if flights_to_display:
         display_flight_options(flights_to_display)
+    elif len(onward) and direct_only:
+        st.warning('No non-stop onward flights found.')
     else:
         st.error('Error fetching onward flight details.')
     
     st.subheader(f"✈️ Return Flights: {st.session_state.get('destination')} to {source}")
-    return_data = result.get("flights", {}).get("return", {})
+    return_ = FlightTable((result.get("flights") or {}).get("return") or [])
 
-    flights_to_display = return_data.get("best_flights") or return_data.get("other_flights")
+    flights_to_display = return_.rank(
+        FLIGHT_SORTS[flight_sort], return_.select(max_stops=0 if direct_only else None), top_k=FLIGHTS_TO_SHOW
+    )
 
     if flights_to_display:
         display_flight_options(flights_to_display)
+    elif len(return_) and direct_only:
+        st.warning('No non-stop return flights found.')
     else:
         st.error('No return flight details could be fetched.')
 
     # HOTELS
     st.divider()
     st.subheader("🏨 Recommended Hotels")
+    hotel_sort = st.radio("Sort hotels by", list(HOTEL_SORTS), horizontal=True, key="hotel_sort")
     # st.json(result["hotels"])
-    for hotel in result["hotels"]:
+    for hotel in HotelTable(result.get("hotels") or []).rank(HOTEL_SORTS[hotel_sort]):
         display_hotel_card(hotel)
 
     # ITINERARY — day-wise expandable divs
     st.divider()
     st.subheader("🧭 Personalized Itinerary Plan")
 
-    itinerary = result["itinerary"]
-    try:
-        itinerary_data = parse_llm_json_response(itinerary)
+    # The planner returns a schema-validated itinerary, or None if the Gemini call failed
+    itinerary_data = result.get("itinerary")
+    if itinerary_data:
         display_itinerary(itinerary_data)
-
-    except Exception:
-        st.error("⚠️ Failed to parse itinerary. The model’s response wasn’t valid JSON.")
-        st.info("You can regenerate the itinerary using the button below without re-entering details.")
-        if st.button("🔁 Regenerate Itinerary"):
+    else:
+        st.error("⚠️ The itinerary couldn't be generated.")
+        if st.button("🔁 Retry Itinerary"):
             with st.spinner("Re-generating itinerary..."):
                 from trip_graph.nodes.planner_node import planner_node
                 p_node = planner_node()
@@ -538,20 +596,21 @@ if "trip_result" in st.session_state:
                     "budget": result["budget"],
                     "travellers": result["travellers"]
                 })
-                new_itinerary = p_node.invoke(last_params)
+                # Skip the prompt cache so the retry really goes back to Gemini
+                with request_priority(REGENERATION):
+                    new_itinerary = p_node.invoke({**last_params, "bypass_cache": True})
                 # print(new_itinerary)
 
-                try:
-                    itinerary_data = parse_llm_json_response(new_itinerary['itinerary'])
-                    result["itinerary"] = new_itinerary
-                    st.session_state["trip_result"]["itinerary"] = new_itinerary
+                if new_itinerary["itinerary"]:
+                    result["itinerary"] = new_itinerary["itinerary"]
+                    result_store.put(result, st.session_state["trip_result_id"])
                     st.success("✅ Itinerary regenerated successfully!")
-                    display_itinerary(itinerary_data)
-                except Exception:
+                    display_itinerary(new_itinerary["itinerary"])
+                else:
                     st.error("❌ Regeneration failed again. Please try regenerating your ititnerary in a few minutes.")
 
     # SUMMARY
     st.divider()
-    summary = parse_llm_json_response(result["summary"])
+    summary = result.get("summary") or {}
     # print(summary)
     display_trip_summary(summary)
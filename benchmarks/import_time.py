@@ -0,0 +1,153 @@
+"""
+Measures cold-start cost: how long importing the app's entry modules takes in a fresh interpreter.
+
+Each run imports the module in a new `python -X importtime` subprocess, so nothing is shared
+between runs. Reports min/median wall time, the heaviest imports underneath, and how long the
+first graph build (the part deferred to the first plan) takes. Pass --history to append the
+results, tagged with the git commit, to a JSON-lines file and watch startup cost over time.
+
+    python -m benchmarks.import_time --runs 5 --history benchmarks/import_history.jsonl
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+
+DEFAULT_MODULES = ["config", "modules.llm_gemini", "trip_graph.langgraph_flow"]
+
+# Importing must not need keys, the network or a metrics port
+_ENV = {
+    "GEMINI_API_KEY": "import-benchmark",
+    "OPENWEATHER_API_KEY": "import-benchmark",
+    "SERPAPI_KEY": "import-benchmark",
+    "LANGCHAIN_TRACING_V2": "false",
+    "PLAN_PREFETCH": "false",
+    "METRICS_PORT": "0",
+}
+
+_BUILD_GRAPH = (
+    "import time; started = time.perf_counter(); "
+    "from trip_graph.langgraph_flow import _graph; _graph(); "
+    "print(time.perf_counter() - started)"
+)
+
+
+def _environment():
+    env = dict(os.environ, **_ENV)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (ROOT, env.get("PYTHONPATH")) if p)
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    return env
+
+
+def _parse_importtime(stderr: str) -> dict:
+    """Cumulative microseconds per module from -X importtime output."""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line[len("import time:"):].split("|")
+        try:
+            cumulative[name.strip()] = int(total)
+        except ValueError:
+            pass  # the header line
+    return cumulative
+
+
+def measure_import(module: str, runs: int, top: int) -> dict:
+    walls, cumulative = [], {}
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT, env=_environment(), capture_output=True, text=True,
+        )
+        walls.append(time.perf_counter() - started)
+        if proc.returncode != 0:
+            raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+        for name, micros in _parse_importtime(proc.stderr).items():
+            cumulative.setdefault(name, []).append(micros)
+
+    # Median per module across runs, then the heaviest ones (parents include their children)
+    medians = {name: statistics.median(values) for name, values in cumulative.items()}
+    heaviest = sorted(medians.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "runs": runs,
+        "wall_seconds": {"min": round(min(walls), 4), "median": round(statistics.median(walls), 4)},
+        "import_seconds": round(medians.get(module, 0) / 1e6, 4),
+        "heaviest": [{"module": name, "seconds": round(micros / 1e6, 4)} for name, micros in heaviest],
+    }
+
+
+def measure_graph_build(runs: int) -> dict:
+    builds = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-c", _BUILD_GRAPH], cwd=ROOT, env=_environment(), capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise SystemExit(f"Building the graph failed:\n{proc.stderr[-2000:]}")
+        builds.append(float(proc.stdout.strip().splitlines()[-1]))
+    return {"min": round(min(builds), 4), "median": round(statistics.median(builds), 4)}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_report(results: list, graph_build: dict):
+    print(f"{'module':<32}{'wall min s':>12}{'wall med s':>12}{'import s':>10}")
+    for row in results:
+        wall = row["wall_seconds"]
+        print(f"{row['module']:<32}{wall['min']:>12.3f}{wall['median']:>12.3f}{row['import_seconds']:>10.3f}")
+    if graph_build:
+        print(f"\nFirst graph build (after import): min {graph_build['min']:.3f}s, median {graph_build['median']:.3f}s")
+    for row in results:
+        print(f"\nHeaviest imports under {row['module']}:")
+        for entry in row["heaviest"]:
+            print(f"  {entry['seconds']:>8.3f}s  {entry['module']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", action="append", help=f"Module to import (default: {', '.join(DEFAULT_MODULES)})")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="How many of the heaviest imports to list")
+    parser.add_argument("--skip-build", action="store_true", help="Don't time the first graph build")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    parser.add_argument("--history", metavar="PATH", help="Append a summary line to this JSON-lines file")
+    args = parser.parse_args(argv)
+
+    results = [measure_import(module, args.runs, args.top) for module in args.module or DEFAULT_MODULES]
+    graph_build = None if args.skip_build else measure_graph_build(args.runs)
+    _print_report(results, graph_build)
+
+    report = {"results": results, "graph_build_seconds": graph_build}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.history:
+        entry = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "import_seconds": {row["module"]: row["wall_seconds"]["median"] for row in results},
+            "graph_build_seconds": graph_build and graph_build["median"],
+        }
+        with open(args.history, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+    return report
+
+
+if __name__ == "__main__":
+    main()
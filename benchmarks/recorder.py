@@ -0,0 +1,76 @@
+"""
+Records real SerpAPI, OpenWeather and Gemini responses as benchmark fixtures.
+
+Runs the benchmark workload once through recording stand-ins that forward to the real services,
+then writes what came back (credentials stripped) to benchmarks/fixtures. Needs the usual API
+keys in the environment; everything after that runs offline with benchmarks.run.
+
+    python -m benchmarks.recorder [--scenarios my_trips.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from benchmarks import workload
+from benchmarks.standins import StandIn, load_fixtures, save_fixtures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixtures", default=workload.FIXTURES_DIR, help="Where to write the fixtures")
+    parser.add_argument("--scenarios", help="JSON list of trips (defaults to workload.DEFAULT_SCENARIOS)")
+    parser.add_argument("--upstream", action="append", metavar="NAME=URL",
+                        help="Record from somewhere other than the real service, e.g. a staging proxy")
+    parser.add_argument("--append", action="store_true", help="Add to existing fixtures instead of replacing them")
+    args = parser.parse_args(argv)
+
+    targets = {name: real for name, (_, real) in workload.UPSTREAMS.items()}
+    for spec in args.upstream or []:
+        name, _, url = spec.partition("=")
+        targets[name] = url
+
+    scenarios = workload.DEFAULT_SCENARIOS
+    if args.scenarios:
+        with open(args.scenarios) as f:
+            scenarios = json.load(f)
+    scenarios = workload.pin_scenarios(scenarios)
+
+    standins = {}
+    for name, target in targets.items():
+        existing = load_fixtures(os.path.join(args.fixtures, f"{name}.json")) if args.append else []
+        standins[name] = StandIn(name, existing, target=target).start()
+    workload.configure_environment(
+        {name: s.base_url for name, s in standins.items()}, tempfile.mkdtemp(prefix="trip-record-"), live_keys=True
+    )
+
+    try:
+        # The same calls benchmarks.run makes, so every replayed request has an exact match
+        for scenario in scenarios:
+            print(f"---Recording {scenario['name']}---")
+            state = workload.plan(scenario)
+            workload.clear_caches()
+            asyncio.run(workload.aplan(scenario))
+            state = dict(state)
+            for _, node in workload.nodes():
+                workload.clear_caches()
+                state.update(node.invoke(dict(state)) or {})
+    finally:
+        for standin in standins.values():
+            standin.stop()
+
+    for name, standin in standins.items():
+        save_fixtures(os.path.join(args.fixtures, f"{name}.json"), standin.fixtures)
+        print(f"---{name}: {len(standin.fixtures)} fixtures---")
+    if args.append and os.path.exists(os.path.join(args.fixtures, "scenarios.json")):
+        known = {s["name"]: s for s in workload.load_scenarios(args.fixtures)}
+        scenarios = list({**known, **{s["name"]: s for s in scenarios}}.values())
+    workload.save_scenarios(scenarios, args.fixtures)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Offline benchmarks for the trip pipeline.
+
+Replays recorded SerpAPI, OpenWeather and Gemini responses from local stand-in servers and times
+create_trip_graph (sync and async) and every node on its own, reporting wall time, upstream calls
+and bytes transferred per run. No keys or network needed once fixtures exist (see recorder.py).
+
+    python -m benchmarks.run --iterations 5 --latency gemini=lognormal:1.2:0.4 --json out.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from benchmarks import workload
+from benchmarks.standins import Latency, StandIn, load_fixtures
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Bench:
+    """Runs one callable repeatedly and keeps wall times and the upstream traffic of each run."""
+
+    def __init__(self, standins: dict, cold: bool):
+        self.standins = standins
+        self.cold = cold
+        self.results = []
+
+    def _counters(self):
+        return {name: standin.counters() for name, standin in self.standins.items()}
+
+    def measure(self, name: str, fn, iterations: int):
+        times, traffic = [], []
+        result = None
+        for _ in range(iterations):
+            if self.cold:
+                workload.clear_caches()
+            before = self._counters()
+            started = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - started)
+            after = self._counters()
+            traffic.append({
+                upstream: {k: after[upstream][k] - before[upstream][k] for k in after[upstream]}
+                for upstream in after
+            })
+        row = {
+            "name": name,
+            "iterations": iterations,
+            "wall_seconds": {
+                "min": round(min(times), 4),
+                "median": round(statistics.median(times), 4),
+                "p95": round(_percentile(times, 95), 4),
+                "max": round(max(times), 4),
+            },
+            # Per run, averaged over the iterations
+            "upstream": {
+                upstream: {
+                    k: round(sum(run[upstream][k] for run in traffic) / iterations, 2)
+                    for k in traffic[0][upstream]
+                }
+                for upstream in traffic[0]
+            },
+        }
+        self.results.append(row)
+        return result
+
+
+def _print_table(results):
+    header = f"{'benchmark':<34}{'median s':>10}{'p95 s':>10}{'calls':>8}{'KB in':>9}{'KB out':>9}{'unmatched':>11}"
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        upstream = row["upstream"].values()
+        calls = sum(u["requests"] for u in upstream)
+        kb_in = sum(u["bytes_in"] for u in upstream) / 1024
+        kb_out = sum(u["bytes_out"] for u in upstream) / 1024
+        unmatched = sum(u["unmatched"] for u in upstream)
+        wall = row["wall_seconds"]
+        print(f"{row['name']:<34}{wall['median']:>10.3f}{wall['p95']:>10.3f}{calls:>8.1f}"
+              f"{kb_in:>9.1f}{kb_out:>9.1f}{unmatched:>11.1f}")
+
+
+def _parse_latencies(specs, scale, seed):
+    latencies = {name: Latency("recorded", scale, seed) for name in workload.UPSTREAMS}
+    for spec in specs or []:
+        name, _, model = spec.partition("=")
+        if name not in latencies:
+            raise SystemExit(f"Unknown upstream {name!r}; expected one of {', '.join(latencies)}")
+        latencies[name] = Latency(model, scale, seed)
+    return latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixtures", default=workload.FIXTURES_DIR, help="Directory with recorded fixtures")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--latency", action="append", metavar="UPSTREAM=SPEC",
+                        help="Latency model per upstream, e.g. gemini=lognormal:1.2:0.4 (default: recorded)")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplies every simulated delay")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--warm", action="store_true", help="Keep response/prompt/plan caches between runs")
+    parser.add_argument("--skip-nodes", action="store_true", help="Only benchmark whole plans")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(os.path.join(args.fixtures, "scenarios.json")):
+        raise SystemExit(f"No fixtures in {args.fixtures}; record them with python -m benchmarks.synthetic (no keys) or python -m benchmarks.recorder")
+
+    latencies = _parse_latencies(args.latency, args.latency_scale, args.seed)
+    standins = {
+        name: StandIn(name, load_fixtures(os.path.join(args.fixtures, f"{name}.json")), latencies[name]).start()
+        for name in workload.UPSTREAMS
+    }
+    cache_dir = tempfile.mkdtemp(prefix="trip-bench-")
+    workload.configure_environment({name: s.base_url for name, s in standins.items()}, cache_dir)
+
+    bench = Bench(standins, cold=not args.warm)
+    try:
+        for scenario in workload.load_scenarios(args.fixtures):
+            label = scenario["name"]
+            state = bench.measure(f"{label}: create_trip_graph", lambda: workload.plan(scenario), args.iterations)
+            bench.measure(
+                f"{label}: acreate_trip_graph", lambda: asyncio.run(workload.aplan(scenario)), args.iterations
+            )
+            if args.skip_nodes:
+                continue
+            state = dict(state)
+            for name, node in workload.nodes():
+                output = bench.measure(f"{label}: {name}", lambda: node.invoke(dict(state)), args.iterations)
+                state.update(output or {})
+    finally:
+        for standin in standins.values():
+            standin.stop()
+
+    _print_table(bench.results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(bench.results, f, indent=2)
+    return bench.results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+# Credentials never end up in a fixture or a match key
+SECRET_PARAMS = {"api_key", "appid", "key"}
+
+# Params that tell apart requests of different kinds on a shared endpoint (SerpAPI's engine)
+SHAPE_PARAMS = ("engine",)
+
+
+def clean_query(query: str) -> dict:
+    return {k: v for k, v in parse_qsl(query, keep_blank_values=True) if k not in SECRET_PARAMS}
+
+
+def match_keys(method: str, path: str, query: dict, body: bytes) -> tuple:
+    """
+    (exact, shape) keys for a request. The exact key covers the whole request minus credentials;
+    the shape key only what decides the kind of response (path, SerpAPI engine, and for Gemini
+    the generation config and tools but not the prompt), so an unrecorded request still gets a
+    response of the right form.
+    """
+    payload = {}
+    if body:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = {"raw": body.decode("utf-8", "replace")}
+    exact = json.dumps([method, path, sorted(query.items()), payload], sort_keys=True)
+    shape_payload = {k: v for k, v in payload.items() if k != "contents"} if isinstance(payload, dict) else {}
+    shape = json.dumps(
+        [method, path, sorted((k, query[k]) for k in SHAPE_PARAMS if k in query), shape_payload], sort_keys=True
+    )
+    return hashlib.sha256(exact.encode()).hexdigest(), hashlib.sha256(shape.encode()).hexdigest()
+
+
+class Latency:
+    """
+    Response delay model, parsed from a spec string:
+      recorded               the latency observed when the fixture was recorded (default)
+      constant:S             always S seconds
+      uniform:LO:HI          uniformly between LO and HI seconds
+      lognormal:MEDIAN:SIGMA long-tailed, like most real APIs
+    `scale` multiplies whatever the model yields.
+    """
+
+    def __init__(self, spec: str = "recorded", scale: float = 1.0, seed: int = None):
+        parts = spec.split(":")
+        self.kind = parts[0]
+        self.args = [float(a) for a in parts[1:]]
+        self.scale = scale
+        self._random = random.Random(seed)
+        expected = {"recorded": 0, "constant": 1, "uniform": 2, "lognormal": 2}
+        if self.kind not in expected or len(self.args) != expected[self.kind]:
+            raise ValueError(f"Bad latency spec {spec!r}; see Latency's docstring")
+
+    def sample(self, recorded: float = 0.0) -> float:
+        if self.kind == "constant":
+            delay = self.args[0]
+        elif self.kind == "uniform":
+            delay = self._random.uniform(*self.args)
+        elif self.kind == "lognormal":
+            median, sigma = self.args
+            delay = median * self._random.lognormvariate(0, sigma)
+        else:
+            delay = recorded
+        return max(delay * self.scale, 0.0)
+
+
+def load_fixtures(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_fixtures(path: str, fixtures: list):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(fixtures, f, indent=1)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _serve(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        url = urlsplit(self.path)
+        query = clean_query(url.query)
+        self.server.owner.handle(self, self.command, url.path, url.query, query, body)
+
+    do_GET = _serve
+    do_POST = _serve
+
+
+class StandIn:
+    """
+    Local HTTP server standing in for one upstream.
+
+    In replay mode it answers from recorded fixtures (exact match first, then a response of the
+    same shape) after a delay drawn from `latency`. In record mode it forwards every request to
+    the real upstream at `target`, answers with the real response and keeps it as a fixture.
+    Requests served and bytes in each direction are counted for the benchmarks.
+    """
+
+    def __init__(self, name: str, fixtures: list = None, latency: Latency = None, target: str = None):
+        self.name = name
+        self.fixtures = list(fixtures or [])
+        self.latency = latency or Latency()
+        self.target = target.rstrip("/") if target else None
+        self._exact = {}
+        self._shape = {}
+        for fixture in self.fixtures:
+            self._index(fixture)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.unmatched = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._server = None
+
+    def _index(self, fixture):
+        self._exact.setdefault(fixture["key"], fixture)
+        self._shape.setdefault(fixture["shape"], fixture)
+
+    # --- lifecycle ---
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.owner = self
+        threading.Thread(target=self._server.serve_forever, name=f"standin-{self.name}", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # --- serving ---
+    def handle(self, handler, method, path, raw_query, query, body):
+        key, shape = match_keys(method, path, query, body)
+        if self.target:
+            fixture = self._forward(handler, method, path, raw_query, body, key, shape)
+        else:
+            fixture = self._exact.get(key) or self._shape.get(shape)
+        with self._lock:
+            self.requests += 1
+            self.bytes_in += len(body) + len(handler.path)
+            if fixture is None:
+                self.unmatched += 1
+        if fixture is None:
+            self._respond(handler, 404, "application/json", json.dumps({"error": f"No {self.name} fixture for {path}"}))
+            return
+        delay = 0.0 if self.target else self.latency.sample(fixture.get("latency", 0.0))
+        self._respond(handler, fixture["status"], fixture["content_type"], fixture["body"], delay)
+
+    def _respond(self, handler, status, content_type, text, delay=0.0):
+        data = text.encode()
+        streaming = content_type.startswith("text/event-stream")
+        # Streams get their first event after part of the delay and the rest spread over the remainder
+        events = [e + b"\n\n" for e in data.split(b"\n\n") if e.strip()] if streaming else [data]
+        time.sleep(delay * 0.3 if streaming else delay)
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        if streaming:
+            handler.send_header("Connection", "close")
+            handler.close_connection = True
+        else:
+            handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        for i, event in enumerate(events):
+            if i and streaming:
+                time.sleep(delay * 0.7 / max(len(events) - 1, 1))
+            handler.wfile.write(event)
+            handler.wfile.flush()
+        with self._lock:
+            self.bytes_out += len(data)
+
+    def _forward(self, handler, method, path, raw_query, body, key, shape):
+        import httpx
+
+        headers = {
+            k: v for k, v in handler.headers.items()
+            if k.lower() not in {"host", "content-length", "accept-encoding", "connection"}
+        }
+        # Plain bodies, so fixtures are readable and replay doesn't have to re-encode
+        headers["Accept-Encoding"] = "identity"
+        url = f"{self.target}{path}" + (f"?{raw_query}" if raw_query else "")
+        started = time.monotonic()
+        response = httpx.request(method, url, content=body or None, headers=headers, timeout=120)
+        fixture = {
+            "key": key,
+            "shape": shape,
+            "method": method,
+            "path": path,
+            "query": clean_query(raw_query),
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", "application/json"),
+            "body": response.text,
+            "latency": round(time.monotonic() - started, 4),
+        }
+        with self._lock:
+            if response.status_code < 400 and key not in self._exact:
+                self.fixtures.append(fixture)
+                self._index(fixture)
+        return fixture
+
+    def counters(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "unmatched": self.unmatched,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+            }
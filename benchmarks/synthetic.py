@@ -0,0 +1,366 @@
+"""
+Synthetic SerpAPI, OpenWeather and Gemini services, to record benchmark fixtures without API keys.
+
+The fixtures committed under benchmarks/fixtures were recorded from these with
+
+    python -m benchmarks.synthetic
+
+which starts them on a local port and runs benchmarks.recorder against them. Responses have the
+shape and roughly the size of the real ones (booking tokens, price insights, image galleries,
+nearby places, ...), and each is served after a delay typical of that service, so the recorded
+latencies are plausible as well. Everything is derived from the request, so recording twice
+gives the same bodies. To benchmark against real data, record from the real services with
+python -m benchmarks.recorder instead.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from benchmarks import workload
+
+# Typical response times in seconds, from the real services
+LATENCY = {
+    "google": 0.9,
+    "google_flights": 2.2,
+    "google_hotels": 1.8,
+    "openweather": 0.25,
+    "gemini_short": 0.6,       # IATA codes, weather decisions
+    "gemini_compose": 1.4,     # skeletons, summaries, suggestions
+    "gemini_per_day": 0.7,     # itineraries, per planned day
+}
+
+AIRLINES = ["IndiGo", "Air India", "Vistara", "Akasa Air", "SpiceJet", "Air India Express"]
+HUBS = [("DEL", "Indira Gandhi International Airport"), ("BOM", "Chhatrapati Shivaji Maharaj International Airport"),
+        ("BLR", "Kempegowda International Airport"), ("HYD", "Rajiv Gandhi International Airport")]
+AMENITIES = ["Free Wi-Fi", "Free breakfast", "Pool", "Air conditioning", "Restaurant", "Room service",
+             "Fitness centre", "Spa", "Airport shuttle", "Free parking", "Bar", "Kid-friendly"]
+SKIES = ["sky is clear", "few clouds", "scattered clouds", "broken clouds", "light rain"]
+PLACES = ["Udaipur", "Rishikesh", "Munnar", "Pondicherry", "Hampi", "Coorg", "Shillong", "Darjeeling",
+          "Jodhpur", "Alleppey", "Gokarna", "Ooty"]
+AREAS = ["Old City", "Fort Quarter", "Lakeside", "Central Market", "Heritage District", "Riverfront",
+         "Hill Viewpoint", "Craft Village", "Temple Town", "Garden District", "Waterfront", "Museum Mile"]
+THEMES = ["history and architecture", "local food", "markets and crafts", "nature walks", "art and culture",
+          "relaxed sightseeing", "adventure", "viewpoints and sunsets"]
+
+
+def _rng(*parts) -> random.Random:
+    # Same request, same response
+    return random.Random(hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest())
+
+
+def _token(rng, length=220) -> str:
+    return "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789") for _ in range(length))
+
+
+# --- SerpAPI ---
+
+def _leg(rng, origin, destination, depart: datetime):
+    minutes = rng.randint(75, 190)
+    airline = rng.choice(AIRLINES)
+    return {
+        "departure_airport": {"name": f"{origin[1]}", "id": origin[0], "time": depart.strftime("%Y-%m-%d %H:%M")},
+        "arrival_airport": {"name": f"{destination[1]}", "id": destination[0],
+                            "time": (depart + timedelta(minutes=minutes)).strftime("%Y-%m-%d %H:%M")},
+        "duration": minutes,
+        "airplane": rng.choice(["Airbus A320neo", "Airbus A321neo", "Boeing 737", "ATR 72"]),
+        "airline": airline,
+        "airline_logo": f"https://www.gstatic.com/flights/airline_logos/70px/{airline[:2].upper()}.png",
+        "travel_class": "Economy",
+        "flight_number": f"{airline[:2].upper()} {rng.randint(100, 9999)}",
+        "legroom": f"{rng.choice([28, 29, 30, 31])} in",
+        "extensions": ["Average legroom", "In-seat USB outlet", f"Carbon emissions estimate: {rng.randint(60, 140)} kg"],
+        "often_delayed_by_over_30_min": rng.random() < 0.2,
+    }
+
+
+def _flight_option(rng, params, index):
+    origin = (params["departure_id"], f"{params['departure_id']} Airport")
+    destination = (params["arrival_id"], f"{params['arrival_id']} Airport")
+    depart = datetime.strptime(params["outbound_date"], "%Y-%m-%d") + timedelta(hours=rng.randint(5, 21), minutes=rng.choice([0, 15, 30, 45]))
+    stops = 0 if index < 3 else rng.choice([0, 1, 1, 2])
+    legs, layovers, point = [], [], origin
+    for stop in range(stops):
+        hub = rng.choice([h for h in HUBS if h[0] not in (origin[0], destination[0])] or HUBS)
+        legs.append(_leg(rng, point, hub, depart))
+        wait = rng.randint(50, 400)
+        layovers.append({"duration": wait, "name": hub[1], "id": hub[0], "overnight": wait > 300})
+        depart = datetime.strptime(legs[-1]["arrival_airport"]["time"], "%Y-%m-%d %H:%M") + timedelta(minutes=wait)
+        point = hub
+    legs.append(_leg(rng, point, destination, depart))
+    total = sum(leg["duration"] for leg in legs) + sum(layover["duration"] for layover in layovers)
+    return {
+        "flights": legs,
+        "layovers": layovers or None,
+        "total_duration": total,
+        "carbon_emissions": {"this_flight": rng.randint(60000, 220000), "typical_for_this_route": 95000,
+                             "difference_percent": rng.randint(-30, 40)},
+        "price": rng.randint(3200, 14500),
+        "type": "Round trip",
+        "airline_logo": legs[0]["airline_logo"],
+        "departure_token": _token(rng),
+        "booking_token": _token(rng, 340),
+    }
+
+
+def _flights(params):
+    rng = _rng("flights", params)
+    options = [_flight_option(rng, params, i) for i in range(rng.randint(9, 14))]
+    options = [{k: v for k, v in option.items() if v is not None} for option in options]
+    prices = sorted(option["price"] for option in options)
+    return {
+        "search_metadata": {"id": _token(rng, 24), "status": "Success", "created_at": "2026-10-18 09:00:00 UTC",
+                            "google_flights_url": "https://www.google.com/travel/flights?" + _token(rng, 120),
+                            "total_time_taken": round(rng.uniform(1.5, 3.5), 2)},
+        "search_parameters": {k: v for k, v in params.items() if k != "api_key"},
+        "best_flights": options[:3],
+        "other_flights": options[3:],
+        "price_insights": {"lowest_price": prices[0], "price_level": "typical", "typical_price_range": [prices[1], prices[-2]],
+                           "price_history": [[int(datetime(2026, 9, d, tzinfo=timezone.utc).timestamp()) * 1000, rng.randint(3000, 9000)] for d in range(1, 31)]},
+        "airports": [{"departure": [{"airport": {"id": params["departure_id"]}, "city": params["departure_id"]}],
+                      "arrival": [{"airport": {"id": params["arrival_id"]}, "city": params["arrival_id"]}]}],
+    }
+
+
+def _hotel(rng, query, index):
+    price = rng.randint(1800, 16000)
+    return {
+        "type": "hotel",
+        "name": f"{rng.choice(['The', 'Hotel', 'Grand', 'Royal'])} {query.split()[0]} {rng.choice(['Residency', 'Palace', 'Inn', 'Retreat', 'Suites', 'Heritage'])} {index + 1}",
+        "description": f"Stay near {query}'s main sights with easy access to markets and restaurants.",
+        "link": f"https://example-hotels.test/{_token(rng, 16)}",
+        "gps_coordinates": {"latitude": round(rng.uniform(8, 32), 6), "longitude": round(rng.uniform(70, 92), 6)},
+        "check_in_time": "2:00 PM",
+        "check_out_time": "11:00 AM",
+        "rate_per_night": {"lowest": f"₹{price:,}", "extracted_lowest": price,
+                           "before_taxes_fees": f"₹{int(price * 0.85):,}", "extracted_before_taxes_fees": int(price * 0.85)},
+        "total_rate": {"lowest": f"₹{price * 2:,}", "extracted_lowest": price * 2},
+        "prices": [{"source": source, "logo": f"https://www.gstatic.com/travel/{source.lower()}.png",
+                    "rate_per_night": {"lowest": f"₹{price + rng.randint(-300, 600):,}"}}
+                   for source in ("Booking.com", "Agoda", "MakeMyTrip", "Goibibo")],
+        "nearby_places": [{"name": f"{rng.choice(AREAS)}", "transportations": [{"type": "Taxi", "duration": f"{rng.randint(5, 30)} min"}]}
+                          for _ in range(3)],
+        "hotel_class": f"{rng.randint(2, 5)}-star hotel",
+        "overall_rating": round(rng.uniform(3.4, 4.9), 1),
+        "reviews": rng.randint(40, 6000),
+        "ratings": [{"stars": stars, "count": rng.randint(5, 2000)} for stars in (5, 4, 3, 2, 1)],
+        "location_rating": round(rng.uniform(3, 5), 1),
+        "reviews_breakdown": [{"name": name, "positive": rng.randint(10, 900), "negative": rng.randint(0, 120)}
+                              for name in ("Property", "Service", "Location", "Cleanliness", "Breakfast")],
+        "amenities": rng.sample(AMENITIES, rng.randint(5, 10)),
+        "images": [{"thumbnail": f"https://lh5.googleusercontent.com/p/{_token(rng, 40)}=s287-w287",
+                    "original_image": f"https://lh5.googleusercontent.com/p/{_token(rng, 40)}=s10000"}
+                   for _ in range(rng.randint(6, 12))],
+        "property_token": _token(rng, 28),
+        "serpapi_property_details_link": f"https://serpapi.com/search.json?engine=google_hotels&property_token={_token(rng, 28)}",
+    }
+
+
+def _hotels(params):
+    rng = _rng("hotels", params)
+    return {
+        "search_metadata": {"id": _token(rng, 24), "status": "Success"},
+        "search_parameters": {k: v for k, v in params.items() if k != "api_key"},
+        "brands": [{"id": i, "name": name} for i, name in enumerate(["Taj", "Oberoi", "ITC", "Lemon Tree", "OYO"])],
+        "properties": [_hotel(rng, params.get("q", ""), i) for i in range(rng.randint(16, 20))],
+        "serpapi_pagination": {"next_page_token": _token(rng, 40)},
+    }
+
+
+def _search(params):
+    city = params.get("q", "").replace(" airport IATA code", "")
+    code = city[:3].upper()
+    return {"organic_results": [
+        {"position": i + 1, "title": f"{city} Airport ({code})", "link": f"https://example.test/{code.lower()}",
+         "snippet": f"{city} Airport (IATA: {code}) is the main airport serving {city}."} for i in range(5)
+    ]}
+
+
+# --- OpenWeather ---
+
+def _forecast(params):
+    city = params.get("q", "")
+    rng = _rng("weather", city)
+    # The benchmark trips need a favourable forecast; other cities get some rain now and then
+    skies = SKIES[:3] if city in {s["destination"] for s in workload.DEFAULT_SCENARIOS} else SKIES
+    start = datetime.combine(date.today(), datetime.min.time(), tzinfo=timezone.utc) + timedelta(hours=6, minutes=30)
+    days = []
+    for i in range(int(params.get("cnt", 16))):
+        temp = round(rng.uniform(19, 33), 2)
+        sky = rng.choice(skies)
+        days.append({
+            "dt": int((start + timedelta(days=i)).timestamp()),
+            "sunrise": int((start + timedelta(days=i, hours=-0.5)).timestamp()),
+            "sunset": int((start + timedelta(days=i, hours=11.5)).timestamp()),
+            "temp": {"day": temp, "min": round(temp - 6, 2), "max": round(temp + 3, 2), "night": round(temp - 4, 2),
+                     "eve": round(temp - 1, 2), "morn": round(temp - 5, 2)},
+            "feels_like": {"day": temp, "night": round(temp - 4, 2), "eve": round(temp - 1, 2), "morn": round(temp - 5, 2)},
+            "pressure": rng.randint(1004, 1016),
+            "humidity": rng.randint(30, 85),
+            "weather": [{"id": 800, "main": "Clear" if "clear" in sky else "Clouds", "description": sky, "icon": "01d"}],
+            "speed": round(rng.uniform(1, 6), 2),
+            "deg": rng.randint(0, 359),
+            "gust": round(rng.uniform(2, 9), 2),
+            "clouds": rng.randint(0, 80),
+            "pop": round(rng.uniform(0, 0.3), 2),
+        })
+    return {"city": {"id": rng.randint(1000000, 1999999), "name": city, "country": "IN", "timezone": 19800},
+            "cod": "200", "message": 0.05, "cnt": len(days), "list": days}
+
+
+# --- Gemini ---
+
+def _days_asked(prompt: str) -> list:
+    span = re.search(r"Plan only days? ([\d, to]+?)[, ]+sticking", prompt)
+    if span:
+        text = span.group(1)
+        bounds = re.fullmatch(r"(\d+) to (\d+)", text)
+        if bounds:
+            return list(range(int(bounds.group(1)), int(bounds.group(2)) + 1))
+        return [int(day) for day in re.findall(r"\d+", text)]
+    dates = re.findall(r"\d{4}-\d{2}-\d{2}", prompt)
+    if len(dates) >= 2:
+        first, last = date.fromisoformat(dates[0]), date.fromisoformat(dates[1])
+        return list(range(1, (last - first).days + 2))
+    return [1, 2, 3]
+
+
+def _destination(prompt: str) -> str:
+    match = re.search(r"\bto\s+([A-Z][\w .'-]*?)\s+(?:from|for)\b", prompt)
+    return match.group(1).strip() if match else "the city"
+
+
+def _answer(prompt: str, schema: str):
+    """(response text, seconds it takes) for one generateContent call."""
+    rng = _rng("gemini", prompt)
+    place = _destination(prompt)
+    if "area" in schema and "theme" in schema:
+        days = _days_asked(prompt)
+        areas = rng.sample(AREAS, min(len(days), len(AREAS)))
+        skeleton = [{"day": day, "area": f"{place} {areas[(day - 1) % len(areas)]}", "theme": rng.choice(THEMES)}
+                    for day in days]
+        return json.dumps({"days": skeleton}), LATENCY["gemini_compose"]
+    if "Morning" in schema:
+        days = _days_asked(prompt)
+        plans = [{
+            "day": day,
+            "Morning": f"Start day {day} at the {rng.choice(AREAS).lower()} of {place} with a guided walk past its landmarks.",
+            "Lunch": f"Lunch at a well-reviewed local thali place near stop {day}; try the regional specials.",
+            "Afternoon": f"Spend the afternoon on {rng.choice(THEMES)} around {place}, with a break for chai (day {day}).",
+            "Evening": f"Evening {day}: sunset viewpoint, then dinner at a rooftop restaurant in {place}.",
+        } for day in days]
+        return json.dumps({"days": plans}), LATENCY["gemini_per_day"] * len(days)
+    if "weather_tips" in schema:
+        return json.dumps({
+            "weather_tips": ["Carry sunscreen and a hat", "Stay hydrated; carry a water bottle", "Pack a light jacket for evenings"],
+            "flight": f"The cheapest non-stop option to {place} balances price and time well for this budget.",
+            "accomodation": f"The top-rated central hotel keeps most of {place}'s sights within a short ride.",
+            "activities": [f"Heritage walk in {place}", "Local market visit", "Sunset viewpoint", "Cooking class"],
+            "dining": ["Dal baati churma", "Masala chai", "Street-side chaat", "Regional thali"],
+        }), LATENCY["gemini_compose"]
+    if "alternate_suggestions" in schema:
+        count = int((re.search(r"Suggest (\d+)", prompt) or [0, 8])[1])
+        places = rng.sample([p for p in PLACES if p != place], min(count, len(PLACES) - 1))
+        return json.dumps({"alternate_suggestions": [
+            {"place": p, "reason": f"{p} usually has pleasant weather at this time and suits a similar budget."} for p in places
+        ]}), LATENCY["gemini_compose"]
+    if "decision" in schema:
+        return json.dumps({"decision": "favourable", "reason": ""}), LATENCY["gemini_short"]
+    # IATA lookups are the only unstructured calls
+    city = re.search(r'for the city "([^"]+)"', prompt)
+    return (city.group(1)[:3].upper() if city else "DEL"), LATENCY["gemini_short"]
+
+
+def _gemini(path: str, body: bytes):
+    payload = json.loads(body or b"{}")
+    config = payload.get("generationConfig", {})
+    schema = json.dumps(config.get("responseSchema") or config.get("responseJsonSchema") or {})
+    prompt = " ".join(part.get("text", "") for content in payload.get("contents", []) for part in content.get("parts", []))
+    text, seconds = _answer(prompt, schema)
+    usage = {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4,
+             "totalTokenCount": (len(prompt) + len(text)) // 4}
+    model = path.split("/models/")[-1].split(":")[0]
+    if "streamGenerateContent" not in path:
+        return "application/json", json.dumps({
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": usage, "modelVersion": model,
+        }), seconds
+    events = [
+        {"candidates": [{"content": {"parts": [{"text": text[i:i + 120]}], "role": "model"}, "index": 0}], "modelVersion": model}
+        for i in range(0, len(text), 120)
+    ]
+    events[-1]["candidates"][0]["finishReason"] = "STOP"
+    events[-1]["usageMetadata"] = usage
+    return "text/event-stream", "".join(f"data: {json.dumps(event)}\r\n\r\n" for event in events), seconds
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _serve(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        if "generateContent" in url.path:
+            content_type, text, seconds = _gemini(url.path, body)
+        elif url.path.endswith("/forecast/daily"):
+            content_type, text, seconds = "application/json", json.dumps(_forecast(params)), LATENCY["openweather"]
+        else:
+            engine = params.get("engine", "google")
+            handler = {"google_flights": _flights, "google_hotels": _hotels}.get(engine, _search)
+            content_type, text, seconds = "application/json", json.dumps(handler(params)), LATENCY.get(engine, 1.0)
+        time.sleep(seconds * self.server.latency_scale * random.uniform(0.85, 1.15))
+        data = text.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = _serve
+    do_POST = _serve
+
+
+def start(latency_scale: float = 1.0) -> ThreadingHTTPServer:
+    """Serves all three services from one local port; stop it with .shutdown()."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.latency_scale = latency_scale
+    threading.Thread(target=server.serve_forever, name="synthetic-upstream", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixtures", default=workload.FIXTURES_DIR, help="Where to write the fixtures")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplies every simulated delay")
+    args = parser.parse_args(argv)
+
+    # The recorder runs the app with "live" keys; nothing checks them here
+    for key in ("GEMINI_API_KEY", "OPENWEATHER_API_KEY", "SERPAPI_KEY"):
+        os.environ.setdefault(key, "synthetic")
+    server = start(args.latency_scale)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        from benchmarks import recorder
+        recorder.main(["--fixtures", args.fixtures] + [f"--upstream={name}={url}" for name in workload.UPSTREAMS])
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import json
+import os
+from datetime import date, timedelta
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+UPSTREAMS = {
+    # name: (base URL setting, real endpoint used when recording)
+    "serpapi": ("SERPAPI_BASE_URL", "https://serpapi.com"),
+    "openweather": ("OPENWEATHER_BASE_URL", "https://api.openweathermap.org"),
+    "gemini": ("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com"),
+}
+
+# Trips the recorder plays against the real services. Dates are relative, because the forecast
+# only reaches 16 days out; the recorder pins them, and replay uses the pinned dates.
+DEFAULT_SCENARIOS = [
+    {"name": "weekend", "source": "Delhi", "destination": "Jaipur", "start_in_days": 3, "num_days": 3,
+     "trip_type": "Family", "budget": "Medium", "travellers": 2},
+    {"name": "week", "source": "Mumbai", "destination": "Goa", "start_in_days": 5, "num_days": 6,
+     "trip_type": "Adventure", "budget": "High", "travellers": 4},
+]
+
+# Nodes benchmarked on their own, in graph order; each gets a finished plan's state plus the
+# outputs of the nodes before it
+NODES = [
+    ("weather", "trip_graph.nodes.weather_node", "weather_node"),
+    ("weather_decision", "trip_graph.nodes.weather_decision_node", "weather_decision_node"),
+    ("planner", "trip_graph.nodes.planner_node", "planner_node"),
+    ("flight", "trip_graph.nodes.flight_node", "flight_node"),
+    ("hotel", "trip_graph.nodes.hotel_node", "hotel_node"),
+    ("summary", "trip_graph.nodes.summary_node", "summary_node"),
+    ("alternate_suggestions", "trip_graph.nodes.alternate_suggestion_node", "alternate_suggestion_node"),
+    ("alternate_validation", "trip_graph.nodes.alternate_validation_node", "alternate_validation_node"),
+]
+
+
+def configure_environment(base_urls: dict, cache_dir: str, live_keys: bool = False):
+    """
+    Points the app at the stand-ins. Must run before anything imports config, since the
+    settings are read at import time. Offline runs get placeholder keys; tracing and
+    background prefetch are off, and the rate limits are lifted so they don't skew timings.
+    """
+    for name, url in base_urls.items():
+        os.environ[UPSTREAMS[name][0]] = url
+    if not live_keys:
+        for key in ("GEMINI_API_KEY", "OPENWEATHER_API_KEY", "SERPAPI_KEY"):
+            os.environ[key] = "offline-benchmark"
+    os.environ["CACHE_DIR"] = cache_dir
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
+    os.environ.setdefault("LANGSMITH_WORKSPACE_ID", "")
+    os.environ["PLAN_PREFETCH"] = "false"
+    for upstream in ("SERPAPI", "GEMINI", "OPENWEATHER"):
+        os.environ[f"{upstream}_REQUESTS_PER_MINUTE"] = "1000000"
+        os.environ[f"{upstream}_BURST"] = "1000000"
+
+
+def pin_scenarios(scenarios: list, today: date = None) -> list:
+    today = today or date.today()
+    pinned = []
+    for scenario in scenarios:
+        scenario = dict(scenario)
+        if "start_date" not in scenario:
+            scenario["start_date"] = (today + timedelta(days=scenario.pop("start_in_days"))).strftime("%Y-%m-%d")
+        pinned.append(scenario)
+    return pinned
+
+
+def load_scenarios(fixtures_dir: str = FIXTURES_DIR) -> list:
+    with open(os.path.join(fixtures_dir, "scenarios.json")) as f:
+        return json.load(f)
+
+
+def save_scenarios(scenarios: list, fixtures_dir: str = FIXTURES_DIR):
+    os.makedirs(fixtures_dir, exist_ok=True)
+    with open(os.path.join(fixtures_dir, "scenarios.json"), "w") as f:
+        json.dump(scenarios, f, indent=1)
+
+
+def trip_params(scenario: dict) -> dict:
+    return {k: v for k, v in scenario.items() if k != "name"}
+
+
+def clear_caches():
+    """Empties every response, prompt and plan cache so the next run goes all the way upstream."""
+    from modules.response_cache import ResponseCache
+    from modules.llm_gemini import prompt_cache
+    from trip_graph.langgraph_flow import plan_cache
+
+    for namespace in ("weather", "flight_records", "hotel_records"):
+        ResponseCache(namespace, 0).clear()
+    prompt_cache.clear()
+    plan_cache.clear()
+
+
+def plan(scenario: dict) -> dict:
+    from trip_graph.langgraph_flow import create_trip_graph
+    return create_trip_graph(**trip_params(scenario))
+
+
+async def aplan(scenario: dict) -> dict:
+    from trip_graph.langgraph_flow import acreate_trip_graph
+    return await acreate_trip_graph(**trip_params(scenario))
+
+
+def nodes() -> list:
+    """(name, runnable) for every node, in graph order."""
+    import importlib
+
+    return [(name, getattr(importlib.import_module(module), factory)()) for name, module, factory in NODES]
+
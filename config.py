@@ -4,12 +4,92 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-GEMINI_API_KEY = os.environ["GEMINI_API_KEY"]
-OPENWEATHER_API_KEY = os.environ["OPENWEATHER_API_KEY"]
-SERPAPI_KEY = os.environ["SERPAPI_KEY"]
+# Missing keys don't stop the app from starting; each client raises when it's first built
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY", "")
+SERPAPI_KEY = os.getenv("SERPAPI_KEY", "")
+
+# Upstream endpoints; override to point the app at local stand-ins (see benchmarks/)
+SERPAPI_BASE_URL = os.getenv("SERPAPI_BASE_URL", "https://serpapi.com").rstrip("/")
+OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org").rstrip("/")
+# Empty means the SDK's default endpoint
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "")
+
+# Shared HTTP transport: per-host pool size, timeouts (seconds) and retry policy for 429/5xx
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 10))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 32))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.05))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 30))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 3))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", 0.5))
+HTTP_BACKOFF_JITTER = float(os.getenv("HTTP_BACKOFF_JITTER", 0.5))
+
+# Local cache for upstream responses; TTLs are in seconds
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+FLIGHT_CACHE_TTL = int(os.getenv("FLIGHT_CACHE_TTL", 30 * 60))
+HOTEL_CACHE_TTL = int(os.getenv("HOTEL_CACHE_TTL", 3 * 60 * 60))
+SERPAPI_CACHE_MAX_ENTRIES = int(os.getenv("SERPAPI_CACHE_MAX_ENTRIES", 2000))
+GEMINI_CACHE_TTL = int(os.getenv("GEMINI_CACHE_TTL", 6 * 60 * 60))
+GEMINI_CACHE_MAX_ENTRIES = int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", 5000))
+# OpenWeather recomputes its daily forecasts every few hours; cached series expire on that boundary
+WEATHER_REFRESH_SECONDS = int(os.getenv("WEATHER_REFRESH_SECONDS", 3 * 60 * 60))
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", 500))
+
+# Gemini calls are routed to generation profiles (see modules/generation_profiles.py). The models
+# behind the small classification-style calls and the itinerary can be swapped independently, and
+# GEMINI_ROUTES remaps tasks to profiles, e.g. "planner=compose,summary=default"
+GEMINI_FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", "gemini-2.5-flash-lite")
+GEMINI_ITINERARY_MODEL = os.getenv("GEMINI_ITINERARY_MODEL", "gemini-2.5-flash-lite")
+GEMINI_ROUTES = os.getenv("GEMINI_ROUTES", "")
+
+# Long trips are planned as a short skeleton (area and theme per day) followed by day blocks
+# generated concurrently; PLANNER_CHUNKED_MIN_DAYS=0 always plans in a single call
+PLANNER_CHUNKED_MIN_DAYS = int(os.getenv("PLANNER_CHUNKED_MIN_DAYS", 6))
+PLANNER_CHUNK_DAYS = int(os.getenv("PLANNER_CHUNK_DAYS", 3))
+PLANNER_CHUNK_CONCURRENCY = int(os.getenv("PLANNER_CHUNK_CONCURRENCY", 4))
+
+# LangGraph checkpoints for incremental re-planning: "memory" or "sqlite" (stored under CACHE_DIR)
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "memory").lower()
+# A session's thread is dropped after CHECKPOINT_THREAD_TTL idle seconds, or when more than
+# CHECKPOINT_MAX_THREADS sessions have one (least recently used first)
+CHECKPOINT_THREAD_TTL = int(os.getenv("CHECKPOINT_THREAD_TTL", 2 * 60 * 60))
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", 500))
+
+# Start planner/flight/hotel work before the weather decision is known (opt-in)
+SPECULATIVE_EXECUTION = os.getenv("SPECULATIVE_EXECUTION", "false").lower() == "true"
+
+# Finished plans are reused for identical requests; flight prices move, so keep them briefly
+PLAN_CACHE_TTL = int(os.getenv("PLAN_CACHE_TTL", 10 * 60))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", 200))
+PLAN_CACHE_MAX_BYTES = int(os.getenv("PLAN_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Plan suggested alternate destinations in the background before the user picks one
+PLAN_PREFETCH = os.getenv("PLAN_PREFETCH", "true").lower() == "true"
+PLAN_PREFETCH_WORKERS = int(os.getenv("PLAN_PREFETCH_WORKERS", 2))
+PLAN_PREFETCH_TTL = int(os.getenv("PLAN_PREFETCH_TTL", 15 * 60))
+PLAN_PREFETCH_MAX_ENTRIES = int(os.getenv("PLAN_PREFETCH_MAX_ENTRIES", 12))
+
+# Trip results are kept server-side and sessions only hold an ID. Past RESULT_STORE_MAX_BYTES, or
+# after RESULT_STORE_IDLE_SECONDS without a look, results are compressed to disk under CACHE_DIR
+RESULT_STORE_MAX_BYTES = int(os.getenv("RESULT_STORE_MAX_BYTES", 256 * 1024 * 1024))
+RESULT_STORE_IDLE_SECONDS = int(os.getenv("RESULT_STORE_IDLE_SECONDS", 15 * 60))
+RESULT_STORE_DISK_TTL = int(os.getenv("RESULT_STORE_DISK_TTL", 24 * 60 * 60))
+
+# Upstream quotas, shared by every session in the process. Calls over the limit queue (interactive
+# plans first, then regenerations, then background prefetch) instead of failing.
+SERPAPI_REQUESTS_PER_MINUTE = float(os.getenv("SERPAPI_REQUESTS_PER_MINUTE", 60))
+SERPAPI_BURST = int(os.getenv("SERPAPI_BURST", 10))
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", 60))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", 10))
+OPENWEATHER_REQUESTS_PER_MINUTE = float(os.getenv("OPENWEATHER_REQUESTS_PER_MINUTE", 60))
+OPENWEATHER_BURST = int(os.getenv("OPENWEATHER_BURST", 20))
+
+# In-process metrics served as Prometheus text (/metrics) and JSON (/metrics.json); port 0 disables
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9464))
 
 os.environ["LANGCHAIN_TRACING_V2"] = os.getenv("LANGCHAIN_TRACING_V2", "true")
 os.environ["LANGCHAIN_API_KEY"] = os.getenv("LANGCHAIN_API_KEY", "")
 os.environ["LANGCHAIN_PROJECT"] = os.getenv("LANGCHAIN_PROJECT", "Intelligent Trip Planner")
 os.environ["LANGSMITH_ENDPOINT"] = os.getenv("LANGSMITH_ENDPOINT", "https://eu.api.smith.langchain.com")
-os.environ["LANGSMITH_WORKSPACE_ID"] = os.getenv("LANGSMITH_WORKSPACE_ID")
+# LANGSMITH_WORKSPACE_ID is read straight from the environment (or .env) when it's set
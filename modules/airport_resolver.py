@@ -0,0 +1,146 @@
+import csv
+import difflib
+import math
+import os
+import re
+import unicodedata
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def normalise_place(name: str) -> str:
+    """Lower-cases a place name and strips accents, punctuation and trailing qualifiers."""
+    text = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode()
+    text = text.split(",")[0].lower()
+    text = re.sub(r"[^a-z0-9 ]+", " ", text)
+    text = re.sub(r"\b(international|airport|city|district)\b", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+class GridIndex:
+    """Buckets points into lat/lon cells so a nearest lookup only scans nearby cells."""
+
+    def __init__(self, cell_degrees: float = 2.0):
+        self.cell = cell_degrees
+        self.cells = {}
+
+    def _key(self, lat, lon):
+        return int(math.floor(lat / self.cell)), int(math.floor(lon / self.cell))
+
+    def add(self, lat, lon, item):
+        self.cells.setdefault(self._key(lat, lon), []).append((lat, lon, item))
+
+    def nearest(self, lat, lon, max_km: float):
+        """Returns (distance_km, item) of the closest point within max_km, or None."""
+        row, col = self._key(lat, lon)
+        # One cell is at least ~111 km * cell tall, so stop once the ring is past max_km
+        max_ring = int(max_km / (111.0 * self.cell)) + 1
+        best = None
+        for ring in range(max_ring + 1):
+            for r in range(row - ring, row + ring + 1):
+                for c in range(col - ring, col + ring + 1):
+                    if max(abs(r - row), abs(c - col)) != ring:
+                        continue
+                    for p_lat, p_lon, item in self.cells.get((r, c), ()):
+                        dist = haversine_km(lat, lon, p_lat, p_lon)
+                        if dist <= max_km and (best is None or dist < best[0]):
+                            best = (dist, item)
+            # Anything in a further ring is at least `ring` cells away
+            if best is not None and best[0] <= ring * 111.0 * self.cell * math.cos(math.radians(min(abs(lat), 80))):
+                break
+        return best
+
+
+class AirportResolver:
+    """
+    Offline city -> IATA lookup built from the bundled airports and cities datasets.
+
+    Lookups go exact name/alias match, then fuzzy match, then nearest airport to a known
+    city without its own airport. Everything is indexed in memory when the resolver is built.
+    """
+
+    def __init__(
+        self,
+        airports_path: str = os.path.join(DATA_DIR, "airports.csv"),
+        cities_path: str = os.path.join(DATA_DIR, "cities.csv"),
+        fuzzy_cutoff: float = 0.85,
+        max_nearest_km: float = 250.0,
+    ):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.max_nearest_km = max_nearest_km
+        self.airports = {}      # IATA -> airport row
+        self.by_name = {}       # normalised city/alias -> IATA
+        self.city_coords = {}   # normalised city/alias -> (lat, lon) for cities without an airport
+        self.spatial = GridIndex()
+
+        with open(airports_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                code = row["iata"].upper()
+                lat, lon = float(row["latitude"]), float(row["longitude"])
+                self.airports[code] = {**row, "latitude": lat, "longitude": lon}
+                self.spatial.add(lat, lon, code)
+                # The first airport listed for a city is its main one, so don't overwrite it
+                for name in [row["city"], row["name"], *row["aliases"].split("|")]:
+                    key = normalise_place(name)
+                    if key:
+                        self.by_name.setdefault(key, code)
+
+        with open(cities_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                coords = (float(row["latitude"]), float(row["longitude"]))
+                for name in [row["city"], *row["aliases"].split("|")]:
+                    key = normalise_place(name)
+                    if key:
+                        self.city_coords.setdefault(key, coords)
+
+        self._fuzzy_keys = list(self.by_name) + list(self.city_coords)
+
+    def _lookup_key(self, key: str):
+        if key in self.by_name:
+            return self.by_name[key]
+        if key in self.city_coords:
+            found = self.spatial.nearest(*self.city_coords[key], max_km=self.max_nearest_km)
+            if found:
+                return found[1]
+        return None
+
+    def resolve(self, city_name: str):
+        """
+        Returns (iata_code, how) where how is "code", "exact", "fuzzy" or "nearest",
+        or (None, None) when the city isn't covered by the dataset.
+        """
+        raw = (city_name or "").strip()
+        if len(raw) == 3 and raw.upper() in self.airports:
+            return raw.upper(), "code"
+
+        key = normalise_place(raw)
+        if not key:
+            return None, None
+        if key in self.by_name:
+            return self.by_name[key], "exact"
+        if key in self.city_coords:
+            code = self._lookup_key(key)
+            return (code, "nearest") if code else (None, None)
+
+        close = difflib.get_close_matches(key, self._fuzzy_keys, n=1, cutoff=self.fuzzy_cutoff)
+        if close:
+            code = self._lookup_key(close[0])
+            if code:
+                return code, "fuzzy"
+        return None, None
+
+    def nearest_airport(self, lat: float, lon: float, max_km: float = None):
+        """Returns (iata_code, distance_km) of the closest bundled airport, or (None, None)."""
+        found = self.spatial.nearest(lat, lon, max_km=max_km or self.max_nearest_km)
+        if not found:
+            return None, None
+        return found[1], round(found[0], 1)
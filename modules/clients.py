@@ -0,0 +1,53 @@
+import threading
+
+# Lazily built, process-wide clients. Nothing is constructed (and google.genai, the SQLite caches
+# etc. aren't even imported) until the first call that needs it; after that every node shares
+# the same instance.
+DEFAULT_GEMINI_MODEL = "gemini-2.5-flash-lite"
+
+_lock = threading.RLock()  # re-entrant: building FlightSearch builds the Gemini client
+_shared = {}
+
+
+def shared(key, build):
+    """Returns the object registered under key, calling build() to create it on first use."""
+    value = _shared.get(key)
+    if value is None:
+        with _lock:
+            value = _shared.get(key)
+            if value is None:
+                value = _shared[key] = build()
+    return value
+
+
+def built() -> list:
+    """Keys of everything constructed so far (handy when checking what startup paid for)."""
+    return [str(key) for key in list(_shared)]
+
+
+def gemini(model_name: str = DEFAULT_GEMINI_MODEL):
+    def _build():
+        from .llm_gemini import GeminiLLM
+        return GeminiLLM(model_name)
+    return shared(("gemini", model_name), _build)
+
+
+def weather():
+    def _build():
+        from .weather_api import WeatherClient
+        return WeatherClient()
+    return shared("weather", _build)
+
+
+def flights():
+    def _build():
+        from .flight_api import FlightSearch
+        return FlightSearch()
+    return shared("flights", _build)
+
+
+def hotels():
+    def _build():
+        from .hotel_api import HotelSearch
+        return HotelSearch()
+    return shared("hotels", _build)
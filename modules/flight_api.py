@@ -1,30 +1,67 @@
 import os
-import requests
-from .llm_gemini import GeminiLLM
-from config import SERPAPI_KEY
+import asyncio
+from . import clients
+from .airport_resolver import AirportResolver
+from .response_cache import ResponseCache
+from .http_transport import transport
+from .metrics import registry
+from .travel_records import FlightOption, normalise_flights, to_cache
+from config import SERPAPI_KEY, SERPAPI_BASE_URL, FLIGHT_CACHE_TTL, SERPAPI_CACHE_MAX_ENTRIES
+
+# Airport codes practically never change, so keep Gemini's answers for a month
+IATA_CACHE_TTL = 30 * 24 * 60 * 60
 
 class FlightSearch:
     def __init__(self):
-        self.gemini = GeminiLLM()
-        self.serp_base = "https://serpapi.com/search"
+        if not SERPAPI_KEY:
+            raise ValueError("SERPAPI_KEY not found. Ensure it's set in your environment or config.")
+        self.airports = AirportResolver()
+        # Holds normalised FlightOptions, not raw SerpAPI responses
+        self.cache = ResponseCache("flight_records", FLIGHT_CACHE_TTL, SERPAPI_CACHE_MAX_ENTRIES)
+        self.http = transport
+        self.serp_base = f"{SERPAPI_BASE_URL}/search"
 
-    def get_airport_code_from_gemini(self, city_name: str):
-        search_params = {
+    @property
+    def gemini(self):
+        # Only needed when the offline resolver misses, so it's built on first use
+        return clients.gemini()
+
+    def get_airport_code(self, city_name: str):
+        """
+        Resolves a city to its IATA code from the bundled airports dataset, falling back
+        to the SerpAPI + Gemini lookup only when the offline resolver has no match.
+        """
+        iata_code, how = self.airports.resolve(city_name)
+        if iata_code:
+            registry.inc("iata_lookups_total", source=how)
+            return iata_code
+        print(f"---Airport resolver missed {city_name}, falling back to SerpAPI + Gemini---")
+        registry.inc("iata_lookups_total", source="gemini")
+        return self.get_airport_code_from_gemini(city_name)
+
+    async def aget_airport_code(self, city_name: str):
+        """Async counterpart of get_airport_code."""
+        iata_code, how = self.airports.resolve(city_name)
+        if iata_code:
+            registry.inc("iata_lookups_total", source=how)
+            return iata_code
+        print(f"---Airport resolver missed {city_name}, falling back to SerpAPI + Gemini---")
+        registry.inc("iata_lookups_total", source="gemini")
+        return await self.aget_airport_code_from_gemini(city_name)
+
+    def _iata_search_params(self, city_name: str) -> dict:
+        return {
             "engine": "google",
             "q": f"{city_name} airport IATA code",
             "api_key": SERPAPI_KEY
         }
 
-        serp_resp = requests.get(self.serp_base, params=search_params)
-        if serp_resp.status_code != 200:
-            raise Exception(f"SerpApi failed to fetch search results for {city_name}")
-
-        serp_data = serp_resp.json()
+    def _iata_prompt(self, city_name: str, serp_data: dict) -> str:
         snippets = " ".join(
             [r.get("snippet", "") for r in serp_data.get("organic_results", [])]
         )
 
-        prompt = f"""
+        return f"""
         You are a travel assistant. Based on the following Google search result snippets, 
         identify the 3-letter IATA airport code for the city "{city_name}".
         If multiple airports exist, choose the main international one.
@@ -33,16 +70,32 @@ class FlightSearch:
         Search snippets:
         {snippets}
         """
-        iata_code = self.gemini.generate(prompt).strip().upper()
+
+    def _parse_iata(self, city_name: str, response: str) -> str:
+        iata_code = response.strip().upper()
         if len(iata_code) == 3 and iata_code.isalpha():
             return iata_code
         raise ValueError(f"Gemini could not determine IATA code for {city_name}")
 
-    def get_flights(self, origin, destination, date):
-        origin_code = self.get_airport_code_from_gemini(origin)
-        destination_code = self.get_airport_code_from_gemini(destination)
-        
-        params = {
+    def get_airport_code_from_gemini(self, city_name: str):
+        serp_resp = self.http.get(self.serp_base, params=self._iata_search_params(city_name))
+        if serp_resp.status_code != 200:
+            raise Exception(f"SerpApi failed to fetch search results for {city_name}")
+
+        prompt = self._iata_prompt(city_name, serp_resp.json())
+        return self._parse_iata(city_name, self.gemini.generate(prompt, cache_ttl=IATA_CACHE_TTL, task="iata"))
+
+    async def aget_airport_code_from_gemini(self, city_name: str):
+        """Async counterpart of get_airport_code_from_gemini."""
+        serp_resp = await self.http.aget(self.serp_base, params=self._iata_search_params(city_name))
+        if serp_resp.status_code != 200:
+            raise Exception(f"SerpApi failed to fetch search results for {city_name}")
+
+        prompt = self._iata_prompt(city_name, serp_resp.json())
+        return self._parse_iata(city_name, await self.gemini.agenerate(prompt, cache_ttl=IATA_CACHE_TTL, task="iata"))
+
+    def _flight_params(self, origin_code, destination_code, date) -> dict:
+        return {
             "gl": "in",
             "hl": "en",
             "engine": "google_flights",
@@ -53,16 +106,67 @@ class FlightSearch:
             "type": "2",
             "api_key": SERPAPI_KEY
         }
+
+    def _cached_flights(self, cache_key):
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return None
+        return [FlightOption.from_dict(option) for option in cached]
+
+    def _store_flights(self, cache_key, data):
+        # SerpApi reports some failures as a 200 with an "error" field; never cache those
+        if "error" in data:
+            print(f"---Flight search failed: {data['error']}---")
+            return []
+        # Only the compact options are kept; the raw payload goes no further than this
+        options = normalise_flights(data)
+        self.cache.set(cache_key, to_cache(options))
+        return options
+
+    def get_flights(self, origin, destination, date):
+        origin_code = self.get_airport_code(origin)
+        destination_code = self.get_airport_code(destination)
+        
+        params = self._flight_params(origin_code, destination_code, date)
+        cache_key = self.cache.key(params)
+        cached = self._cached_flights(cache_key)
+        if cached is not None:
+            return cached
+
         # print("Fetching Data...")
-        response = requests.get(self.serp_base, params=params)
+        response = self.http.get(self.serp_base, params=params)
         # print("Response", response)
         # if response.status_code != 200:
         #     raise Exception("Failed to fetch flight data")
         response.raise_for_status() 
-        return response.json()
+        return self._store_flights(cache_key, response.json())
+
+    async def aget_flights(self, origin, destination, date):
+        """Async counterpart of get_flights; both IATA lookups run concurrently."""
+        origin_code, destination_code = await asyncio.gather(
+            self.aget_airport_code(origin), self.aget_airport_code(destination)
+        )
+
+        params = self._flight_params(origin_code, destination_code, date)
+        cache_key = self.cache.key(params)
+        cached = self._cached_flights(cache_key)
+        if cached is not None:
+            return cached
+
+        response = await self.http.aget(self.serp_base, params=params)
+        response.raise_for_status()
+        return self._store_flights(cache_key, response.json())
     
     def get_round_trip_flights(self, source, destination, start_date, end_date):
         # print("API calling...")
         onward = self.get_flights(source, destination, start_date)
         return_ = self.get_flights(destination, source, end_date)
-        return {"onward": onward, "return": return_}    
+        return {"onward": onward, "return": return_}
+
+    async def aget_round_trip_flights(self, source, destination, start_date, end_date):
+        """Async counterpart of get_round_trip_flights; onward and return legs are searched concurrently."""
+        onward, return_ = await asyncio.gather(
+            self.aget_flights(source, destination, start_date),
+            self.aget_flights(destination, source, end_date),
+        )
+        return {"onward": onward, "return": return_}
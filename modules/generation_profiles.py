@@ -0,0 +1,93 @@
+from dataclasses import dataclass, replace
+
+from config import GEMINI_FAST_MODEL, GEMINI_ITINERARY_MODEL, GEMINI_ROUTES
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    """
+    How one kind of Gemini call is made. model=None uses the client's own model, and
+    thinking_budget=None leaves thinking at the model's default.
+    """
+    name: str
+    model: str = None
+    grounding: bool = False           # attach the Google Search tool (plain-text calls only)
+    max_output_tokens: int = None
+    temperature: float = None
+    thinking_budget: int = None
+
+    def options(self) -> dict:
+        """The settings that change the response, for cache and single-flight keys."""
+        return {
+            "grounding": self.grounding,
+            "max_output_tokens": self.max_output_tokens,
+            "temperature": self.temperature,
+            "thinking_budget": self.thinking_budget,
+        }
+
+
+PROFILES = {
+    # Short, deterministic answers: IATA codes, yes/no decisions. Cheapest model, no search, no thinking.
+    "classify": GenerationProfile(
+        "classify", model=GEMINI_FAST_MODEL, max_output_tokens=256, temperature=0.0, thinking_budget=0
+    ),
+    # A few paragraphs of JSON built from what's already in the prompt
+    "compose": GenerationProfile(
+        "compose", model=GEMINI_FAST_MODEL, max_output_tokens=2048, temperature=0.4, thinking_budget=0
+    ),
+    # Open-ended suggestions, where a bit of variety helps
+    "suggest": GenerationProfile(
+        "suggest", model=GEMINI_FAST_MODEL, max_output_tokens=2048, temperature=0.9, thinking_budget=0
+    ),
+    # Day-by-day plans of up to a few weeks; needs room for every day
+    "itinerary": GenerationProfile(
+        "itinerary", model=GEMINI_ITINERARY_MODEL, max_output_tokens=16384, temperature=0.7, thinking_budget=0
+    ),
+    # Anything not routed below: the client's model with search grounding, as before profiles existed
+    "default": GenerationProfile("default", grounding=True),
+}
+
+# Which profile each call goes to, by task (call sites name theirs; otherwise the calling graph node)
+ROUTES = {
+    "iata": "classify",
+    "weather_decision": "classify",
+    "planner": "itinerary",
+    "planner_skeleton": "compose",
+    "planner_chunk": "itinerary",
+    "summary": "compose",
+    "alternate_suggestions": "suggest",
+}
+
+
+def _parse_routes(spec: str) -> dict:
+    # "planner=compose,summary=default"
+    routes = {}
+    for item in spec.split(","):
+        task, _, profile = item.partition("=")
+        if task.strip() and profile.strip():
+            routes[task.strip()] = profile.strip()
+    return routes
+
+
+ROUTES.update(_parse_routes(GEMINI_ROUTES))
+
+
+def profile_for(task: str = None) -> GenerationProfile:
+    name = ROUTES.get(task or "", "default")
+    if name not in PROFILES:
+        print(f"---Unknown generation profile {name} for {task}; using default---")
+        name = "default"
+    return PROFILES[name]
+
+
+def resolve(profile=None, task: str = None, use_google_search: bool = None) -> GenerationProfile:
+    """
+    The profile for one call: an explicit profile (name or GenerationProfile) wins, then the
+    route for the task. use_google_search, when given, overrides the profile's grounding.
+    """
+    if isinstance(profile, str):
+        profile = PROFILES[profile]
+    profile = profile or profile_for(task)
+    if use_google_search is not None and use_google_search != profile.grounding:
+        profile = replace(profile, grounding=use_google_search)
+    return profile
@@ -1,26 +1,21 @@
-import requests
 from datetime import datetime, timedelta
-from config import SERPAPI_KEY
+from config import SERPAPI_KEY, SERPAPI_BASE_URL, HOTEL_CACHE_TTL, SERPAPI_CACHE_MAX_ENTRIES
+from .response_cache import ResponseCache
+from .http_transport import transport
+from .travel_records import Hotel, normalise_hotels, to_cache
 
 class HotelSearch:
-    BASE_URL = "https://serpapi.com/search"
+    BASE_URL = f"{SERPAPI_BASE_URL}/search"
 
     def __init__(self):
+        if not SERPAPI_KEY:
+            raise ValueError("SERPAPI_KEY not found. Ensure it's set in your environment or config.")
         self.api_key = SERPAPI_KEY
+        self.http = transport
+        # Holds normalised Hotels, not raw SerpAPI properties
+        self.cache = ResponseCache("hotel_records", HOTEL_CACHE_TTL, SERPAPI_CACHE_MAX_ENTRIES)
 
-    def search_hotels(
-        self,
-        query: str,
-        check_in: str,
-        check_out: str,
-        adults:str,
-        budget: str,
-        num_hotels: int = 5,
-    ):
-        """
-        Search for hotels in a city (query) between check_in and check_out dates.
-        Returns top N hotel entries with relevant data.
-        """
+    def _search_params(self, query, check_in, check_out, adults, budget) -> dict:
         match budget:
             case "Low":
                 hotel_class = 2
@@ -31,7 +26,7 @@ class HotelSearch:
             case "Luxury":
                 hotel_class = 5
                 
-        params = {
+        return {
             "hl": "en",
             "engine": "google_hotels",
             "q": query,
@@ -42,10 +37,67 @@ class HotelSearch:
             "currency": "INR",
             "api_key": self.api_key,
         }
-        res = requests.get(self.BASE_URL, params=params)
+
+    def _cached_hotels(self, cache_key):
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return None
+        return [Hotel.from_dict(hotel) for hotel in cached]
+
+    def _store_hotels(self, cache_key, data, num_hotels):
+        # SerpApi reports some failures (e.g. no results) as a 200 with an "error" field; never cache those
+        if "error" in data:
+            print(f"---Hotel search failed: {data['error']}---")
+            return []
+        hotels = data.get("properties") or []
+        # Return top num_hotels, as compact records; the raw properties are dropped here
+        top_hotels = normalise_hotels(hotels[:num_hotels])
+        # An empty list is as likely a hiccup as a real answer; ask again next time
+        if top_hotels:
+            self.cache.set(cache_key, to_cache(top_hotels))
+        return top_hotels
+
+    def search_hotels(
+        self,
+        query: str,
+        check_in: str,
+        check_out: str,
+        adults:str,
+        budget: str,
+        num_hotels: int = 5,
+    ):
+        """
+        Search for hotels in a city (query) between check_in and check_out dates.
+        Returns top N hotel entries with relevant data.
+        """
+        params = self._search_params(query, check_in, check_out, adults, budget)
+        cache_key = self.cache.key({**params, "num_hotels": num_hotels})
+        cached = self._cached_hotels(cache_key)
+        if cached is not None:
+            return cached
+
+        res = self.http.get(self.BASE_URL, params=params)
+        if res.status_code != 200:
+            raise Exception(f"Hotel search failed: {res.text}")
+        return self._store_hotels(cache_key, res.json(), num_hotels)
+
+    async def asearch_hotels(
+        self,
+        query: str,
+        check_in: str,
+        check_out: str,
+        adults:str,
+        budget: str,
+        num_hotels: int = 5,
+    ):
+        """Async counterpart of search_hotels."""
+        params = self._search_params(query, check_in, check_out, adults, budget)
+        cache_key = self.cache.key({**params, "num_hotels": num_hotels})
+        cached = self._cached_hotels(cache_key)
+        if cached is not None:
+            return cached
+
+        res = await self.http.aget(self.BASE_URL, params=params)
         if res.status_code != 200:
             raise Exception(f"Hotel search failed: {res.text}")
-        data = res.json()
-        hotels = data.get("properties")
-        # Return top num_hotels
-        return hotels[:num_hotels]
+        return self._store_hotels(cache_key, res.json(), num_hotels)
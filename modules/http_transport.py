@@ -0,0 +1,257 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+from collections import Counter
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from .single_flight import SingleFlight
+from .rate_limiter import limiter_for_host, limiter_stats, upstream_for_host
+from .metrics import registry, observe_upstream
+from config import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_FACTOR,
+    HTTP_BACKOFF_JITTER,
+)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HttpTransport:
+    """
+    Pooled HTTP transport shared by the weather, flight and hotel clients.
+
+    One HTTPAdapter (and so one urllib3 pool per host) is shared by every thread, while each
+    thread gets its own requests.Session on top of it, since sessions aren't thread-safe.
+    GETs retry on 429/5xx and connection errors with jittered exponential backoff, and every
+    request has a connect and a read timeout. Retries are made here rather than by urllib3 so
+    that each attempt takes a token from the host's rate limiter, like the first one. The
+    async side keeps one httpx.AsyncClient per event loop.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = HTTP_POOL_CONNECTIONS,
+        pool_maxsize: int = HTTP_POOL_MAXSIZE,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = HTTP_READ_TIMEOUT,
+        max_retries: int = HTTP_MAX_RETRIES,
+        backoff_factor: float = HTTP_BACKOFF_FACTOR,
+        backoff_jitter: float = HTTP_BACKOFF_JITTER,
+    ):
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+
+        # pool_block makes threads wait for a free connection instead of opening throwaway ones.
+        # No urllib3 retries: _get retries itself, so every attempt goes through the limiter.
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=0,
+            pool_block=True,
+        )
+        self._local = threading.local()
+        self._async_clients = weakref.WeakKeyDictionary()
+
+        self._lock = threading.Lock()
+        self.requests = Counter()   # per host
+        self.errors = Counter()     # per host
+        self.retries = Counter()    # per host
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        # Identical GETs issued at the same moment (e.g. many sessions asking for the same
+        # city) share one request. Sync and async responses are different types, so they
+        # never share with each other.
+        self._single_flight = SingleFlight("http")
+
+    # --- sync ---
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            self._local.session = session
+        return session
+
+    def _begin(self, host):
+        with self._lock:
+            self.requests[host] += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _end(self, host, retries=0, failed=False):
+        if retries:
+            registry.inc("upstream_retries_total", retries, upstream=upstream_for_host(host))
+        with self._lock:
+            self.in_flight -= 1
+            self.retries[host] += retries
+            if failed:
+                self.errors[host] += 1
+
+    @staticmethod
+    def _flight_key(mode, url, params):
+        # Exact match on every parameter, credentials included; the key only lives as long as the request
+        return (mode, url, tuple(sorted((str(k), str(v)) for k, v in (params or {}).items())))
+
+    def _backoff(self, attempt: int, retry_after: str = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff_factor * (2 ** attempt) + random.uniform(0, self.backoff_jitter)
+
+    def get(self, url: str, params: dict = None, timeout=None, **kwargs) -> requests.Response:
+        """GET through the shared pool; identical concurrent GETs share one request."""
+        if kwargs:
+            return self._get(url, params, timeout, **kwargs)
+        return self._single_flight.do(
+            self._flight_key("GET", url, params), lambda: self._get(url, params, timeout)
+        )
+
+    def _get(self, url: str, params: dict = None, timeout=None, **kwargs) -> requests.Response:
+        host = urlsplit(url).netloc
+        # Only the request that actually goes out spends quota; dedup'd callers never get here
+        limiter = limiter_for_host(host)
+        if limiter is not None:
+            limiter.acquire()
+        self._begin(host)
+        started = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                # A retry is another request against the quota; it waits for its own token
+                if attempt and limiter is not None:
+                    limiter.acquire()
+                try:
+                    response = self._session().get(url, params=params, timeout=timeout or self.timeout, **kwargs)
+                except (requests.ConnectionError, requests.Timeout):
+                    if attempt >= self.max_retries:
+                        raise
+                    time.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    response.close()
+                    time.sleep(self._backoff(attempt, response.headers.get("Retry-After")))
+                    attempt += 1
+                    continue
+                self._end(host, retries=attempt, failed=response.status_code >= 400)
+                observe_upstream(
+                    upstream_for_host(host), started, str(response.status_code),
+                    len(response.request.url), len(response.content),
+                )
+                return response
+        except Exception:
+            self._end(host, retries=attempt, failed=True)
+            observe_upstream(upstream_for_host(host), started, "error")
+            raise
+
+    # --- async ---
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+                limits=httpx.Limits(
+                    max_connections=self.pool_maxsize * 4,
+                    max_keepalive_connections=self.pool_maxsize,
+                ),
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def aget(self, url: str, params: dict = None, timeout=None, **kwargs) -> httpx.Response:
+        """Async counterpart of get, with the same retry policy and in-flight dedup."""
+        if kwargs:
+            return await self._aget(url, params, timeout, **kwargs)
+        return await self._single_flight.ado(
+            self._flight_key("AGET", url, params), lambda: self._aget(url, params, timeout)
+        )
+
+    async def _aget(self, url: str, params: dict = None, timeout=None, **kwargs) -> httpx.Response:
+        host = urlsplit(url).netloc
+        client = self._async_client()
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        limiter = limiter_for_host(host)
+        if limiter is not None:
+            await limiter.aacquire()
+        self._begin(host)
+        started = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                if attempt and limiter is not None:
+                    await limiter.aacquire()
+                try:
+                    response = await client.get(url, params=params, **kwargs)
+                except httpx.TransportError:
+                    if attempt >= self.max_retries:
+                        raise
+                    await asyncio.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    await asyncio.sleep(self._backoff(attempt, response.headers.get("Retry-After")))
+                    attempt += 1
+                    continue
+                self._end(host, retries=attempt, failed=response.status_code >= 400)
+                observe_upstream(
+                    upstream_for_host(host), started, str(response.status_code),
+                    len(str(response.request.url)), len(response.content),
+                )
+                return response
+        except Exception:
+            self._end(host, retries=attempt, failed=True)
+            observe_upstream(upstream_for_host(host), started, "error")
+            raise
+
+    # --- metrics ---
+    def pool_stats(self) -> dict:
+        """Connections opened, requests served, idle and checked-out connections for each host pool."""
+        pools = {}
+        manager = self._adapter.poolmanager
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            # The pool queue is pre-filled with None placeholders; real entries are idle connections
+            slots = list(pool.pool.queue) if pool.pool is not None else []
+            pools[f"{pool.scheme}://{pool.host}"] = {
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle": sum(1 for conn in slots if conn is not None),
+                "in_use": self.pool_maxsize - len(slots),
+                "maxsize": self.pool_maxsize,
+            }
+        return pools
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                "errors": dict(self.errors),
+                "retries": dict(self.retries),
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "single_flight": self._single_flight.stats(),
+                "pools": self.pool_stats(),
+            }
+
+
+# One transport for the whole process so every client shares the same pools
+transport = HttpTransport()
+registry.register_collector("http", transport.stats)
+registry.register_collector("rate_limit", limiter_stats)
@@ -1,7 +1,112 @@
-from google import genai
-from google.genai import types
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from pydantic import ValidationError
+
+from config import GEMINI_API_KEY, GEMINI_BASE_URL, GEMINI_CACHE_TTL, GEMINI_CACHE_MAX_ENTRIES
+from .response_cache import ResponseCache
+from .single_flight import SingleFlight
+from .rate_limiter import limiters
+from .metrics import registry, observe_upstream, current_node
+from .generation_profiles import resolve
+
+
+class PromptCache:
+    """
+    Two-tier memo for GeminiLLM.generate: a small in-process LRU in front of the
+    SQLite-backed ResponseCache, so repeated prompts survive restarts and are shared
+    between worker processes.
+    """
+
+    def __init__(self, max_memory_entries: int = 256):
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()  # key -> (expires_at, text)
+        self._lock = threading.Lock()
+        self._persistent = ResponseCache("gemini", GEMINI_CACHE_TTL, GEMINI_CACHE_MAX_ENTRIES)
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, prompt: str, tools: list, options: dict = None) -> str:
+        # Prompts come from indented f-string templates, so whitespace differences don't matter
+        normalised = " ".join(prompt.split())
+        payload = {"model": model, "prompt": normalised, "tools": sorted(tools)}
+        if options:
+            # Generation settings of the profile; the same prompt under another profile is another response
+            payload["options"] = options
+        payload = json.dumps(payload, sort_keys=True)
+        return f"gemini:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    registry.inc("cache_lookups_total", cache="prompt", result="memory_hit")
+                    return entry[1]
+                del self._memory[key]
+
+        entry = self._persistent.get_entry(key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            registry.inc("cache_lookups_total", cache="prompt", result="miss")
+            return None
+        # Promote to the memory tier, expiring when the persistent row does
+        text, expires_at = entry
+        self._remember(key, text, expires_at)
+        with self._lock:
+            self.persistent_hits += 1
+        registry.inc("cache_lookups_total", cache="prompt", result="persistent_hit")
+        return text
+
+    def set(self, key: str, text: str, ttl_seconds: int):
+        self._remember(key, text, time.time() + ttl_seconds)
+        self._persistent.set(key, text, ttl_seconds=ttl_seconds)
+
+    def _remember(self, key, text, expires_at):
+        with self._lock:
+            self._memory[key] = (expires_at, text)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        self._persistent.clear()
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        hits = self.memory_hits + self.persistent_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "persistent": self._persistent.stats(),
+        }
+
+
+# Shared by every GeminiLLM instance in the process
+prompt_cache = PromptCache()
+# Identical prompts that are generated at the same moment share one API call (keyed like the cache)
+gemini_single_flight = SingleFlight("gemini")
+registry.register_collector("prompt_cache", prompt_cache.stats)
+registry.register_collector("gemini_single_flight", gemini_single_flight.stats)
+registry.describe("gemini_calls_total", "Gemini calls by generation profile, model and result")
+registry.describe("gemini_call_duration_seconds", "Gemini API latency by generation profile and model")
 
-from config import GEMINI_API_KEY
 
 class GeminiLLM:
     """A wrapper class for the Google Gemini API."""
@@ -9,33 +114,300 @@ class GeminiLLM:
     def __init__(self, model_name="gemini-2.5-flash-lite"):
         if not GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY not found. Ensure it's set in your environment or config.")
-        
-        self.client = genai.Client(api_key=GEMINI_API_KEY)
+
+        # google.genai takes the better part of a second to import, so it's loaded with the first client
+        from google import genai
+        from google.genai import types
+
+        self._http_options = types.HttpOptions(base_url=GEMINI_BASE_URL) if GEMINI_BASE_URL else None
+        self.client = genai.Client(api_key=GEMINI_API_KEY, http_options=self._http_options)
         self.model = model_name
+        self._aio_clients = weakref.WeakKeyDictionary()
+
+    def _aio(self):
+        """
+        The SDK's async client for the running event loop. Its connections stay bound to the loop
+        that opened them, so reusing one across asyncio.run calls fails with "Event loop is closed".
+        """
+        from google import genai
+
+        loop = asyncio.get_running_loop()
+        aio = self._aio_clients.get(loop)
+        if aio is None:
+            aio = genai.Client(api_key=GEMINI_API_KEY, http_options=self._http_options).aio
+            self._aio_clients[loop] = aio
+        return aio
+
+    @staticmethod
+    def _observe(started, prompt, profile, model, text=None, usage=None, failed=False):
+        """Records latency, payload sizes and token counts of one API call, per calling node and profile."""
+        status = "error" if failed else "ok"
+        observe_upstream("gemini", started, status, len(prompt.encode()), len((text or "").encode()))
+        registry.observe("gemini_call_duration_seconds", time.perf_counter() - started, profile=profile.name, model=model)
+        registry.inc("gemini_calls_total", profile=profile.name, model=model, result=status)
+        node = current_node.get()
+        for kind, field in (("prompt", "prompt_token_count"), ("output", "candidates_token_count"),
+                            ("thinking", "thoughts_token_count")):
+            count = getattr(usage, field, None)
+            if count:
+                registry.inc("gemini_tokens_total", count, node=node, kind=kind)
+                registry.observe(f"gemini_{kind}_tokens", count, node=node)
+
+    def _prepare(self, prompt, use_google_search, cache_ttl, bypass_cache, response_schema=None, task=None, profile=None):
+        """
+        Picks the generation profile, builds the request config and cache key, and returns a cached
+        response if there is one.
+        """
+        from google.genai import types
+
+        profile = resolve(profile, task or current_node.get(), use_google_search)
+        model = profile.model or self.model
+        settings = {}
+        if profile.max_output_tokens is not None:
+            settings["max_output_tokens"] = profile.max_output_tokens
+        if profile.temperature is not None:
+            settings["temperature"] = profile.temperature
+        if profile.thinking_budget is not None:
+            settings["thinking_config"] = types.ThinkingConfig(thinking_budget=profile.thinking_budget)
+
+        if response_schema is not None:
+            # Gemini can't combine JSON mode with tools, so structured calls go without grounding
+            config = types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=response_schema,
+                **settings,
+            )
+            tools = [f"schema:{response_schema.__name__}"]
+        elif profile.grounding:
+            # Define the tool for Google Search grounding if requested
+            grounding_tool = types.Tool(google_search=types.GoogleSearch())
+            config = types.GenerateContentConfig(tools=[grounding_tool], **settings)
+            tools = ["google_search"]
+        else:
+            config = types.GenerateContentConfig(**settings)
+            tools = []
+
+        ttl = GEMINI_CACHE_TTL if cache_ttl is None else cache_ttl
+        cache_key = prompt_cache.key(model, prompt, tools, profile.options())
+        cached = None
+        if ttl > 0 and not bypass_cache:
+            cached = prompt_cache.get(cache_key)
+            if cached is not None:
+                registry.inc("gemini_calls_total", profile=profile.name, model=model, result="cached")
+        return config, profile, model, cache_key, ttl, cached
+
+    def _remember(self, cache_key, ttl, text):
+        # Only successful responses reach the cache; the error string from generate never does
+        if ttl > 0 and text:
+            prompt_cache.set(cache_key, text, ttl)
+        return text
+
+    @staticmethod
+    def parse_structured(text: str, response_schema):
+        """Validates a JSON response against its schema, returning None if it doesn't fit."""
+        try:
+            return response_schema.model_validate_json(text)
+        except (ValidationError, ValueError) as e:
+            print(f"Structured response did not match {response_schema.__name__}: {e}")
+            return None
+
+    def _finish(self, cache_key, ttl, text, response_schema):
+        if response_schema is None:
+            return self._remember(cache_key, ttl, text)
+        parsed = self.parse_structured(text, response_schema)
+        # Responses that fail validation are never cached, same as errors
+        if parsed is not None:
+            self._remember(cache_key, ttl, text)
+        return parsed
 
-    def generate(self, prompt: str, use_google_search: bool = False) -> str:
+    def generate(
+        self,
+        prompt: str,
+        use_google_search: bool = None,
+        cache_ttl: int = None,
+        bypass_cache: bool = False,
+        response_schema=None,
+        task: str = None,
+        profile=None,
+    ):
         """
         Generates a response from the Gemini model.
 
         Args:
             prompt (str): The input prompt for the model.
-            use_google_search (bool): If True, enables Google Search for grounding.
+            use_google_search (bool): Turns Google Search grounding on or off for this call,
+                overriding the profile. Structured calls are never grounded.
+            cache_ttl (int): Seconds to keep the response in the prompt cache. Defaults to
+                GEMINI_CACHE_TTL; 0 disables caching for this call.
+            bypass_cache (bool): Skip the cache lookup (e.g. for "Regenerate") but still
+                store the fresh response.
+            response_schema: Optional pydantic model. When given, the model is asked for JSON
+                matching it (response_mime_type="application/json") and the validated object
+                is returned.
+            task (str): What the call is for ("planner", "iata", ...); picks the generation
+                profile through ROUTES in modules/generation_profiles.py. Defaults to the
+                calling graph node.
+            profile: A profile name or GenerationProfile to use instead of the routed one.
 
         Returns:
             str: The generated text response, or an error message.
+            With response_schema: an instance of the schema, or None on failure.
         """
-        # Define the tool for Google Search grounding if requested
-        grounding_tool = types.Tool(google_search=types.GoogleSearch())
-        config = types.GenerateContentConfig(tools=[grounding_tool])
+        config, profile, model, cache_key, ttl, cached = self._prepare(
+            prompt, use_google_search, cache_ttl, bypass_cache, response_schema, task, profile
+        )
+        if cached is not None:
+            return cached if response_schema is None else self.parse_structured(cached, response_schema)
 
         try:
             # Generate content with a single, clean API call
-            response = self.client.models.generate_content(model=self.model, contents=prompt, config=config)
-            
-            # Safely return the generated text
-            return response.text.strip()
+            def _call():
+                limiters["gemini"].acquire()
+                started = time.perf_counter()
+                try:
+                    response = self.client.models.generate_content(model=model, contents=prompt, config=config)
+                except Exception:
+                    self._observe(started, prompt, profile, model, failed=True)
+                    raise
+                # Safely return the generated text
+                text = response.text.strip()
+                self._observe(started, prompt, profile, model, text, getattr(response, "usage_metadata", None))
+                return text
+
+            text = gemini_single_flight.do(cache_key, _call)
 
         except Exception as e:
             # Handle any other exceptions during the API call
             print(f"An error occurred during content generation: {e}")
-            return f"Error: Could not generate a response. Details: {e}"
\ No newline at end of file
+            if response_schema is not None:
+                return None
+            return f"Error: Could not generate a response. Details: {e}"
+
+        return self._finish(cache_key, ttl, text, response_schema)
+
+    async def agenerate(
+        self,
+        prompt: str,
+        use_google_search: bool = None,
+        cache_ttl: int = None,
+        bypass_cache: bool = False,
+        response_schema=None,
+        task: str = None,
+        profile=None,
+    ):
+        """Async counterpart of generate, using the SDK's aio client."""
+        config, profile, model, cache_key, ttl, cached = self._prepare(
+            prompt, use_google_search, cache_ttl, bypass_cache, response_schema, task, profile
+        )
+        if cached is not None:
+            return cached if response_schema is None else self.parse_structured(cached, response_schema)
+
+        try:
+            async def _acall():
+                await limiters["gemini"].aacquire()
+                started = time.perf_counter()
+                try:
+                    response = await self._aio().models.generate_content(model=model, contents=prompt, config=config)
+                except Exception:
+                    self._observe(started, prompt, profile, model, failed=True)
+                    raise
+                text = response.text.strip()
+                self._observe(started, prompt, profile, model, text, getattr(response, "usage_metadata", None))
+                return text
+
+            text = await gemini_single_flight.ado(cache_key, _acall)
+
+        except Exception as e:
+            print(f"An error occurred during content generation: {e}")
+            if response_schema is not None:
+                return None
+            return f"Error: Could not generate a response. Details: {e}"
+
+        return self._finish(cache_key, ttl, text, response_schema)
+
+    def generate_stream(
+        self,
+        prompt: str,
+        use_google_search: bool = None,
+        cache_ttl: int = None,
+        bypass_cache: bool = False,
+        response_schema=None,
+        task: str = None,
+        profile=None,
+    ):
+        """
+        Streams the response as text chunks using the SDK's streaming generate.
+
+        The full text is cached once the stream completes; a cached response is yielded as a
+        single chunk. On failure the same error string as generate() is yielded instead.
+        With response_schema the chunks are pieces of the JSON document; the caller validates
+        the joined text with parse_structured, and it's only cached if it validates.
+        """
+        config, profile, model, cache_key, ttl, cached = self._prepare(
+            prompt, use_google_search, cache_ttl, bypass_cache, response_schema, task, profile
+        )
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        usage = None
+        started = time.perf_counter()
+        try:
+            limiters["gemini"].acquire()
+            started = time.perf_counter()
+            for chunk in self.client.models.generate_content_stream(model=model, contents=prompt, config=config):
+                # Token counts arrive with the last chunk
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+
+        except Exception as e:
+            print(f"An error occurred during content generation: {e}")
+            self._observe(started, prompt, profile, model, failed=True)
+            yield f"Error: Could not generate a response. Details: {e}"
+            return
+
+        self._observe(started, prompt, profile, model, "".join(parts), usage)
+        self._finish(cache_key, ttl, "".join(parts).strip(), response_schema)
+
+    async def agenerate_stream(
+        self,
+        prompt: str,
+        use_google_search: bool = None,
+        cache_ttl: int = None,
+        bypass_cache: bool = False,
+        response_schema=None,
+        task: str = None,
+        profile=None,
+    ):
+        """Async counterpart of generate_stream."""
+        config, profile, model, cache_key, ttl, cached = self._prepare(
+            prompt, use_google_search, cache_ttl, bypass_cache, response_schema, task, profile
+        )
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        usage = None
+        started = time.perf_counter()
+        try:
+            await limiters["gemini"].aacquire()
+            started = time.perf_counter()
+            stream = await self._aio().models.generate_content_stream(model=model, contents=prompt, config=config)
+            async for chunk in stream:
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+
+        except Exception as e:
+            print(f"An error occurred during content generation: {e}")
+            self._observe(started, prompt, profile, model, failed=True)
+            yield f"Error: Could not generate a response. Details: {e}"
+            return
+
+        self._observe(started, prompt, profile, model, "".join(parts), usage)
+        self._finish(cache_key, ttl, "".join(parts).strip(), response_schema)
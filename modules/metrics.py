@@ -0,0 +1,268 @@
+import json
+import math
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_HOST, METRICS_PORT
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+# How many recent samples each histogram keeps for the percentiles in the JSON dump
+RECENT_SAMPLES = 1024
+
+# The graph node an upstream call is made for, so calls can be broken down per node
+current_node = ContextVar("current_node", default="")
+
+_INVALID = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _name(*parts) -> str:
+    return _INVALID.sub("_", "_".join(str(p) for p in parts if p != "")).strip("_").lower()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _flatten(prefix, value, out):
+    if isinstance(value, bool):
+        out[prefix] = int(value)
+    elif isinstance(value, (int, float)):
+        out[prefix] = value
+    elif isinstance(value, dict):
+        for key, inner in value.items():
+            _flatten(_name(prefix, key), inner, out)
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def summary(self) -> dict:
+        ordered = sorted(self.recent)
+
+        def pct(p):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1)]
+
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "avg": round(self.sum / self.count, 4) if self.count else 0.0,
+            "p50": round(pct(50), 4),
+            "p95": round(pct(95), 4),
+            "p99": round(pct(99), 4),
+            "max": round(self.max, 4),
+        }
+
+
+class MetricsRegistry:
+    """
+    In-process metrics: labelled counters and histograms recorded by the nodes and upstream
+    clients, plus collectors that expose the stats() of the caches, transport, limiters and
+    friends as gauges. Dumps as Prometheus text or JSON (with p50/p95/p99 over recent samples).
+    """
+
+    def __init__(self, namespace: str = "trip"):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._help = {}
+        self._buckets = {}
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> _Histogram
+        self._collectors = {}  # name -> fn returning a (nested) dict of numbers
+
+    def describe(self, name: str, help_text: str, buckets=None):
+        self._help[name] = help_text
+        if buckets is not None:
+            self._buckets[name] = buckets
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self._buckets.get(name, LATENCY_BUCKETS))
+            histogram.observe(value)
+
+    def register_collector(self, name: str, fn):
+        self._collectors[name] = fn
+
+    def _collect(self) -> dict:
+        gauges = {}
+        for name, fn in list(self._collectors.items()):
+            try:
+                _flatten(name, fn(), gauges)
+            except Exception as e:
+                print(f"---Metrics collector {name} failed: {e}---")
+        return gauges
+
+    def _cache_hit_ratios(self, counters) -> dict:
+        lookups, hits = {}, {}
+        for (name, labels), value in counters.items():
+            if name != "cache_lookups_total":
+                continue
+            labels = dict(labels)
+            cache = labels.get("cache", "")
+            lookups[cache] = lookups.get(cache, 0) + value
+            if labels.get("result") != "miss":
+                hits[cache] = hits.get(cache, 0) + value
+        return {cache: round(hits.get(cache, 0) / total, 3) for cache, total in lookups.items() if total}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: histogram.summary() for key, histogram in self._histograms.items()}
+        return {
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(counters.items())],
+            "histograms": [{"name": name, "labels": dict(labels), **summary} for (name, labels), summary in sorted(histograms.items())],
+            "cache_hit_ratio": self._cache_hit_ratios(counters),
+            "gauges": self._collect(),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (h.buckets, list(h.counts), h.count, h.sum)) for key, h in self._histograms.items()
+            )
+        lines = []
+        described = set()
+
+        def header(full, name, kind):
+            if full not in described:
+                described.add(full)
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} {kind}")
+
+        for (name, labels), value in counters:
+            full = _name(self.namespace, name)
+            header(full, name, "counter")
+            lines.append(f"{full}{_labels_text(labels)} {value}")
+        for (name, labels), (buckets, counts, count, total) in histograms:
+            full = _name(self.namespace, name)
+            header(full, name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{full}_bucket{_labels_text(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{full}_bucket{_labels_text(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{full}_sum{_labels_text(labels)} {total}")
+            lines.append(f"{full}_count{_labels_text(labels)} {count}")
+        for name, value in sorted(self._collect().items()):
+            full = _name(self.namespace, name)
+            lines.append(f"# TYPE {full} gauge")
+            lines.append(f"{full} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+registry.describe("node_duration_seconds", "Wall time of each graph node execution")
+registry.describe("node_calls_total", "Graph node executions by outcome")
+registry.describe("upstream_request_duration_seconds", "Upstream call latency, per upstream and calling node")
+registry.describe("upstream_requests_total", "Upstream calls by status")
+registry.describe("upstream_retries_total", "Upstream retries")
+registry.describe("upstream_request_bytes", "Request payload size", SIZE_BUCKETS)
+registry.describe("upstream_response_bytes", "Response payload size", SIZE_BUCKETS)
+registry.describe("gemini_tokens_total", "Gemini tokens by calling node and kind")
+registry.describe("gemini_prompt_tokens", "Prompt tokens per Gemini call", TOKEN_BUCKETS)
+registry.describe("gemini_output_tokens", "Output tokens per Gemini call", TOKEN_BUCKETS)
+registry.describe("gemini_thinking_tokens", "Thinking tokens per Gemini call", TOKEN_BUCKETS)
+registry.describe("cache_lookups_total", "Cache lookups by cache and result")
+registry.describe("iata_lookups_total", "City to IATA code lookups by how they were answered")
+registry.describe("plans_total", "Graph runs by final status")
+registry.describe("plan_duration_seconds", "Wall time of a whole graph run")
+
+
+def observe_upstream(upstream: str, started: float, status: str, request_bytes: int = 0, response_bytes: int = 0):
+    """Records one upstream call that began at time.perf_counter() == started."""
+    node = current_node.get()
+    registry.observe("upstream_request_duration_seconds", time.perf_counter() - started, upstream=upstream, node=node)
+    registry.inc("upstream_requests_total", upstream=upstream, node=node, status=status)
+    if request_bytes:
+        registry.observe("upstream_request_bytes", request_bytes, upstream=upstream)
+    if response_bytes:
+        registry.observe("upstream_response_bytes", response_bytes, upstream=upstream)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "/metrics":
+            body, content_type = registry.to_prometheus(), "text/plain; version=0.0.4"
+        elif path == "/metrics.json":
+            body, content_type = registry.to_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT):
+    """
+    Serves /metrics (Prometheus text) and /metrics.json from a background thread. Safe to call
+    on every Streamlit rerun; only the first call starts anything. Port 0 disables it.
+    """
+    global _server
+    with _server_lock:
+        if _server is not None or not port:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            # Usually another worker process already serves this port
+            print(f"---Metrics endpoint not started on {host}:{port}: {e}---")
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        print(f"---Metrics at http://{host}:{port}/metrics and /metrics.json---")
+        return _server
@@ -0,0 +1,189 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlsplit
+
+from config import (
+    SERPAPI_BASE_URL,
+    OPENWEATHER_BASE_URL,
+    SERPAPI_REQUESTS_PER_MINUTE,
+    SERPAPI_BURST,
+    GEMINI_REQUESTS_PER_MINUTE,
+    GEMINI_BURST,
+    OPENWEATHER_REQUESTS_PER_MINUTE,
+    OPENWEATHER_BURST,
+)
+
+# Priority classes, most urgent first. When an upstream is saturated, queued calls are
+# served strictly in this order (FIFO within a class).
+INTERACTIVE = 0    # a user waiting on a fresh plan
+REGENERATION = 1   # retries, regenerations and alternate-destination clicks
+PREFETCH = 2       # background work nobody is waiting on yet
+PRIORITY_NAMES = {INTERACTIVE: "interactive", REGENERATION: "regeneration", PREFETCH: "prefetch"}
+
+# Carried along with the request through threads started with copy_context, so every upstream
+# call made on behalf of a plan queues with that plan's priority
+current_priority = ContextVar("current_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def request_priority(priority: int):
+    """Runs the enclosed calls (and anything they hand off with copy_context) at `priority`."""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class TokenBucket:
+    """
+    Token bucket for one upstream, with a priority queue in front of it.
+
+    Tokens refill at rate_per_minute up to burst. A call takes one token; when none is left it
+    queues instead of failing, and the head of the queue (highest priority, then oldest) gets
+    the next token. Sync callers block on a condition variable, async callers sleep.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, burst: int):
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self.peak_queue_depth = 0
+        self.acquired = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.wait_seconds = {name: 0.0 for name in PRIORITY_NAMES.values()}
+        self.max_wait_seconds = {name: 0.0 for name in PRIORITY_NAMES.values()}
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _enqueue(self, priority):
+        ticket = (priority, next(self._seq))
+        heapq.heappush(self._queue, ticket)
+        self.peak_queue_depth = max(self.peak_queue_depth, len(self._queue))
+        return ticket
+
+    def _try_take(self, ticket):
+        """Takes a token if ticket is at the head and one is available; otherwise returns how long to wait."""
+        self._refill()
+        if self._queue[0] == ticket and self.tokens >= 1:
+            heapq.heappop(self._queue)
+            self.tokens -= 1
+            # The next waiter may be able to go right away too
+            self._cond.notify_all()
+            return 0.0
+        if self._queue[0] == ticket:
+            return (1 - self.tokens) / self.rate
+        # Not our turn; wake up when the head is likely to have been served
+        return max((1 - self.tokens) / self.rate, 0.01)
+
+    def _leave(self, ticket):
+        # A waiter that gave up (e.g. a cancelled task) must not block the queue
+        if ticket in self._queue:
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            self._cond.notify_all()
+
+    def _record(self, priority, waited):
+        name = PRIORITY_NAMES.get(priority, str(priority))
+        self.acquired[name] = self.acquired.get(name, 0) + 1
+        self.wait_seconds[name] = self.wait_seconds.get(name, 0.0) + waited
+        self.max_wait_seconds[name] = max(self.max_wait_seconds.get(name, 0.0), waited)
+        if waited > 0.5:
+            print(f"---Rate limit: {self.name} call ({name}) queued for {waited:.2f}s---")
+
+    def acquire(self, priority: int = None):
+        """Blocks until a token is available for this call; returns the seconds spent queued."""
+        priority = current_priority.get() if priority is None else priority
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(priority)
+            try:
+                while True:
+                    delay = self._try_take(ticket)
+                    if delay == 0.0:
+                        break
+                    self._cond.wait(delay)
+            except BaseException:
+                self._leave(ticket)
+                raise
+            waited = time.monotonic() - started
+            self._record(priority, waited)
+        return waited
+
+    async def aacquire(self, priority: int = None):
+        """Async counterpart of acquire; queues in the same order without blocking the event loop."""
+        priority = current_priority.get() if priority is None else priority
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(priority)
+        try:
+            while True:
+                with self._cond:
+                    delay = self._try_take(ticket)
+                if delay == 0.0:
+                    break
+                await asyncio.sleep(min(delay, 0.25))
+        except BaseException:
+            with self._cond:
+                self._leave(ticket)
+            raise
+        waited = time.monotonic() - started
+        with self._cond:
+            self._record(priority, waited)
+        return waited
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill()
+            return {
+                "rate_per_minute": round(self.rate * 60, 2),
+                "burst": self.burst,
+                "tokens": round(self.tokens, 2),
+                "queue_depth": len(self._queue),
+                "peak_queue_depth": self.peak_queue_depth,
+                "acquired": dict(self.acquired),
+                "avg_wait_seconds": {
+                    name: round(self.wait_seconds[name] / count, 3) if count else 0.0
+                    for name, count in self.acquired.items()
+                },
+                "max_wait_seconds": {name: round(value, 3) for name, value in self.max_wait_seconds.items()},
+            }
+
+
+# One bucket per upstream quota, shared by every client in the process
+limiters = {
+    "serpapi": TokenBucket("serpapi", SERPAPI_REQUESTS_PER_MINUTE, SERPAPI_BURST),
+    "gemini": TokenBucket("gemini", GEMINI_REQUESTS_PER_MINUTE, GEMINI_BURST),
+    "openweather": TokenBucket("openweather", OPENWEATHER_REQUESTS_PER_MINUTE, OPENWEATHER_BURST),
+}
+
+# Which bucket an HTTP host draws from; hosts not listed here aren't limited
+HOST_LIMITERS = {
+    urlsplit(SERPAPI_BASE_URL).netloc: "serpapi",
+    urlsplit(OPENWEATHER_BASE_URL).netloc: "openweather",
+}
+
+
+def upstream_for_host(host: str) -> str:
+    """The upstream name for an HTTP host, or the host itself for anything unknown."""
+    return HOST_LIMITERS.get(host, host)
+
+
+def limiter_for_host(host: str):
+    return limiters.get(upstream_for_host(host))
+
+
+def limiter_stats() -> dict:
+    return {name: bucket.stats() for name, bucket in limiters.items()}
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import CACHE_DIR
+from .metrics import registry
+
+# Request parameters that never change the response and must not end up in a cache key
+IGNORED_PARAMS = {"api_key", "appid"}
+
+
+def canonical_key(namespace: str, params: dict) -> str:
+    """
+    Builds a stable cache key from request parameters: drops credentials, trims and
+    lower-cases strings, stringifies values and sorts keys so equivalent requests collide.
+    """
+    canonical = {}
+    for name, value in params.items():
+        if name in IGNORED_PARAMS or value is None:
+            continue
+        if isinstance(value, str):
+            value = " ".join(value.split()).lower()
+        canonical[name] = str(value)
+    payload = json.dumps(canonical, sort_keys=True)
+    return f"{namespace}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+class ResponseCache:
+    """
+    SQLite-backed TTL cache for upstream API responses.
+
+    Each instance owns one namespace (e.g. "flights", "hotels") with its own TTL and
+    entry limit; namespaces can share a database file. When a namespace grows past
+    max_entries the least recently used rows are evicted.
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: int, max_entries: int = 2000, path: str = None):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.path = path or os.path.join(CACHE_DIR, "responses.sqlite3")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_lru ON responses (namespace, last_access)"
+        )
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def key(self, params: dict) -> str:
+        return canonical_key(self.namespace, params)
+
+    def get(self, key: str):
+        """Returns the cached value, or None on a miss or an expired entry."""
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str):
+        """Like get(), but returns (value, expires_at) so a caller can keep the row's own expiry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                registry.inc("cache_lookups_total", cache=self.namespace, result="miss")
+                return None
+            value, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expired += 1
+                self.misses += 1
+                registry.inc("cache_lookups_total", cache=self.namespace, result="miss")
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        registry.inc("cache_lookups_total", cache=self.namespace, result="hit")
+        return json.loads(value), expires_at
+
+    def set(self, key: str, value, ttl_seconds: int = None):
+        now = time.time()
+        expires_at = now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, namespace, value, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, self.namespace, json.dumps(value), expires_at, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drops expired rows, then the least recently used ones beyond max_entries."""
+        self._conn.execute(
+            "DELETE FROM responses WHERE namespace = ? AND expires_at <= ?",
+            (self.namespace, time.time()),
+        )
+        (count,) = self._conn.execute(
+            "SELECT COUNT(*) FROM responses WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses WHERE namespace = ? ORDER BY last_access LIMIT ?)",
+                (self.namespace, overflow),
+            )
+            self.evictions += overflow
+
+    def clear(self):
+        """Drops every entry in this namespace."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (size,) = self._conn.execute(
+                "SELECT COUNT(*) FROM responses WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "entries": size,
+        }
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from .rate_limiter import current_priority
+
+
+class SingleFlight:
+    """
+    Collapses identical concurrent calls into one.
+
+    The first caller for a key (the leader) does the work; anyone asking for the same key
+    while it's outstanding waits for the leader's result or exception instead of issuing
+    their own request. Nothing is kept once the call completes, so this only dedups calls
+    that overlap in time; caching finished results is the response caches' job.
+    Sync and async callers share the same in-flight table. A leader running at a lower request
+    priority (it queues for rate-limit tokens at that priority) isn't joined by more urgent
+    callers; they lead a call of their own.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> (priority, Future)
+        self.leaders = 0
+        self.shared = 0   # calls that piggybacked on a leader, i.e. upstream requests saved
+
+    def _join(self, key):
+        priority = current_priority.get()
+        with self._lock:
+            leader = self._calls.get(key)
+            if leader is not None and leader[0] <= priority:
+                self.shared += 1
+                return leader[1], False
+            future = Future()
+            self._calls[key] = (priority, future)
+            self.leaders += 1
+            return future, True
+
+    def _settle(self, key, future, result=None, error=None):
+        with self._lock:
+            if self._calls.get(key, (None, None))[1] is future:
+                del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn):
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result
+
+    async def ado(self, key, afn):
+        """Async counterpart of do; waiting doesn't block the event loop."""
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await afn()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "calls_saved": self.shared,
+                "in_flight": len(self._calls),
+            }
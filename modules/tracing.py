@@ -0,0 +1,31 @@
+import functools
+import inspect
+
+
+def traceable(**kwargs):
+    """
+    langsmith.traceable, except langsmith (about half a second of imports) is only loaded when
+    the decorated function is first called rather than when its module is imported.
+    """
+    def decorate(fn):
+        traced = None
+
+        def _traced():
+            nonlocal traced
+            if traced is None:
+                from langsmith import traceable as langsmith_traceable
+                traced = langsmith_traceable(**kwargs)(fn)
+            return traced
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def _awrapper(*args, **kw):
+                return await _traced()(*args, **kw)
+            return _awrapper
+
+        @functools.wraps(fn)
+        def _wrapper(*args, **kw):
+            return _traced()(*args, **kw)
+        return _wrapper
+
+    return decorate
@@ -0,0 +1,280 @@
+"""
+Compact records for SerpAPI flight and hotel results, and columnar views to rank them.
+
+The raw google_flights / google_hotels payloads carry booking tokens, price insights, image
+galleries and nearby places that nothing here uses. They are normalised into the slotted records
+below as soon as they arrive, and the raw JSON is dropped. The records are what ends up in the
+graph state, the checkpoints, the response cache and every user's session.
+"""
+from dataclasses import dataclass, asdict
+
+import numpy as np
+
+HOTEL_AMENITIES = 8
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class Airport:
+    id: str = ""
+    name: str = ""
+    time: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class FlightLeg:
+    departure: Airport
+    arrival: Airport
+    airline: str = ""
+    airline_logo: str = ""
+    flight_number: str = ""
+    travel_class: str = ""
+    airplane: str = ""
+    duration: int = 0
+    legroom: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class Layover:
+    id: str = ""
+    name: str = ""
+    duration: int = 0
+    overnight: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class FlightOption:
+    price: int = None              # INR; None when SerpAPI has no fare
+    total_duration: int = None     # minutes, door to door
+    legs: tuple = ()
+    layovers: tuple = ()
+    best: bool = False             # listed under SerpAPI's "best_flights"
+    carbon_grams: int = None
+
+    def __post_init__(self):
+        # Checkpoints come back from msgpack with lists; keep the records immutable and comparable
+        object.__setattr__(self, "legs", tuple(self.legs))
+        object.__setattr__(self, "layovers", tuple(self.layovers))
+
+    @property
+    def stops(self) -> int:
+        return len(self.layovers)
+
+    @property
+    def airlines(self) -> str:
+        return " / ".join(dict.fromkeys(leg.airline for leg in self.legs if leg.airline))
+
+    @property
+    def departs(self) -> str:
+        return self.legs[0].departure.time if self.legs else ""
+
+    @property
+    def arrives(self) -> str:
+        return self.legs[-1].arrival.time if self.legs else ""
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FlightOption":
+        """Rebuilds an option from asdict() output (the response cache stores plain JSON)."""
+        legs = tuple(
+            FlightLeg(**{**leg, "departure": Airport(**leg["departure"]), "arrival": Airport(**leg["arrival"])})
+            for leg in data.get("legs", ())
+        )
+        layovers = tuple(Layover(**layover) for layover in data.get("layovers", ()))
+        return cls(**{**data, "legs": legs, "layovers": layovers})
+
+
+@dataclass(frozen=True, slots=True)
+class Hotel:
+    name: str = "Unnamed Hotel"
+    rate: str = ""                 # display text, e.g. "₹4,210"
+    price: float = None            # the same rate as a number, for ranking
+    rating: float = None
+    reviews: int = None
+    amenities: tuple = ()
+    thumbnail: str = ""
+    link: str = ""
+
+    def __post_init__(self):
+        object.__setattr__(self, "amenities", tuple(self.amenities))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Hotel":
+        return cls(**data)
+
+
+# --- Normalising SerpAPI payloads ---
+
+def _airport(data) -> Airport:
+    data = data or {}
+    return Airport(id=data.get("id", ""), name=data.get("name", ""), time=data.get("time", ""))
+
+
+def _leg(data: dict) -> FlightLeg:
+    return FlightLeg(
+        departure=_airport(data.get("departure_airport")),
+        arrival=_airport(data.get("arrival_airport")),
+        airline=data.get("airline", ""),
+        airline_logo=data.get("airline_logo", ""),
+        flight_number=data.get("flight_number", ""),
+        travel_class=data.get("travel_class", ""),
+        airplane=data.get("airplane", ""),
+        duration=_int(data.get("duration")) or 0,
+        legroom=data.get("legroom", ""),
+    )
+
+
+def _layover(data: dict) -> Layover:
+    return Layover(
+        id=data.get("id", ""),
+        name=data.get("name", ""),
+        duration=_int(data.get("duration")) or 0,
+        overnight=bool(data.get("overnight")),
+    )
+
+
+def _flight_option(data: dict, best: bool) -> FlightOption:
+    return FlightOption(
+        price=_int(data.get("price")),
+        total_duration=_int(data.get("total_duration")),
+        legs=tuple(_leg(leg) for leg in data.get("flights") or []),
+        layovers=tuple(_layover(layover) for layover in data.get("layovers") or []),
+        best=best,
+        carbon_grams=_int((data.get("carbon_emissions") or {}).get("this_flight")),
+    )
+
+
+def normalise_flights(data) -> list:
+    """Options of one google_flights response, SerpAPI's best flights first."""
+    if not isinstance(data, dict):
+        return []
+    options = [_flight_option(option, True) for option in data.get("best_flights") or []]
+    options += [_flight_option(option, False) for option in data.get("other_flights") or []]
+    return [option for option in options if option.legs]
+
+
+def normalise_hotels(properties) -> list:
+    hotels = []
+    for data in properties or []:
+        rate = data.get("rate_per_night") or data.get("total_rate") or {}
+        images = data.get("images") or []
+        hotels.append(Hotel(
+            name=data.get("name") or "Unnamed Hotel",
+            rate=rate.get("lowest", ""),
+            price=_float(rate.get("extracted_lowest")),
+            rating=_float(data.get("overall_rating")),
+            reviews=_int(data.get("reviews")),
+            amenities=tuple((data.get("amenities") or [])[:HOTEL_AMENITIES]),
+            thumbnail=images[0].get("thumbnail", "") if images else "",
+            link=data.get("link", ""),
+        ))
+    return hotels
+
+
+def to_cache(records: list) -> list:
+    return [asdict(record) for record in records]
+
+
+# --- Columnar views ---
+
+def _column(values, dtype=float) -> np.ndarray:
+    # Missing values become NaN and are sorted last by _order
+    return np.array([np.nan if value is None else value for value in values], dtype=dtype)
+
+
+def _order(keys: list) -> np.ndarray:
+    """Row order for sort keys given most significant first; NaN sorts after every number."""
+    columns = [np.where(np.isnan(key), np.inf, key) for key in keys]
+    return np.lexsort(columns[::-1])
+
+
+class _Table:
+    # name -> callable(table) returning its sort keys, most significant first
+    SORTS = {}
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.position = np.arange(len(self.rows), dtype=float)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def rank(self, by: str, mask: np.ndarray = None, top_k: int = None) -> list:
+        """Rows sorted by one of SORTS, keeping only those where mask is True."""
+        if not self.rows:
+            return []
+        order = _order(self.SORTS[by](self))
+        if mask is not None:
+            order = order[mask[order]]
+        if top_k is not None:
+            order = order[:top_k]
+        return [self.rows[i] for i in order]
+
+
+class FlightTable(_Table):
+    """Prices, durations and stops of a list of FlightOptions as numpy columns."""
+
+    SORTS = {
+        "best": lambda t: [t.not_best, t.position],
+        "cheapest": lambda t: [t.price, t.duration],
+        "fastest": lambda t: [t.duration, t.price],
+        "fewest_stops": lambda t: [t.stops, t.price],
+    }
+
+    def __init__(self, options):
+        super().__init__(options)
+        self.price = _column(option.price for option in self.rows)
+        self.duration = _column(option.total_duration for option in self.rows)
+        self.stops = _column(option.stops for option in self.rows)
+        self.not_best = _column(not option.best for option in self.rows)
+
+    def select(self, max_price: float = None, max_stops: int = None, max_duration: int = None) -> np.ndarray:
+        """Boolean mask of the options within every given limit (unknown values fail a limit)."""
+        mask = np.ones(len(self.rows), dtype=bool)
+        if max_price is not None:
+            mask &= self.price <= max_price
+        if max_stops is not None:
+            mask &= self.stops <= max_stops
+        if max_duration is not None:
+            mask &= self.duration <= max_duration
+        return mask
+
+
+class HotelTable(_Table):
+    """Prices and ratings of a list of Hotels as numpy columns."""
+
+    SORTS = {
+        "recommended": lambda t: [t.position],
+        "cheapest": lambda t: [t.price, -t.rating],
+        "best_rated": lambda t: [-t.rating, -t.reviews, t.price],
+    }
+
+    def __init__(self, hotels):
+        super().__init__(hotels)
+        self.price = _column(hotel.price for hotel in self.rows)
+        self.rating = _column(hotel.rating for hotel in self.rows)
+        self.reviews = _column(hotel.reviews for hotel in self.rows)
+
+    def select(self, max_price: float = None, min_rating: float = None) -> np.ndarray:
+        mask = np.ones(len(self.rows), dtype=bool)
+        if max_price is not None:
+            mask &= self.price <= max_price
+        if min_rating is not None:
+            mask &= self.rating >= min_rating
+        return mask
+
+
+# Types the LangGraph checkpointer may rebuild from msgpack (see trip_graph/incremental.py)
+RECORD_TYPES = [(__name__, cls.__name__) for cls in (Airport, FlightLeg, Layover, FlightOption, Hotel)]
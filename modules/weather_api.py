@@ -1,54 +1,106 @@
-import requests
+import time
 from datetime import datetime, timedelta
-from config import OPENWEATHER_API_KEY
+from config import OPENWEATHER_API_KEY, OPENWEATHER_BASE_URL, WEATHER_REFRESH_SECONDS, WEATHER_CACHE_MAX_ENTRIES
+from .http_transport import transport
+from .response_cache import ResponseCache
+
+# The daily forecast endpoint never returns more than 16 days
+MAX_FORECAST_DAYS = 16
 
 class WeatherClient:
     def __init__(self, api_key: str = OPENWEATHER_API_KEY):
+        if not api_key:
+            raise ValueError("OPENWEATHER_API_KEY not found. Ensure it's set in your environment or config.")
         self.api_key = api_key
-        self.session = requests.Session()
-        self.BASE_URL = "https://api.openweathermap.org/data/2.5/forecast/daily"
+        self.http = transport
+        # One full series per city; every trip window is sliced out of it
+        self.cache = ResponseCache("weather", WEATHER_REFRESH_SECONDS, WEATHER_CACHE_MAX_ENTRIES)
+        self.BASE_URL = f"{OPENWEATHER_BASE_URL}/data/2.5/forecast/daily"
+        self.fetches = 0
+        self.windows_served = 0
+
+    def _forecast_params(self, city: str) -> dict:
+        # Always ask for the whole series so any later window for this city is a cache hit
+        return {
+            "q": city,
+            "units": "metric",
+            "cnt": MAX_FORECAST_DAYS,
+            "appid": self.api_key
+        }
+
+    @staticmethod
+    def _ttl_until_refresh() -> int:
+        # Expire on the provider's next refresh boundary rather than a fixed time after fetching
+        return max(int(WEATHER_REFRESH_SECONDS - time.time() % WEATHER_REFRESH_SECONDS), 60)
+
+    def _parse_forecast(self, data: dict, city: str, start: datetime, days: int) -> dict:
+        forecast = []
+        for d in data.get("list", []):
+            date = datetime.utcfromtimestamp(d["dt"])
+            if start <= date < start + timedelta(days=days):
+                forecast.append({
+                    "date": date.strftime("%Y-%m-%d"),
+                    "temp": d["temp"]["day"],
+                    "weather": d["weather"][0]["description"].capitalize(),
+                    "humidity": d["humidity"],
+                    "wind_speed": d["speed"]
+                })
+        self.windows_served += 1
+        return {
+            "city": data.get("city", {}).get("name", city),
+            "country": data.get("city", {}).get("country", ""),
+            "forecast": forecast
+        }
+
+    def _store_series(self, cache_key, data):
+        self.fetches += 1
+        if data.get("list"):
+            self.cache.set(cache_key, data, ttl_seconds=self._ttl_until_refresh())
+        return data
 
     def get_daily_forecast(self, city: str, start_date: str, days: int = 5):
         try:
             start = datetime.strptime(start_date, "%Y-%m-%d")
-            today = datetime.today()
-            delta_days = (start - today).days + days + 1
-            # print("delta", delta_days)
-            cnt = min(max(delta_days, days), 16)
-            # print(cnt)
-            
-            params = {
-                "q": city,
-                "units": "metric",
-                "cnt": cnt + 1,
-                "appid": self.api_key
-            }
-
-            response = self.session.get(self.BASE_URL, params=params)
-            response.raise_for_status()
-            
+            params = self._forecast_params(city)
+            cache_key = self.cache.key(params)
+            data = self.cache.get(cache_key)
+
+            if data is None:
+                response = self.http.get(self.BASE_URL, params=params)
+                response.raise_for_status()
+                data = self._store_series(cache_key, response.json())
+
             # url = f"{self.base_url}/forecast/daily?q={city}&units=metric&cnt={cnt}&appid={self.api_key}"
             # res = requests.get(url)
             # if res.status_code != 200:
             #     raise Exception(f"Weather fetch failed: {res.text}")
 
-            data = response.json()
-            forecast = []
-            for d in data.get("list", []):
-                date = datetime.utcfromtimestamp(d["dt"])
-                if start <= date < start + timedelta(days=days):
-                    forecast.append({
-                        "date": date.strftime("%Y-%m-%d"),
-                        "temp": d["temp"]["day"],
-                        "weather": d["weather"][0]["description"].capitalize(),
-                        "humidity": d["humidity"],
-                        "wind_speed": d["speed"]
-                    })
-            return {
-                "city": data.get("city", {}).get("name", city),
-                "country": data.get("city", {}).get("country", ""),
-                "forecast": forecast
-            }
+            return self._parse_forecast(data, city, start, days)
+
+        except Exception as e:
+            raise Exception(f"Error fetching forecast: {e}")
+
+    async def aget_daily_forecast(self, city: str, start_date: str, days: int = 5):
+        """Async counterpart of get_daily_forecast."""
+        try:
+            start = datetime.strptime(start_date, "%Y-%m-%d")
+            params = self._forecast_params(city)
+            cache_key = self.cache.key(params)
+            data = self.cache.get(cache_key)
+
+            if data is None:
+                response = await self.http.aget(self.BASE_URL, params=params)
+                response.raise_for_status()
+                data = self._store_series(cache_key, response.json())
+
+            return self._parse_forecast(data, city, start, days)
 
         except Exception as e:
             raise Exception(f"Error fetching forecast: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "fetches": self.fetches,
+            "windows_served": self.windows_served,
+            "cache": self.cache.stats(),
+        }
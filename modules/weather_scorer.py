@@ -0,0 +1,175 @@
+import threading
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from .metrics import registry
+
+# Risk of each OpenWeather condition category, 0 (harmless) to 1 (trip-ruining).
+# Matched against the lower-cased description, most severe keywords first.
+CONDITION_RISK = [
+    ("tornado", 1.0),
+    ("squall", 0.9),
+    ("thunderstorm", 0.8),
+    ("extreme rain", 0.9),
+    ("very heavy rain", 0.8),
+    ("heavy intensity", 0.7),
+    ("freezing rain", 0.8),
+    ("heavy snow", 0.8),
+    ("sleet", 0.6),
+    ("snow", 0.5),
+    ("moderate rain", 0.45),
+    ("shower", 0.4),
+    ("rain", 0.3),
+    ("drizzle", 0.2),
+    ("sand", 0.6),
+    ("dust", 0.5),
+    ("ash", 0.9),
+    ("smoke", 0.4),
+    ("fog", 0.25),
+    ("haze", 0.15),
+    ("mist", 0.1),
+    ("overcast", 0.08),
+    ("cloud", 0.03),
+    ("clear", 0.0),
+]
+UNKNOWN_CONDITION_RISK = 0.2
+
+
+@dataclass(frozen=True)
+class WeatherThresholds:
+    """Comfort bands and decision cut-offs for one trip type. Temperatures in °C, wind in m/s."""
+    temp_low: float = 15.0
+    temp_high: float = 32.0
+    temp_tolerance: float = 10.0      # degrees outside the band before comfort hits zero
+    humidity_high: float = 80.0
+    wind_high: float = 10.0
+    wind_tolerance: float = 10.0
+    favourable_above: float = 0.65    # aggregate score at or above this is favourable
+    unfavourable_below: float = 0.4   # below this is unfavourable; in between asks the LLM
+    max_bad_day_share: float = 0.5    # more risky days than this is unfavourable outright
+
+
+DEFAULT_THRESHOLDS = WeatherThresholds()
+
+TRIP_TYPE_THRESHOLDS = {
+    "Family": replace(DEFAULT_THRESHOLDS, temp_low=17.0, temp_high=31.0),
+    "Adventure": replace(DEFAULT_THRESHOLDS, temp_low=5.0, temp_high=35.0, wind_high=14.0, max_bad_day_share=0.6),
+    "Romantic": replace(DEFAULT_THRESHOLDS, temp_low=16.0, temp_high=30.0),
+    "Cultural": replace(DEFAULT_THRESHOLDS, temp_high=34.0),
+    "Relaxation": replace(DEFAULT_THRESHOLDS, temp_low=20.0, temp_high=33.0, humidity_high=85.0, wind_high=8.0),
+    "Fun": DEFAULT_THRESHOLDS,
+}
+
+
+def condition_risk(description: str) -> float:
+    description = (description or "").lower()
+    for keyword, risk in CONDITION_RISK:
+        if keyword in description:
+            return risk
+    return UNKNOWN_CONDITION_RISK
+
+
+def score_days(forecast: list, thresholds: WeatherThresholds = DEFAULT_THRESHOLDS) -> dict:
+    """
+    Scores every day of a WeatherClient forecast in one vectorized pass.
+
+    Returns per-day comfort (0..1, how pleasant the temperature, humidity and wind are)
+    and risk (0..1, how likely the weather is to disrupt plans), plus day scores
+    (comfort * (1 - risk)) as numpy arrays.
+    """
+    temp = np.array([d.get("temp", np.nan) for d in forecast], dtype=float)
+    humidity = np.array([d.get("humidity", np.nan) for d in forecast], dtype=float)
+    wind = np.array([d.get("wind_speed", np.nan) for d in forecast], dtype=float)
+    risk = np.array([condition_risk(d.get("weather")) for d in forecast], dtype=float)
+
+    # Distance outside the comfortable band, scaled so temp_tolerance degrees off is zero comfort
+    temp_off = np.maximum(thresholds.temp_low - temp, 0) + np.maximum(temp - thresholds.temp_high, 0)
+    temp_comfort = np.clip(1 - temp_off / thresholds.temp_tolerance, 0, 1)
+    humidity_comfort = np.clip(1 - np.maximum(humidity - thresholds.humidity_high, 0) / 40, 0.5, 1)
+    wind_excess = np.maximum(wind - thresholds.wind_high, 0) / thresholds.wind_tolerance
+    wind_comfort = np.clip(1 - wind_excess, 0, 1)
+
+    # Missing readings count as neutral rather than failing the whole forecast
+    comfort = np.nan_to_num(temp_comfort, nan=0.7) * np.nan_to_num(humidity_comfort, nan=1.0) * np.nan_to_num(wind_comfort, nan=1.0)
+    risk = np.maximum(risk, np.clip(np.nan_to_num(wind_excess), 0, 1))
+    return {"comfort": comfort, "risk": risk, "score": comfort * (1 - risk)}
+
+
+class WeatherScorerStats:
+    """Thread-safe counters for how often the rule-based scorer needed the LLM."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.evaluations = 0
+        self.favourable = 0
+        self.unfavourable = 0
+        self.llm_fallbacks = 0
+
+    def record(self, verdict: str):
+        with self._lock:
+            self.evaluations += 1
+            if verdict == "ambiguous":
+                self.llm_fallbacks += 1
+            elif verdict in ("favourable", "unfavourable"):
+                setattr(self, verdict, getattr(self, verdict) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "evaluations": self.evaluations,
+                "favourable": self.favourable,
+                "unfavourable": self.unfavourable,
+                "llm_fallbacks": self.llm_fallbacks,
+                "fallback_rate": round(self.llm_fallbacks / self.evaluations, 3) if self.evaluations else 0.0,
+            }
+
+
+scorer_stats = WeatherScorerStats()
+registry.register_collector("weather_scorer", scorer_stats.snapshot)
+
+
+def evaluate_forecast(forecast: list, trip_type: str = None) -> dict:
+    """
+    Rule-based verdict for a forecast: "favourable", "unfavourable" or "ambiguous"
+    (the caller should fall back to the LLM), with the aggregate score and a short reason.
+    """
+    thresholds = TRIP_TYPE_THRESHOLDS.get(trip_type, DEFAULT_THRESHOLDS)
+    days = score_days(forecast, thresholds)
+    score = float(days["score"].mean())
+    bad_days = days["risk"] >= 0.5
+    bad_share = float(bad_days.mean())
+
+    if bad_share > thresholds.max_bad_day_share or score < thresholds.unfavourable_below:
+        verdict = "unfavourable"
+        worst = [forecast[i] for i in np.argsort(days["score"])[:2]]
+        reason = "Poor conditions expected: " + ", ".join(f"{d.get('weather')} at {d.get('temp')}°C on {d.get('date')}" for d in worst)
+    elif score >= thresholds.favourable_above and not bad_days.any():
+        verdict = "favourable"
+        reason = ""
+    else:
+        verdict = "ambiguous"
+        reason = f"Borderline forecast (score {score:.2f}, {int(bad_days.sum())} risky day(s))"
+
+    scorer_stats.record(verdict)
+    return {"verdict": verdict, "score": round(score, 3), "reason": reason}
+
+
+def score_forecasts(forecasts: list, trip_type: str = None) -> dict:
+    """
+    Scores several forecasts (e.g. one per candidate destination) in a single vectorized pass.
+
+    All days are scored together and aggregated per forecast, returning numpy arrays aligned
+    with the input: mean day score, share of risky days, and whether the forecast is
+    favourable by the same rules evaluate_forecast uses. Empty forecasts are never favourable.
+    """
+    thresholds = TRIP_TYPE_THRESHOLDS.get(trip_type, DEFAULT_THRESHOLDS)
+    lengths = np.array([len(f) for f in forecasts], dtype=int)
+    days = score_days([d for f in forecasts for d in f], thresholds)
+
+    group = np.repeat(np.arange(len(forecasts)), lengths)
+    counts = np.maximum(lengths, 1)
+    score = np.bincount(group, weights=days["score"], minlength=len(forecasts)) / counts
+    bad_share = np.bincount(group, weights=days["risk"] >= 0.5, minlength=len(forecasts)) / counts
+    favourable = (lengths > 0) & (score >= thresholds.favourable_above) & (bad_share == 0)
+    return {"score": score, "bad_share": bad_share, "favourable": favourable}
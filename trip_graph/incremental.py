@@ -0,0 +1,196 @@
+# trip_graph/incremental.py
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from config import CHECKPOINT_BACKEND, CACHE_DIR, CHECKPOINT_THREAD_TTL, CHECKPOINT_MAX_THREADS
+
+# Which TripState fields each node reads. A node has to run again when any of these changed
+# since the last plan on the same thread; otherwise its checkpointed output is reused.
+NODE_INPUTS = {
+    "weather": {"destination", "start_date", "num_days"},
+    "weather_decision": {"weather_data", "trip_type"},
+    "planner": {"destination", "start_date", "end_date", "trip_type", "budget", "travellers"},
+    "flight": {"source", "destination", "start_date", "end_date"},
+    "hotel": {"destination", "start_date", "end_date", "travellers", "budget"},
+    "summary": {"destination", "itinerary", "flights", "hotels", "weather_data", "travellers", "budget"},
+    "alternate_suggestions": {"destination", "weather_data", "start_date", "num_days", "trip_type", "budget"},
+    "alternate_validation": {"alternate_suggestions", "start_date", "num_days", "trip_type"},
+}
+
+# The TripState fields each node writes
+NODE_OUTPUTS = {
+    "weather": ("weather_data",),
+    "weather_decision": ("decision",),
+    "planner": ("itinerary",),
+    "flight": ("flights",),
+    "hotel": ("hotels",),
+    "summary": ("summary",),
+    "alternate_suggestions": ("alternate_suggestions",),
+    "alternate_validation": ("alternate_suggestions",),
+}
+
+# Graph order, so a change propagates to everything downstream in one pass
+NODE_ORDER = [
+    "weather", "weather_decision", "planner", "flight", "hotel", "summary",
+    "alternate_suggestions", "alternate_validation",
+]
+
+# Fields produced by the graph; they're cleared at the start of every run on a thread, so a
+# node that doesn't run this time can't leave a stale value behind
+OUTPUT_FIELDS = sorted({field for fields in NODE_OUTPUTS.values() for field in fields})
+
+
+def stale_nodes(previous: dict, current: dict) -> set:
+    """Nodes whose inputs differ between the previous run's state and the new request."""
+    changed = {field for field in current if previous.get(field) != current.get(field)}
+    stale = set()
+    for node in NODE_ORDER:
+        if NODE_INPUTS[node] & changed:
+            stale.add(node)
+            changed.update(NODE_OUTPUTS[node])
+    return stale
+
+
+def reusable_outputs(previous: dict, current: dict) -> dict:
+    """
+    Checkpointed outputs that are still valid for the new request, as {node: {field: value}}.
+    Outputs that were missing or failed (None) last time are never reused.
+    """
+    if not previous:
+        return {}
+    stale = stale_nodes(previous, current)
+    reuse = {}
+    for node in NODE_ORDER:
+        if node in stale:
+            continue
+        outputs = {field: previous.get(field) for field in NODE_OUTPUTS[node]}
+        if all(value is not None for value in outputs.values()):
+            reuse[node] = outputs
+    # Both alternate nodes write alternate_suggestions; only the validated list may be reused
+    if "alternate_validation" not in reuse:
+        reuse.pop("alternate_suggestions", None)
+    return reuse
+
+
+def reused(config, name):
+    """The outputs to reuse for node `name` in this run, or None if it has to run."""
+    return (config or {}).get("configurable", {}).get("reuse", {}).get(name)
+
+
+def reusable_node(name: str, runnable):
+    """Wraps a sequential node so it hands back its checkpointed outputs when they're still valid."""
+    from langchain_core.runnables import RunnableLambda
+
+    def _run(state, config):
+        outputs = reused(config, name)
+        if outputs is not None:
+            print(f"---Reusing checkpointed {name}---")
+            return outputs
+        return runnable.invoke(state, config)
+
+    async def _arun(state, config):
+        outputs = reused(config, name)
+        if outputs is not None:
+            print(f"---Reusing checkpointed {name}---")
+            return outputs
+        return await runnable.ainvoke(state, config)
+
+    return RunnableLambda(_run, afunc=_arun, name=name)
+
+
+class ThreadTracker:
+    """
+    Keeps the number of checkpointed session threads bounded.
+
+    Each plan only needs the last plan on its thread, so the thread's older checkpoints are
+    deleted before a new run (see langgraph_flow). Sessions that never come back would still
+    leave their thread behind forever; touch() is called on every run and returns the threads
+    idle for longer than ttl_seconds, plus the least recently used ones past max_threads, for
+    the caller to delete. Threads from an earlier process (SQLite backend) aren't tracked.
+    """
+
+    def __init__(self, ttl_seconds=CHECKPOINT_THREAD_TTL, max_threads=CHECKPOINT_MAX_THREADS):
+        self.ttl_seconds = ttl_seconds
+        self.max_threads = max_threads
+        self._lock = threading.Lock()
+        self._last_used = OrderedDict()  # thread_id -> last run, least recently used first
+        self.evicted = 0
+
+    def touch(self, thread_id: str) -> list:
+        now = time.time()
+        evict = []
+        with self._lock:
+            self._last_used.pop(thread_id, None)
+            self._last_used[thread_id] = now
+            while self._last_used:
+                oldest, last_used = next(iter(self._last_used.items()))
+                if now - last_used < self.ttl_seconds and len(self._last_used) <= self.max_threads:
+                    break
+                self._last_used.popitem(last=False)
+                evict.append(oldest)
+            self.evicted += len(evict)
+        return evict
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"threads": len(self._last_used), "max_threads": self.max_threads, "evicted": self.evicted}
+
+
+def evict_idle_threads(checkpointer, thread_id: str):
+    """Records a run on thread_id and deletes the checkpoints of threads that have gone idle."""
+    for thread in thread_tracker.touch(thread_id):
+        print(f"---Dropping checkpoints of idle thread {thread}---")
+        checkpointer.delete_thread(thread)
+
+
+thread_tracker = ThreadTracker()
+
+
+def _checkpoint_path():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, "checkpoints.sqlite3")
+
+
+def _serde():
+    """
+    Flights and hotels are checkpointed as slotted records. Newer langgraph-checkpoint releases
+    only rebuild types on an allowlist; the pinned 2.1.x has no allowlist and rebuilds any type.
+    """
+    import inspect
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+    from modules.travel_records import RECORD_TYPES
+    if "allowed_msgpack_modules" in inspect.signature(JsonPlusSerializer.__init__).parameters:
+        return JsonPlusSerializer(allowed_msgpack_modules=RECORD_TYPES)
+    return JsonPlusSerializer()
+
+
+def create_checkpointer():
+    """
+    Checkpointer for the sync app: in memory by default, or SQLite (CHECKPOINT_BACKEND=sqlite)
+    so plans survive restarts and are shared between worker processes.
+    """
+    if CHECKPOINT_BACKEND == "sqlite":
+        from langgraph.checkpoint.sqlite import SqliteSaver
+        return SqliteSaver(sqlite3.connect(_checkpoint_path(), check_same_thread=False), serde=_serde())
+    from langgraph.checkpoint.memory import InMemorySaver
+    return InMemorySaver(serde=_serde())
+
+
+@asynccontextmanager
+async def async_checkpointer(sync_checkpointer):
+    """
+    Checkpointer for one async run. The in-memory saver serves both sides; SqliteSaver has no
+    async methods, so async runs open an AsyncSqliteSaver on the same database file and close
+    it again afterwards (an open aiosqlite connection would outlive its event loop).
+    """
+    if CHECKPOINT_BACKEND != "sqlite":
+        yield sync_checkpointer
+        return
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    async with AsyncSqliteSaver.from_conn_string(_checkpoint_path()) as saver:
+        saver.serde = sync_checkpointer.serde
+        yield saver
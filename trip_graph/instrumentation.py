@@ -0,0 +1,45 @@
+# trip_graph/instrumentation.py
+import time
+
+from modules.metrics import registry, current_node
+
+
+def instrumented_node(name: str, runnable):
+    """
+    Wraps a node so every execution is timed and counted, and every upstream call made while
+    it runs (HTTP or Gemini) is attributed to it. Reused checkpoints and speculative results
+    that are claimed never reach this wrapper, so only real work is measured.
+    """
+    from langchain_core.runnables import RunnableLambda
+
+    def _record(started, outcome):
+        registry.observe("node_duration_seconds", time.perf_counter() - started, node=name)
+        registry.inc("node_calls_total", node=name, outcome=outcome)
+
+    def _run(state, config):
+        token = current_node.set(name)
+        started = time.perf_counter()
+        try:
+            result = runnable.invoke(state, config)
+        except Exception:
+            _record(started, "error")
+            raise
+        finally:
+            current_node.reset(token)
+        _record(started, "ok")
+        return result
+
+    async def _arun(state, config):
+        token = current_node.set(name)
+        started = time.perf_counter()
+        try:
+            result = await runnable.ainvoke(state, config)
+        except Exception:
+            _record(started, "error")
+            raise
+        finally:
+            current_node.reset(token)
+        _record(started, "ok")
+        return result
+
+    return RunnableLambda(_run, afunc=_arun, name=name)
@@ -0,0 +1,83 @@
+import re
+
+from trip_graph.schemas import Itinerary
+
+SLOTS = ("Morning", "Lunch", "Afternoon", "Evening")
+
+
+def chunk_days(num_days: int, size: int) -> list:
+    """Splits days 1..num_days into [[1, 2, 3], [4, 5, 6], ...] blocks of at most size days."""
+    size = max(1, size)
+    return [list(range(first, min(first + size, num_days + 1))) for first in range(1, num_days + 1, size)]
+
+
+def _normalise(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", (text or "").lower()).strip()
+
+
+class ChunkMerger:
+    """
+    Merges day blocks generated independently (and in any order) into one itinerary.
+
+    Each chunk only contributes the days it was asked for; repeated day numbers and days that
+    are a copy of one already merged are dropped, so they show up in missing() and can be asked
+    for again. Days are released to the caller strictly in order (Day 1, Day 2, ...), so a
+    streaming preview never shows Day 4 before Day 1 just because its chunk finished first.
+    """
+
+    def __init__(self, num_days: int):
+        self.num_days = num_days
+        self.days = {}           # day number -> DayPlan
+        self._fingerprints = set()
+        self._released = 0
+        self.duplicates = 0
+
+    def add(self, days: list, itinerary) -> list:
+        """Merges one chunk's Itinerary (None if its call failed); returns the newly releasable days."""
+        for plan in (itinerary.days if itinerary is not None else []):
+            if plan.day not in days or plan.day in self.days:
+                self.duplicates += 1
+                continue
+            fingerprint = tuple(_normalise(getattr(plan, slot)) for slot in SLOTS)
+            if fingerprint in self._fingerprints:
+                self.duplicates += 1
+                continue
+            self._fingerprints.add(fingerprint)
+            self.days[plan.day] = plan
+        return self._release()
+
+    def _release(self) -> list:
+        released = []
+        while self._released + 1 in self.days:
+            self._released += 1
+            plan = self.days[self._released]
+            released.append((f"Day {plan.day}", plan.model_dump(exclude={"day"})))
+        return released
+
+    def missing(self) -> list:
+        return [day for day in range(1, self.num_days + 1) if day not in self.days]
+
+    def skip_missing(self) -> list:
+        """Gives up on the missing days and releases whatever comes after them."""
+        released = []
+        for day in range(self._released + 1, self.num_days + 1):
+            if day in self.days:
+                plan = self.days[day]
+                released.append((f"Day {plan.day}", plan.model_dump(exclude={"day"})))
+        self._released = self.num_days
+        return released
+
+    def itinerary(self):
+        if not self.days:
+            return None
+        return Itinerary(days=[self.days[day] for day in sorted(self.days)])
+
+
+def day_span(days: list) -> str:
+    """[4, 5, 6] -> "days 4 to 6"; [3, 7] -> "days 3, 7"."""
+    if len(days) == 1:
+        return f"day {days[0]}"
+    if days == list(range(days[0], days[-1] + 1)):
+        return f"days {days[0]} to {days[-1]}"
+    return "days " + ", ".join(str(day) for day in days)
+
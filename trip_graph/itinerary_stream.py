@@ -0,0 +1,78 @@
+import json
+import re
+
+DAY_KEY = re.compile(r"^\s*day\s*\d+\s*$", re.IGNORECASE)
+
+
+class DayBlockParser:
+    """
+    Incremental parser for a streamed itinerary.
+
+    Feed it text chunks as they arrive from Gemini; every time a day object closes, it's
+    parsed and returned, so the UI can render that day while the rest of the itinerary is
+    still being generated. Both the free-form `"Day N": {...}` layout and the structured
+    `{"days": [{"day": N, ...}, ...]}` layout are recognised. Text outside the JSON
+    (markdown fences, preambles) is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.in_string = False
+        self.escaped = False
+        self.string_start = None
+        self.last_string = None
+        self.current_key = None
+        self.stack = []         # (start offset, key) for every open object
+        self.emitted = set()
+
+    def feed(self, chunk: str) -> list:
+        """Consumes a chunk and returns [(day_key, day_dict), ...] for the days it completed."""
+        self.buffer += chunk
+        completed = []
+        while self.pos < len(self.buffer):
+            char = self.buffer[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    self.last_string = self.buffer[self.string_start:self.pos]
+            elif char == '"':
+                self.in_string = True
+                self.string_start = self.pos + 1
+            elif char == ":":
+                self.current_key = self.last_string
+            elif char in ",[":
+                self.current_key = None
+            elif char == "{":
+                self.stack.append((self.pos, self.current_key))
+                self.current_key = None
+            elif char == "}" and self.stack:
+                start, key = self.stack.pop()
+                day = self._parse_day(key, self.buffer[start:self.pos + 1])
+                if day is not None:
+                    completed.append(day)
+            self.pos += 1
+        return completed
+
+    def _parse_day(self, key, text):
+        if key is not None and not DAY_KEY.match(key):
+            return None
+        try:
+            content = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(content, dict):
+            return None
+        if key is None:
+            # An array element is only a day if it carries its day number
+            if not isinstance(content.get("day"), int):
+                return None
+            key = f"Day {content.pop('day')}"
+        if key in self.emitted:
+            return None
+        self.emitted.add(key)
+        return key, content
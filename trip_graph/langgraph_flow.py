@@ -110,26 +110,37 @@
 
 # langgraph/langgraph_flow.py
 import sys, os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from functools import partial
 from datetime import datetime, timedelta
-from typing import TypedDict, List, Optional
-
-# LangGraph imports
-from langgraph.graph import StateGraph, END
-from langsmith import traceable
+from typing import TypedDict, List, NamedTuple, Optional, Annotated
 
 # Make sure project modules are accessible
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
 
-# Import your node factory functions
-from trip_graph.nodes.weather_node import weather_node
-from trip_graph.nodes.weather_decision_node import weather_decision_node
-from trip_graph.nodes.planner_node import planner_node
-from trip_graph.nodes.flight_node import flight_node
-from trip_graph.nodes.hotel_node import hotel_node
-from trip_graph.nodes.summary_node import summary_node
-from trip_graph.nodes.alternate_suggestion_node import alternate_suggestion_node
+# LangGraph, LangChain, the node modules and their clients are imported when the graph is first
+# built (see _graph), so importing this module, and with it the first Streamlit render, stays cheap
+from modules import clients
+from modules.tracing import traceable
+from trip_graph.speculation import SpeculativeRun, BufferedListener
+from trip_graph.prefetch import PlanPrefetcher, plan_key
+from trip_graph.plan_cache import PlanCache
+from trip_graph.instrumentation import instrumented_node
+from trip_graph.incremental import (
+    OUTPUT_FIELDS, reusable_outputs, reused, reusable_node, create_checkpointer, async_checkpointer,
+    evict_idle_threads, thread_tracker,
+)
+from modules.metrics import registry
+from config import SPECULATIVE_EXECUTION
 
 # --- 1. Define the State for the Graph ---
+def merge_timings(left: Optional[dict], right: Optional[dict]) -> dict:
+    """Reducer that lets the parallel branches each add their own timing entry."""
+    return {**(left or {}), **(right or {})}
+
 # This dictionary will be passed between all of your nodes.
 class TripState(TypedDict):
     source: str
@@ -147,69 +158,191 @@ class TripState(TypedDict):
     hotels: Optional[dict]
     summary: Optional[str]
     alternate_suggestions: Optional[list]
+    branch_timings: Annotated[dict, merge_timings]
+
+# Nodes on the favourable path that don't read each other's output and can run side by side
+FAVOURABLE_BRANCHES = {
+    "planner": "itinerary",
+    "flight": "flights",
+    "hotel": "hotels",
+}
+
+def timed_branch(name: str, runnable, output_key: str):
+    """
+    Wraps a favourable-path node so it runs as a parallel branch.
+
+    The node runnables return the whole state (RunnablePassthrough.assign), but LangGraph
+    only accepts one write per key in a step, so the branch hands back just its own output
+    along with how long it took. When a speculative run already started this branch, its
+    result is claimed instead of doing the work again, and when the branch's inputs haven't
+    changed since the last plan on the same thread, its checkpointed output is reused.
+    """
+    from langchain_core.runnables import RunnableLambda
+
+    def _timed(output, started):
+        elapsed = time.perf_counter() - started
+        print(f"---Branch {name} finished in {elapsed:.2f}s---")
+        return {output_key: output.get(output_key), "branch_timings": {name: round(elapsed, 3)}}
+
+    def _execute(state, config=None):
+        started = time.perf_counter()
+        return _timed(runnable.invoke(state, config), started)
+
+    async def _aexecute(state, config=None):
+        started = time.perf_counter()
+        return _timed(await runnable.ainvoke(state, config), started)
+
+    def _run(state, config):
+        outputs = reused(config, name)
+        if outputs is not None:
+            print(f"---Reusing checkpointed {name}---")
+            return {**outputs, "branch_timings": {name: 0.0}}
+        speculation = config.get("configurable", {}).get("speculation")
+        if speculation is not None and speculation.has(name):
+            return speculation.claim(name)
+        return _execute(state, config)
+
+    async def _arun(state, config):
+        outputs = reused(config, name)
+        if outputs is not None:
+            print(f"---Reusing checkpointed {name}---")
+            return {**outputs, "branch_timings": {name: 0.0}}
+        speculation = config.get("configurable", {}).get("speculation")
+        if speculation is not None and speculation.has(name):
+            return await speculation.aclaim(name)
+        return await _aexecute(state, config)
+
+    branch = RunnableLambda(_run, afunc=_arun, name=name)
+    branch.execute = _execute
+    return branch
 
 # --- 2. Build the Graph ---
+class CompiledGraph(NamedTuple):
+    workflow: object
+    app: object
+    checkpointer: object
+    branch_nodes: dict
 
-# Create the graph object
-workflow = StateGraph(TripState)
-
-# Add all the nodes to the graph. The first argument is a unique name for the node.
-# The second argument is the runnable object created by your factory function.
-workflow.add_node("weather", weather_node())
-workflow.add_node("weather_decision", weather_decision_node())
-workflow.add_node("planner", planner_node())
-workflow.add_node("flight", flight_node())
-workflow.add_node("hotel", hotel_node())
-workflow.add_node("summary", summary_node())
-workflow.add_node("alternate_suggestions", alternate_suggestion_node())
-
-# --- 3. Define the Edges (the Flow of Logic) ---
-
-# Set the entry point of the graph
-workflow.set_entry_point("weather")
-
-# Simple edges connect one node directly to the next
-workflow.add_edge("weather", "weather_decision")
-workflow.add_edge("planner", "flight")
-workflow.add_edge("flight", "hotel")
-workflow.add_edge("hotel", "summary")
-workflow.add_edge("summary", END) # The summary node is a final step
-workflow.add_edge("alternate_suggestions", END) # The alternate suggestions node is also a final step
-
-# Conditional edges decide the next step based on the current state
-def decide_on_weather(state: TripState) -> str:
-    """Determines the next step based on the weather decision."""
-    print("---Conditional Branch: Evaluating Weather---")
-    if state.get('decision').get('decision') in ["unfavorable", "unfavourable"]:
-        print("---Decision: Unfavorable weather. Suggesting alternatives.---")
-        return "alternate_suggestions"
-    else:
-        print("---Decision: Favorable weather. Proceeding with planning.---")
-        return "planner"
-
-workflow.add_conditional_edges(
-    "weather_decision", # The node that produces the output for the decision
-    decide_on_weather,  # The function that makes the decision
-    {
-        "alternate_suggestions": "alternate_suggestions",
-        "planner": "planner"
+def _build_graph() -> CompiledGraph:
+    """Builds and compiles the graph; runs once, on the first plan (or in warm_up)."""
+    from langgraph.graph import StateGraph, END
+
+    from trip_graph.nodes.weather_node import weather_node
+    from trip_graph.nodes.weather_decision_node import weather_decision_node
+    from trip_graph.nodes.planner_node import planner_node
+    from trip_graph.nodes.flight_node import flight_node
+    from trip_graph.nodes.hotel_node import hotel_node
+    from trip_graph.nodes.summary_node import summary_node
+    from trip_graph.nodes.alternate_suggestion_node import alternate_suggestion_node
+    from trip_graph.nodes.alternate_validation_node import alternate_validation_node
+
+    # --- 2. Build the Graph ---
+
+    # Create the graph object
+    workflow = StateGraph(TripState)
+
+    # Add all the nodes to the graph. The first argument is a unique name for the node.
+    # The second argument is the runnable object created by your factory function.
+    workflow.add_node("weather", reusable_node("weather", instrumented_node("weather", weather_node())))
+    workflow.add_node("weather_decision", reusable_node("weather_decision", instrumented_node("weather_decision", weather_decision_node())))
+    branch_nodes = {
+        "planner": timed_branch("planner", instrumented_node("planner", planner_node()), FAVOURABLE_BRANCHES["planner"]),
+        "flight": timed_branch("flight", instrumented_node("flight", flight_node()), FAVOURABLE_BRANCHES["flight"]),
+        "hotel": timed_branch("hotel", instrumented_node("hotel", hotel_node()), FAVOURABLE_BRANCHES["hotel"]),
     }
-)
+    for name, branch in branch_nodes.items():
+        workflow.add_node(name, branch)
+    workflow.add_node("summary", reusable_node("summary", instrumented_node("summary", summary_node())))
+    workflow.add_node("alternate_suggestions", reusable_node("alternate_suggestions", instrumented_node("alternate_suggestions", alternate_suggestion_node())))
+    workflow.add_node("alternate_validation", reusable_node("alternate_validation", instrumented_node("alternate_validation", alternate_validation_node())))
+
+    # --- 3. Define the Edges (the Flow of Logic) ---
+
+    # Set the entry point of the graph
+    workflow.set_entry_point("weather")
+
+    # Simple edges connect one node directly to the next
+    workflow.add_edge("weather", "weather_decision")
+    # planner, flight and hotel fan out in parallel and join at summary, which waits for all three
+    workflow.add_edge(list(FAVOURABLE_BRANCHES), "summary")
+    workflow.add_edge("summary", END) # The summary node is a final step
+    # Suggestions are over-generated, then checked against their own forecasts before the graph ends
+    workflow.add_edge("alternate_suggestions", "alternate_validation")
+    workflow.add_edge("alternate_validation", END)
+
+    # Conditional edges decide the next step based on the current state
+    def decide_on_weather(state: TripState):
+        """Determines the next step(s) based on the weather decision."""
+        print("---Conditional Branch: Evaluating Weather---")
+        if state.get('decision').get('decision') in ["unfavorable", "unfavourable"]:
+            print("---Decision: Unfavorable weather. Suggesting alternatives.---")
+            return "alternate_suggestions"
+        else:
+            print("---Decision: Favorable weather. Proceeding with planning.---")
+            return list(FAVOURABLE_BRANCHES)
+
+    workflow.add_conditional_edges(
+        "weather_decision", # The node that produces the output for the decision
+        decide_on_weather,  # The function that makes the decision
+        {
+            "alternate_suggestions": "alternate_suggestions",
+            "planner": "planner",
+            "flight": "flight",
+            "hotel": "hotel"
+        }
+    )
+
+    # --- 4. Compile the Graph into a Runnable App ---
+    # Every run is checkpointed per thread, so a changed request on the same thread only reruns
+    # the nodes whose inputs changed (see trip_graph/incremental.py)
+    checkpointer = create_checkpointer()
+    app = workflow.compile(checkpointer=checkpointer)
+    return CompiledGraph(workflow, app, checkpointer, branch_nodes)
+
+def _graph() -> CompiledGraph:
+    return clients.shared("trip_graph", _build_graph)
 
-# --- 4. Compile the Graph into a Runnable App ---
-app = workflow.compile()
+_warm_up_started = threading.Event()
+
+def warm_up():
+    """
+    Builds the graph and the API clients in a background thread, so a freshly started app
+    renders right away and the first plan doesn't pay for the imports. Only the first call
+    does anything.
+    """
+    if _warm_up_started.is_set():
+        return
+    _warm_up_started.set()
+
+    def _build():
+        started = time.perf_counter()
+        try:
+            _graph()
+            clients.weather(), clients.flights(), clients.hotels(), clients.gemini()
+        except Exception as e:
+            # e.g. a missing API key; the first plan reports it properly
+            print(f"---Warm-up stopped early: {e}---")
+            return
+        print(f"---Graph and clients warmed up in {time.perf_counter() - started:.2f}s---")
+
+    threading.Thread(target=_build, name="warm-up", daemon=True).start()
+
+@asynccontextmanager
+async def _async_app():
+    # SqliteSaver is sync-only, so with the sqlite backend each async run compiles against its own async saver
+    graph = _graph()
+    async with async_checkpointer(graph.checkpointer) as saver:
+        yield graph.app if saver is graph.checkpointer else graph.workflow.compile(checkpointer=saver)
 
 # --- 5. Create the Main Function to Invoke the Graph ---
-@traceable(name="Trip Creation Graph", tags=["trip-planner", "langgraph"])
-def create_trip_graph(source, destination, start_date, num_days, trip_type, budget, travellers):
-    """Prepares inputs and invokes the compiled LangGraph app."""
+def _initial_state(source, destination, start_date, num_days, trip_type, budget, travellers):
     start_dt = datetime.strptime(start_date, '%Y-%m-%d')
     delta = timedelta(days=(num_days - 1))
     end_dt = start_dt + delta
     end_date = end_dt.strftime('%Y-%m-%d')
     
     # Initial input state for the graph
-    initial_state = {
+    return {
         "source": source,
         "destination": destination,
         "start_date": start_date,
@@ -220,14 +353,161 @@ def create_trip_graph(source, destination, start_date, num_days, trip_type, budg
         "travellers": travellers
     }
 
-    # Invoke the graph with the initial state
-    final_state = app.invoke(initial_state)
+def _run_inputs(initial_state, previous, thread_id):
+    """
+    Input state for a run on thread_id and the checkpointed outputs that are still valid for it.
+    Graph outputs are cleared so nothing from the previous plan leaks into this one unless reused.
+    """
+    reuse = reusable_outputs(previous, initial_state)
+    if reuse:
+        print(f"---Reusing {', '.join(reuse)} from the last plan on this thread---")
+    inputs = {**{field: None for field in OUTPUT_FIELDS}, **initial_state}
+    return inputs, reuse, {"thread_id": thread_id, "reuse": reuse}
+
+def _start_speculation(initial_state, speculative, itinerary_listener=None, reuse=None):
+    """Starts the speculative branches if requested and returns (speculation, invoke config)."""
+    configurable = {}
+    if itinerary_listener is not None:
+        configurable["itinerary_listener"] = itinerary_listener
+    if speculative is None:
+        speculative = SPECULATIVE_EXECUTION
+    if not speculative:
+        return None, {"configurable": configurable}
+    # Speculative branches stream into a buffer; a discarded run must not reach the UI
+    listener = BufferedListener(itinerary_listener) if itinerary_listener is not None else None
+    branch_config = {"configurable": {"itinerary_listener": listener} if listener is not None else {}}
+    speculation = SpeculativeRun(
+        initial_state,
+        {
+            name: partial(branch.execute, config=branch_config)
+            for name, branch in _graph().branch_nodes.items()
+            if name not in (reuse or {})
+        },
+        listener=listener,
+    )
+    configurable["speculation"] = speculation
+    return speculation, {"configurable": configurable}
+
+def _finalise(final_state, speculation, started):
+    total = time.perf_counter() - started
+    final_state.setdefault("branch_timings", {})["total"] = round(total, 3)
     
     # Determine the final status based on the graph's path
     weather_decision_result = final_state.get("decision", {})
     if weather_decision_result.get("decision") in ["unfavorable", "unfavourable"]:
         final_state["status"] = "unfavorable"
+        if speculation is not None:
+            speculation.discard()
     else:
         final_state["status"] = "favorable"
-        
-    return final_state
\ No newline at end of file
+        if speculation is not None:
+            speculation.finish()
+
+    registry.inc("plans_total", status=final_state["status"])
+    registry.observe("plan_duration_seconds", total)
+    return final_state
+
+# Identical requests share one graph run and its result for a while
+plan_cache = PlanCache()
+
+def _is_complete(final_state):
+    # Plans where an LLM step failed are shown with a Retry button; don't hand them out again
+    if final_state.get("status") == "unfavorable":
+        return final_state.get("alternate_suggestions") is not None
+    return final_state.get("itinerary") is not None and final_state.get("summary") is not None
+
+@traceable(name="Trip Creation Graph", tags=["trip-planner", "langgraph"])
+def create_trip_graph(
+    source, destination, start_date, num_days, trip_type, budget, travellers,
+    speculative=None, itinerary_listener=None, thread_id=None,
+):
+    """
+    Prepares inputs and invokes the compiled LangGraph app.
+
+    With speculative=True (defaults to the SPECULATIVE_EXECUTION setting) the planner, flight
+    and hotel branches start right away, alongside weather and weather_decision, and their
+    results are thrown away if the weather turns out unfavourable.
+
+    itinerary_listener, if given, is called as listener(day_key, day) from the planner's
+    thread for every itinerary day as soon as it has been streamed. It isn't called when the
+    plan comes from plan_cache or from an identical run that was already in progress. With
+    speculation, days are held back until the weather decision is favourable.
+
+    thread_id identifies a planning session (e.g. one Streamlit session). Runs on the same
+    thread are checkpointed, and a later request only reruns the nodes whose inputs changed,
+    e.g. a new budget reruns planner, hotel and summary but not weather or flights. Without
+    a thread_id the run is one-off and its checkpoints are dropped afterwards.
+    """
+    initial_state = _initial_state(source, destination, start_date, num_days, trip_type, budget, travellers)
+
+    def _invoke():
+        app, checkpointer = _graph().app, _graph().checkpointer
+        thread = thread_id or f"oneshot-{uuid.uuid4().hex}"
+        previous = {}
+        if thread_id:
+            previous = app.get_state({"configurable": {"thread_id": thread}}).values
+            # Only the last plan is ever reused; drop its checkpoints rather than keep every one
+            checkpointer.delete_thread(thread)
+            evict_idle_threads(checkpointer, thread)
+        inputs, reuse, run_config = _run_inputs(initial_state, previous, thread)
+
+        # Invoke the graph with the initial state
+        started = time.perf_counter()
+        speculation, config = _start_speculation(initial_state, speculative, itinerary_listener, reuse)
+        config["configurable"].update(run_config)
+        try:
+            final_state = app.invoke(inputs, config=config)
+        except Exception:
+            if speculation is not None:
+                speculation.discard()
+            raise
+        finally:
+            if not thread_id:
+                checkpointer.delete_thread(thread)
+        return _finalise(final_state, speculation, started)
+
+    return plan_cache.run(plan_key(initial_state), _invoke, cacheable=_is_complete)
+
+@traceable(name="Trip Creation Graph (async)", tags=["trip-planner", "langgraph"])
+async def acreate_trip_graph(
+    source, destination, start_date, num_days, trip_type, budget, travellers,
+    speculative=None, itinerary_listener=None, thread_id=None,
+):
+    """
+    Async counterpart of create_trip_graph. Runs the compiled app with ainvoke, so every
+    node uses its async implementation and upstream calls overlap on one event loop.
+    """
+    initial_state = _initial_state(source, destination, start_date, num_days, trip_type, budget, travellers)
+
+    async def _ainvoke():
+        async with _async_app() as compiled:
+            thread = thread_id or f"oneshot-{uuid.uuid4().hex}"
+            previous = {}
+            if thread_id:
+                previous = (await compiled.aget_state({"configurable": {"thread_id": thread}})).values
+                await compiled.checkpointer.adelete_thread(thread)
+                evict_idle_threads(_graph().checkpointer, thread)
+            inputs, reuse, run_config = _run_inputs(initial_state, previous, thread)
+
+            started = time.perf_counter()
+            speculation, config = _start_speculation(initial_state, speculative, itinerary_listener, reuse)
+            config["configurable"].update(run_config)
+            try:
+                final_state = await compiled.ainvoke(inputs, config=config)
+            except Exception:
+                if speculation is not None:
+                    speculation.discard()
+                raise
+            finally:
+                if not thread_id:
+                    await compiled.checkpointer.adelete_thread(thread)
+        return _finalise(final_state, speculation, started)
+
+    return await plan_cache.arun(plan_key(initial_state), _ainvoke, cacheable=_is_complete)
+
+# Plans suggested alternates in the background; app.py schedules and claims them
+plan_prefetcher = PlanPrefetcher(create_trip_graph)
+
+registry.register_collector("plan_cache", plan_cache.stats)
+registry.register_collector("plan_prefetch", plan_prefetcher.stats.snapshot)
+registry.register_collector("checkpoint_threads", thread_tracker.stats)
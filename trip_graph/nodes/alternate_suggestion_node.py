@@ -1,10 +1,14 @@
-from modules.llm_gemini import GeminiLLM
-from langchain_core.runnables import RunnablePassthrough
+from modules import clients
+from trip_graph.schemas import AlternateSuggestions
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 
-def alternate_suggestion_node():
-    gemini = GeminiLLM()
+SUGGESTIONS_CACHE_TTL = 6 * 60 * 60
 
-    def _generate_alternatives(state):
+# Over-generate: alternate_validation_node checks every candidate's forecast and keeps the best 3
+NUM_CANDIDATES = 8
+
+def alternate_suggestion_node():
+    def _build_prompt(state):
         weather_data = state.get("weather_data")
         destination = state.get("destination")
         start_date = state.get("start_date")
@@ -16,36 +20,34 @@ def alternate_suggestion_node():
         The weather forecast for {destination} from {start_date} for {num_days} days is unfavorable 
         (details: {weather_data}).
 
-        Suggest 3 alternate Indian destinations with airports that would be better suited for a {trip_type.lower()} trip 
+        Suggest {NUM_CANDIDATES} alternate Indian destinations with airports that would be better suited for a {trip_type.lower()} trip 
         around the same time. Consider similar budget range ({budget}) and traveler comfort.
         
         For each alternate destination, provide:
         - The destination name
         - A short reason why it’s a good alternative (e.g., weather, attractions, vibe)
-        
-        **Output Format:**
-        You must respond ONLY with a single, valid JSON in the below-mentioned format. Do not include any introductory text, explanations, or markdown formatting outside of the JSON structure.
-
-        {{
-        "alternate_suggestions": [
-            {{
-            "place": "Name of Destination 1",
-            "reason": "A short, compelling reason why this is a good alternative, highlighting its great weather and suitability for the trip type."
-            }},
-            {{
-            "place": "Name of Destination 2",
-            "reason": "A short, compelling reason why this is a good alternative, highlighting its great weather and suitability for the trip type."
-            }},
-            {{
-            "place": "Name of Destination 3",
-            "reason": "A short, compelling reason why this is a good alternative, highlighting its great weather and suitability for the trip type."
-            }}
-        ]
-        }}
         """
+        return prompt
 
-        response = gemini.generate(prompt, use_google_search=True)
+    def _generation_kwargs(state):
+        return {
+            "task": "alternate_suggestions",
+            "cache_ttl": SUGGESTIONS_CACHE_TTL,
+            "bypass_cache": state.get("bypass_cache", False),
+            "response_schema": AlternateSuggestions,
+        }
+
+    def _to_dict(suggestions):
+        return suggestions.model_dump() if suggestions is not None else None
+
+    def _generate_alternatives(state):
+        response = clients.gemini().generate(_build_prompt(state), **_generation_kwargs(state))
         # print(response)
-        return response.strip()
+        return _to_dict(response)
+
+    async def _agenerate_alternatives(state):
+        return _to_dict(await clients.gemini().agenerate(_build_prompt(state), **_generation_kwargs(state)))
 
-    return RunnablePassthrough.assign(alternate_suggestions=_generate_alternatives)
+    return RunnablePassthrough.assign(
+        alternate_suggestions=RunnableLambda(_generate_alternatives, afunc=_agenerate_alternatives)
+    )
@@ -0,0 +1,72 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+import numpy as np
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+from modules import clients
+from modules.weather_scorer import score_forecasts
+
+# How many validated alternates the user gets to choose from
+MAX_ALTERNATES = 3
+
+# Shared by every graph built in this process, like speculation.py's pool
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="alternate-weather")
+
+def alternate_validation_node():
+    def _candidates(state):
+        suggestions = state.get("alternate_suggestions") or {}
+        return [item for item in suggestions.get("alternate_suggestions", []) if item.get("place")]
+
+    def _forecast_or_none(place, state):
+        # An unknown city or a failed call just drops that candidate
+        try:
+            return clients.weather().get_daily_forecast(place, state.get("start_date"), state.get("num_days"))
+        except Exception as e:
+            print(f"---No forecast for alternate {place}: {e}---")
+            return None
+
+    async def _aforecast_or_none(place, state):
+        try:
+            return await clients.weather().aget_daily_forecast(place, state.get("start_date"), state.get("num_days"))
+        except Exception as e:
+            print(f"---No forecast for alternate {place}: {e}---")
+            return None
+
+    def _rank(state, candidates, forecasts):
+        scores = score_forecasts(
+            [(f or {}).get("forecast", []) for f in forecasts], state.get("trip_type")
+        )
+        # Highest score first, keeping only the candidates whose forecast is actually favourable
+        order = [i for i in np.argsort(-scores["score"], kind="stable") if scores["favourable"][i]]
+        ranked = [
+            {**candidates[i], "weather_score": round(float(scores["score"][i]), 3)}
+            for i in order[:MAX_ALTERNATES]
+        ]
+        print(f"---Alternates with favourable weather: {len(ranked)} of {len(candidates)}---")
+        return {"alternate_suggestions": ranked}
+
+    def _validate(state):
+        candidates = _candidates(state)
+        if not candidates:
+            return state.get("alternate_suggestions")
+        # All forecasts are fetched side by side, so this costs about one forecast call
+        futures = [
+            _executor.submit(copy_context().run, _forecast_or_none, item["place"], state) for item in candidates
+        ]
+        forecasts = [future.result() for future in futures]
+        return _rank(state, candidates, forecasts)
+
+    async def _avalidate(state):
+        candidates = _candidates(state)
+        if not candidates:
+            return state.get("alternate_suggestions")
+        forecasts = await asyncio.gather(*(_aforecast_or_none(item["place"], state) for item in candidates))
+        return _rank(state, candidates, forecasts)
+
+    return RunnablePassthrough.assign(
+        alternate_suggestions=RunnableLambda(_validate, afunc=_avalidate)
+    )
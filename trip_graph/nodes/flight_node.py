@@ -1,7 +1,5 @@
-from langchain_core.runnables import RunnablePassthrough
-from modules.flight_api import FlightSearch
-
-flight_searcher = FlightSearch()
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+from modules import clients
 
 def flight_node():
     def _search_flights(inputs):
@@ -10,6 +8,12 @@ def flight_node():
         start_date = inputs.get("start_date")
         end_date = inputs.get("end_date")
         # print("Flight Runnable")
-        flights = flight_searcher.get_round_trip_flights(source, destination, start_date, end_date)
+        flights = clients.flights().get_round_trip_flights(source, destination, start_date, end_date)
         return flights
-    return RunnablePassthrough.assign(flights=_search_flights)
\ No newline at end of file
+
+    async def _asearch_flights(inputs):
+        return await clients.flights().aget_round_trip_flights(
+            inputs.get("source", "Delhi"), inputs.get("destination"), inputs.get("start_date"), inputs.get("end_date")
+        )
+
+    return RunnablePassthrough.assign(flights=RunnableLambda(_search_flights, afunc=_asearch_flights))
@@ -1,18 +1,23 @@
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 
-from langchain_core.runnables import RunnablePassthrough
-from modules.hotel_api import HotelSearch
-
-hotel_searcher = HotelSearch()
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+from modules import clients
 
 def hotel_node():
-    def _fetch(inputs):
+    def _params(inputs):
         q = inputs.get("destination")
         check_in_date = inputs.get("start_date")
         check_out_date = inputs.get("end_date")
-        num_travellers = inputs.get("num_travellers")
+        num_travellers = inputs.get("travellers")
         budget = inputs.get("budget")
-        hotel_results = hotel_searcher.search_hotels(q, check_in_date, check_out_date, num_travellers, budget)
+        return q, check_in_date, check_out_date, num_travellers, budget
+
+    def _fetch(inputs):
+        hotel_results = clients.hotels().search_hotels(*_params(inputs))
         return hotel_results
-    return RunnablePassthrough.assign(hotels=_fetch)
+
+    async def _afetch(inputs):
+        return await clients.hotels().asearch_hotels(*_params(inputs))
+
+    return RunnablePassthrough.assign(hotels=RunnableLambda(_fetch, afunc=_afetch))
@@ -1,13 +1,21 @@
 import sys, os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+from datetime import date
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 
-from langchain_core.runnables import RunnablePassthrough
-from modules.llm_gemini import GeminiLLM
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+from config import PLANNER_CHUNKED_MIN_DAYS, PLANNER_CHUNK_DAYS, PLANNER_CHUNK_CONCURRENCY
+from modules import clients
+from trip_graph.itinerary_chunks import ChunkMerger, chunk_days, day_span
+from trip_graph.itinerary_stream import DayBlockParser
+from trip_graph.schemas import Itinerary, TripSkeleton
 
-gemini = GeminiLLM()
+ITINERARY_CACHE_TTL = 24 * 60 * 60
 
 def planner_node():
-  def _generate_plan(state):
+  def _build_prompt(state):
     destination = state.get("destination")
     start_date = state.get("start_date")
     end_date = state.get("end_date")
@@ -22,15 +30,165 @@ def planner_node():
 
     Include morning, lunch, afternoon, and evening activities for each day.
     Suggest realistic tourist spots, restaurants, and local experiences.
-    Format JSON response keeping the key value format exact as given:
-    Day 1:
-      - Morning: ...
-      - Lunch: ...
-      - Afternoon: ...
-      - Evening: ...
+    Return one entry per day in "days", numbered from 1, with its Morning, Lunch,
+    Afternoon and Evening plans.
     """
+    return prompt
 
-    itinerary = gemini.generate(prompt, use_google_search=True)
-    return itinerary
+  def _generation_kwargs(state, task="planner", response_schema=Itinerary):
+    return {
+      "task": task,
+      "cache_ttl": ITINERARY_CACHE_TTL,
+      "bypass_cache": state.get("bypass_cache", False),
+      "response_schema": response_schema,
+    }
+
+  # --- Chunked mode for long trips: skeleton first, then day blocks in parallel ---
+
+  def _num_days(state):
+    if state.get("num_days"):
+      return int(state["num_days"])
+    # The "Retry Itinerary" button only passes the dates
+    start, end = date.fromisoformat(state["start_date"]), date.fromisoformat(state["end_date"])
+    return (end - start).days + 1
+
+  def _chunked(state):
+    return PLANNER_CHUNKED_MIN_DAYS > 0 and _num_days(state) >= PLANNER_CHUNKED_MIN_DAYS
+
+  def _skeleton_prompt(state):
+    return f"""
+    You are a travel planner AI. Sketch a {_num_days(state)}-day {state.get("trip_type").lower()} trip
+    to {state.get("destination")} from {state.get("start_date")} to {state.get("end_date")} for
+    {state.get("travellers")} people with a {state.get("budget").lower()} budget.
+
+    For every day, numbered from 1, give only the area or neighbourhood (or nearby excursion) it is
+    spent in and a short theme. Spread the days over different areas so no two days repeat the same
+    sights, and keep travel between consecutive days realistic.
+    """
+
+  def _chunk_prompt(state, skeleton, days):
+    outline = "\n".join(f"    Day {d.day}: {d.area} ({d.theme})" for d in sorted(skeleton.days, key=lambda d: d.day))
+    return f"""
+    You are a travel planner AI. This is part of a {_num_days(state)}-day {state.get("trip_type").lower()} trip
+    to {state.get("destination")} from {state.get("start_date")} to {state.get("end_date")} for
+    {state.get("travellers")} people with a {state.get("budget").lower()} budget.
+
+    The whole trip is laid out as:
+{outline}
+
+    Plan only {day_span(days)}, sticking to each day's area and theme. Include morning, lunch,
+    afternoon, and evening activities with realistic tourist spots, restaurants, and local
+    experiences, and don't reuse places that belong to the other days of the outline.
+    Return one entry per day in "days", keeping the day numbers above, with its Morning, Lunch,
+    Afternoon and Evening plans.
+    """
+
+  def _emit(listener, days):
+    if listener is not None:
+      for day_key, day in days:
+        listener(day_key, day)
+
+  def _generate_chunked(state, listener):
+    gemini = clients.gemini()
+    skeleton = gemini.generate(_skeleton_prompt(state), **_generation_kwargs(state, "planner_skeleton", TripSkeleton))
+    if skeleton is None or not skeleton.days:
+      print("---No trip skeleton; planning the itinerary in one call---")
+      return None
+
+    merger = ChunkMerger(_num_days(state))
+    chunks = chunk_days(merger.num_days, PLANNER_CHUNK_DAYS)
+    print(f"---Planning {merger.num_days} days in {len(chunks)} chunks---")
+
+    def _chunk(days):
+      return gemini.generate(_chunk_prompt(state, skeleton, days), **_generation_kwargs(state, "planner_chunk"))
+
+    # Each worker keeps the caller's context (rate-limit priority, node attribution)
+    with ThreadPoolExecutor(max_workers=min(PLANNER_CHUNK_CONCURRENCY, len(chunks)), thread_name_prefix="itinerary") as pool:
+      futures = {pool.submit(copy_context().run, _chunk, days): days for days in chunks}
+      for future in as_completed(futures):
+        _emit(listener, merger.add(futures[future], future.result()))
+
+    missing = merger.missing()
+    if missing:
+      # Failed chunks and dropped duplicates get one more go, together
+      print(f"---Re-planning {day_span(missing)}---")
+      _emit(listener, merger.add(missing, _chunk(missing)))
+    _emit(listener, merger.skip_missing())
+    if merger.missing():
+      print(f"---Itinerary is missing {day_span(merger.missing())}---")
+    return merger.itinerary()
+
+  async def _agenerate_chunked(state, listener):
+    gemini = clients.gemini()
+    skeleton = await gemini.agenerate(_skeleton_prompt(state), **_generation_kwargs(state, "planner_skeleton", TripSkeleton))
+    if skeleton is None or not skeleton.days:
+      print("---No trip skeleton; planning the itinerary in one call---")
+      return None
+
+    merger = ChunkMerger(_num_days(state))
+    chunks = chunk_days(merger.num_days, PLANNER_CHUNK_DAYS)
+    print(f"---Planning {merger.num_days} days in {len(chunks)} chunks---")
+    semaphore = asyncio.Semaphore(PLANNER_CHUNK_CONCURRENCY)
+
+    async def _chunk(days):
+      async with semaphore:
+        return days, await gemini.agenerate(_chunk_prompt(state, skeleton, days), **_generation_kwargs(state, "planner_chunk"))
+
+    for finished in asyncio.as_completed([_chunk(days) for days in chunks]):
+      days, itinerary = await finished
+      _emit(listener, merger.add(days, itinerary))
+
+    missing = merger.missing()
+    if missing:
+      print(f"---Re-planning {day_span(missing)}---")
+      _emit(listener, merger.add(*(await _chunk(missing))))
+    _emit(listener, merger.skip_missing())
+    if merger.missing():
+      print(f"---Itinerary is missing {day_span(merger.missing())}---")
+    return merger.itinerary()
+
+  def _to_display(itinerary):
+    # None means the call failed; the app shows an error instead of the itinerary
+    return itinerary.to_display() if itinerary is not None else None
+
+  def _listener(config):
+    # app.py passes a callback here to render each day as soon as Gemini finishes it
+    return (config or {}).get("configurable", {}).get("itinerary_listener")
+
+  def _generate_plan(state, config):
+    listener = _listener(config)
+    if _chunked(state):
+      itinerary = _generate_chunked(state, listener)
+      if itinerary is not None:
+        return _to_display(itinerary)
+
+    if listener is None:
+      return _to_display(clients.gemini().generate(_build_prompt(state), **_generation_kwargs(state)))
+
+    parser = DayBlockParser()
+    parts = []
+    for chunk in clients.gemini().generate_stream(_build_prompt(state), **_generation_kwargs(state)):
+      parts.append(chunk)
+      for day_key, day in parser.feed(chunk):
+        listener(day_key, day)
+    return _to_display(clients.gemini().parse_structured("".join(parts), Itinerary))
+
+  async def _agenerate_plan(state, config):
+    listener = _listener(config)
+    if _chunked(state):
+      itinerary = await _agenerate_chunked(state, listener)
+      if itinerary is not None:
+        return _to_display(itinerary)
+
+    if listener is None:
+      return _to_display(await clients.gemini().agenerate(_build_prompt(state), **_generation_kwargs(state)))
+
+    parser = DayBlockParser()
+    parts = []
+    async for chunk in clients.gemini().agenerate_stream(_build_prompt(state), **_generation_kwargs(state)):
+      parts.append(chunk)
+      for day_key, day in parser.feed(chunk):
+        listener(day_key, day)
+    return _to_display(clients.gemini().parse_structured("".join(parts), Itinerary))
   
-  return RunnablePassthrough.assign(itinerary=_generate_plan)
\ No newline at end of file
+  return RunnablePassthrough.assign(itinerary=RunnableLambda(_generate_plan, afunc=_agenerate_plan))
\ No newline at end of file
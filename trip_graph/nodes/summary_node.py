@@ -1,18 +1,20 @@
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 
-from langchain_core.runnables import RunnablePassthrough
-from modules.llm_gemini import GeminiLLM
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+from modules import clients
+from trip_graph.schemas import TripSummary
+from trip_graph.projection import project_flights, project_hotels, to_prompt_json, estimate_tokens
 
-gemini = GeminiLLM()
+
+# The prompt embeds live flight and hotel prices, so don't reuse it for long
+SUMMARY_CACHE_TTL = 60 * 60
 
 def summary_node():
-    def _create_summary(state):
+    def _build_prompt(state, flights, hotels):
         destination = state.get("destination")
         itinerary = state.get("itinerary")
-        flights = state.get("flights")
-        hotels = state.get("hotels")
-        weather = state.get("weather")
+        weather = state.get("weather_data")
         travellers = state.get("travellers")
         budget = state.get("budget")
         
@@ -26,13 +28,32 @@ def summary_node():
         - Weather: {weather}
 
         Summarize key highlights, best activities, and overall travel plan.
-        Format for the output should be JSON response keeping the key value format exact as given:
+        Fill in the fields as follows:
         - weather_tips: According give tips such as carry sunscreen, umbrella, drink coconut water or something relevant. Generate in list format
-        - flight: Summary to choose the best flight for the round trip keeping budget in mind. 2-3 lines of summary/recommendation from {flights}
-        - accomodation: Recommendation of hotel based on data given. 2-3 lines of summary/recommendation from {hotels}
+        - flight: Summary to choose the best flight for the round trip keeping budget in mind. 2-3 lines of summary/recommendation from the flight options above
+        - accomodation: Recommendation of hotel based on data given. 2-3 lines of summary/recommendation from the hotels above
         - activities: List format of activities for example, [bungee jumping at XYZ, camel riding at XYZ, ....]
         - dining: List format of dishes to try out special at {destination}, for example format, [Salmon fish, Rasgulla, ...]
         """
-        return gemini.generate(prompt)
+        return prompt
+
+    def _prompt(state):
+        # Only the compact projection of the flight and hotel records goes to the LLM
+        prompt = _build_prompt(
+            state,
+            to_prompt_json(project_flights(state.get("flights"))),
+            to_prompt_json(project_hotels(state.get("hotels"))),
+        )
+        print(f"---Summary prompt: ~{estimate_tokens(prompt)} tokens---")
+        return prompt
+
+    def _to_dict(summary):
+        return summary.model_dump() if summary is not None else None
+
+    def _create_summary(state):
+        return _to_dict(clients.gemini().generate(_prompt(state), cache_ttl=SUMMARY_CACHE_TTL, response_schema=TripSummary, task="summary"))
+
+    async def _acreate_summary(state):
+        return _to_dict(await clients.gemini().agenerate(_prompt(state), cache_ttl=SUMMARY_CACHE_TTL, response_schema=TripSummary, task="summary"))
     
-    return RunnablePassthrough.assign(summary=_create_summary)
\ No newline at end of file
+    return RunnablePassthrough.assign(summary=RunnableLambda(_create_summary, afunc=_acreate_summary))
\ No newline at end of file
@@ -1,19 +1,13 @@
-import re
-import json
-from langchain_core.runnables import RunnablePassthrough
-from modules.llm_gemini import GeminiLLM
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+from modules import clients
+from modules.weather_scorer import evaluate_forecast
+from trip_graph.schemas import WeatherDecision
 
-gemini = GeminiLLM()
+
+WEATHER_DECISION_CACHE_TTL = 3 * 60 * 60
 
 def weather_decision_node():
-    def _evaluate(state):
-        weather_data = state.get('weather_data')
-        # print("\n---Evaluating Weather---")
-        # print(weather_data)
-        if "forecast" not in weather_data or not weather_data.get("forecast"):
-            # print("Deciding...")
-            return {"decision": "unknown", "reason": "No weather data available"}
-        
+    def _build_prompt(weather_data):
         # print("---Weather Checker---")
         weather_forecast = weather_data.get('forecast')
         # print(weather_forecast)
@@ -24,27 +18,64 @@ def weather_decision_node():
         {weather_forecast}
         
         Is this weather forecast good for planning a trip to {weather_data.get('city')}.
-        Give the output in following json format
-        decision: "favourable" or "unfavourable"
-        reason: (if decision == unfavourable)
+        Answer with decision "favourable" or "unfavourable", and a short reason
+        (leave the reason empty when favourable).
         """
-        
-        # print("---Weather Suitability---")
-        weather_response = gemini.generate(prompt)
-        
-        decision_json = {"decision": "unknown", "reason": "Failed to parse LLM response"}
-
-        # Use a more robust regex to find the JSON block
-        match = re.search(r'\{[\s\S]*\}', weather_response)
-        if match:
-            try:
-                # This will now UPDATE the variable if successful
-                decision_json = json.loads(match.group(0))
-            except json.JSONDecodeError:
-                print("Error: Failed to decode JSON from LLM response.")
+        return prompt
+
+    def _to_decision(weather_decision):
+        if weather_decision is None:
+            decision_json = {"decision": "unknown", "reason": "Failed to get a decision from the LLM"}
+        else:
+            decision_json = weather_decision.model_dump()
         
         print(f"---Weather Decision: {decision_json.get('decision')}---")
         # print("Output decision", decision_json)
         return decision_json
 
-    return RunnablePassthrough.assign(decision=_evaluate)
+    def _has_forecast(weather_data):
+        # print("\n---Evaluating Weather---")
+        # print(weather_data)
+        return "forecast" in weather_data and bool(weather_data.get("forecast"))
+
+    def _score(state):
+        # Clear-cut forecasts are decided by the rule-based scorer; only the borderline ones reach Gemini
+        scored = evaluate_forecast(state['weather_data'].get('forecast'), state.get('trip_type'))
+        print(f"---Weather Score: {scored['score']} ({scored['verdict']})---")
+        if scored["verdict"] == "ambiguous":
+            return None
+        return {"decision": scored["verdict"], "reason": scored["reason"]}
+
+    def _evaluate(state):
+        weather_data = state.get('weather_data')
+        if not _has_forecast(weather_data):
+            # print("Deciding...")
+            return {"decision": "unknown", "reason": "No weather data available"}
+
+        decision = _score(state)
+        if decision is not None:
+            return decision
+        
+        # print("---Weather Suitability---")
+        weather_response = clients.gemini().generate(
+            _build_prompt(weather_data), cache_ttl=WEATHER_DECISION_CACHE_TTL, response_schema=WeatherDecision,
+            task="weather_decision",
+        )
+        return _to_decision(weather_response)
+
+    async def _aevaluate(state):
+        weather_data = state.get('weather_data')
+        if not _has_forecast(weather_data):
+            return {"decision": "unknown", "reason": "No weather data available"}
+
+        decision = _score(state)
+        if decision is not None:
+            return decision
+
+        weather_response = await clients.gemini().agenerate(
+            _build_prompt(weather_data), cache_ttl=WEATHER_DECISION_CACHE_TTL, response_schema=WeatherDecision,
+            task="weather_decision",
+        )
+        return _to_decision(weather_response)
+
+    return RunnablePassthrough.assign(decision=RunnableLambda(_evaluate, afunc=_aevaluate))
@@ -0,0 +1,163 @@
+# trip_graph/plan_cache.py
+import asyncio
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from modules.metrics import registry
+from modules.rate_limiter import current_priority
+from config import PLAN_CACHE_TTL, PLAN_CACHE_MAX_ENTRIES, PLAN_CACHE_MAX_BYTES
+
+
+class PlanCache:
+    """
+    Whole-plan result store for create_trip_graph with single-flight coalescing.
+
+    Finished plans are kept for ttl_seconds, bounded by entry count and by their approximate
+    serialised size; the least recently used go first. While a plan is being computed, identical
+    requests wait for that run instead of starting their own, unless it runs at a lower request
+    priority (e.g. a background prefetch): waiting on it would leave a user queued behind work
+    nobody was waiting on, so they start their own run instead. Callers always get their own deep
+    copy, because the app edits results in place (e.g. after regenerating the itinerary).
+    """
+
+    def __init__(self, ttl_seconds=PLAN_CACHE_TTL, max_entries=PLAN_CACHE_MAX_ENTRIES,
+                 max_bytes=PLAN_CACHE_MAX_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, size, result)
+        self._in_flight = {}           # key -> (priority, Future shared by everyone waiting on that plan)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.superseded = 0            # runs started rather than wait on a lower-priority one
+        self.evictions = 0
+
+    def _get_locked(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            self._remove_locked(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def _remove_locked(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def _store_locked(self, key, result):
+        size = len(json.dumps(result, default=str))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove_locked(key)
+        self._entries[key] = (time.time() + self.ttl_seconds, size, copy.deepcopy(result))
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._remove_locked(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _claim(self, key):
+        """
+        Returns (cached result, None, None), (None, future to wait on, None), or for the leader
+        (None, None, future to settle).
+        """
+        priority = current_priority.get()
+        with self._lock:
+            cached = self._get_locked(key)
+            if cached is not None:
+                self.hits += 1
+                registry.inc("cache_lookups_total", cache="plan", result="hit")
+                return copy.deepcopy(cached), None, None
+            leader = self._in_flight.get(key)
+            if leader is not None and leader[0] <= priority:
+                self.coalesced += 1
+                registry.inc("cache_lookups_total", cache="plan", result="coalesced")
+                return None, leader[1], None
+            if leader is not None:
+                print("---Not waiting on a lower-priority run of the same plan---")
+                self.superseded += 1
+            self.misses += 1
+            registry.inc("cache_lookups_total", cache="plan", result="miss")
+            # A superseded run keeps its own future; later callers join this one
+            future = Future()
+            self._in_flight[key] = (priority, future)
+            return None, None, future
+
+    def _settle(self, key, future, result=None, error=None, cacheable=None):
+        with self._lock:
+            if self._in_flight.get(key, (None, None))[1] is future:
+                del self._in_flight[key]
+            # Failed runs aren't cached; their waiters get the same exception
+            if error is None and self.ttl_seconds > 0 and (cacheable is None or cacheable(result)):
+                self._store_locked(key, result)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(copy.deepcopy(result))
+
+    def run(self, key, compute, cacheable=None):
+        """
+        Returns the plan for key, computing it with compute() only if nobody else has or is.
+        cacheable(result) can veto storing a result, e.g. a plan with a failed LLM step.
+        """
+        cached, future, lead = self._claim(key)
+        if cached is not None:
+            print("---Plan cache hit---")
+            return cached
+        if future is not None:
+            print("---Joining an identical plan already in progress---")
+            return copy.deepcopy(future.result())
+        try:
+            result = compute()
+        except BaseException as e:
+            self._settle(key, lead, error=e)
+            raise
+        self._settle(key, lead, result=result, cacheable=cacheable)
+        return result
+
+    async def arun(self, key, acompute, cacheable=None):
+        """Async counterpart of run; sync and async callers share the same store and in-flight runs."""
+        cached, future, lead = self._claim(key)
+        if cached is not None:
+            print("---Plan cache hit---")
+            return cached
+        if future is not None:
+            print("---Joining an identical plan already in progress---")
+            return copy.deepcopy(await asyncio.wrap_future(future))
+        try:
+            result = await acompute()
+        except BaseException as e:
+            self._settle(key, lead, error=e)
+            raise
+        self._settle(key, lead, result=result, cacheable=cacheable)
+        return result
+
+    def clear(self):
+        """Drops every finished plan; runs in progress are left alone."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "superseded": self.superseded,
+                "hit_ratio": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "in_flight": len(self._in_flight),
+            }
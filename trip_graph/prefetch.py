@@ -0,0 +1,143 @@
+# trip_graph/prefetch.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.rate_limiter import request_priority, PREFETCH
+from config import PLAN_PREFETCH_WORKERS, PLAN_PREFETCH_TTL, PLAN_PREFETCH_MAX_ENTRIES
+
+# Niceness for prefetch threads, so interactive requests win the CPU when both are busy
+PREFETCH_NICENESS = 10
+
+
+def _lower_priority():
+    # setpriority on a thread id only lowers that thread on Linux; elsewhere this is best effort
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PREFETCH_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+def plan_key(params: dict) -> tuple:
+    """Identifies a plan by its trip parameters; places are matched case- and space-insensitively."""
+    return tuple(
+        " ".join(str(params.get(name, "")).split()).lower()
+        for name in ("source", "destination", "start_date", "num_days", "trip_type", "budget", "travellers")
+    )
+
+
+class PrefetchStats:
+    """Thread-safe counters for alternate-destination prefetching."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.scheduled = 0          # plans started in the background
+        self.hits = 0               # clicks served by a finished prefetch
+        self.superseded = 0         # clicks whose prefetch was still running, planned afresh instead
+        self.misses = 0             # clicks with nothing prefetched
+        self.failed = 0             # prefetches that raised
+        self.wasted = 0             # prefetches dropped (expired or evicted) without being used
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            claims = self.hits + self.superseded + self.misses
+            return {
+                "scheduled": self.scheduled,
+                "hits": self.hits,
+                "superseded": self.superseded,
+                "misses": self.misses,
+                "failed": self.failed,
+                "wasted": self.wasted,
+                "hit_ratio": round(self.hits / claims, 3) if claims else 0.0,
+            }
+
+
+class PlanPrefetcher:
+    """
+    Plans the suggested alternate destinations in the background while the user reads them,
+    so clicking "Plan for X" picks up a finished plan instead of starting the whole graph
+    from scratch.
+
+    Prefetches run on low-priority threads and queue for upstream quota behind everything
+    else, so a user is never left waiting on one: a prefetch that hasn't finished when it's
+    clicked is given up on, and the click plans at REGENERATION priority. Upstream responses
+    the prefetch already got are in the response caches, so that plan doesn't start from zero.
+    """
+
+    def __init__(self, plan_fn, max_workers=PLAN_PREFETCH_WORKERS, ttl_seconds=PLAN_PREFETCH_TTL,
+                 max_entries=PLAN_PREFETCH_MAX_ENTRIES):
+        self.plan_fn = plan_fn
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._plans = OrderedDict()  # plan_key -> (started_at, future)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="prefetch", initializer=_lower_priority
+        )
+        self.stats = PrefetchStats()
+
+    def _drop(self, key, future):
+        # Anything removed before it was taken is wasted; a queued one is simply cancelled
+        del self._plans[key]
+        future.cancel()
+        self.stats.add(wasted=1)
+
+    def _prune(self):
+        now = time.time()
+        for key, (started_at, future) in list(self._plans.items()):
+            if now - started_at > self.ttl_seconds:
+                self._drop(key, future)
+        while len(self._plans) > self.max_entries:
+            key, (_, future) = next(iter(self._plans.items()))
+            self._drop(key, future)
+
+    def _run(self, params):
+        try:
+            # Upstream calls made for a prefetch queue behind anything a user is waiting on
+            with request_priority(PREFETCH):
+                return self.plan_fn(**params)
+        except Exception:
+            self.stats.add(failed=1)
+            raise
+
+    def prefetch(self, base_params: dict, places: list):
+        """Starts a plan for each alternate place, reusing base_params for everything but the destination."""
+        with self._lock:
+            self._prune()
+            for place in places:
+                params = {**base_params, "destination": place}
+                key = plan_key(params)
+                if key in self._plans:
+                    continue
+                self._plans[key] = (time.time(), self._executor.submit(self._run, params))
+                self.stats.add(scheduled=1)
+                print(f"---Prefetching plan for {place}---")
+            self._prune()
+
+    def take(self, params: dict):
+        """
+        Hands over the finished prefetched plan for these parameters as a done Future, or None if
+        there isn't one. A plan can only be taken once; later requests plan from scratch again.
+        """
+        with self._lock:
+            self._prune()
+            entry = self._plans.pop(plan_key(params), None)
+        if entry is None or entry[1].cancelled():
+            self.stats.add(misses=1)
+            return None
+        future = entry[1]
+        if not future.done():
+            # Still queued or running at PREFETCH priority; a queued one doesn't need to run at all
+            future.cancel()
+            self.stats.add(superseded=1)
+            print(f"---Prefetch for {params.get('destination')} still running; planning it now instead---")
+            return None
+        self.stats.add(hits=1)
+        return future
@@ -0,0 +1,57 @@
+"""
+Compact projections of the flight and hotel records for LLM prompts.
+
+The records still carry logos, image URLs, leg details and links that the summary
+never uses; these helpers keep only the fields worth spending tokens on.
+"""
+import json
+
+from modules.travel_records import FlightTable
+
+FLIGHT_OPTIONS_PER_LEG = 3
+HOTEL_AMENITIES = 5
+
+
+def _flight_option(option) -> dict:
+    return {
+        "price": option.price,
+        "duration_min": option.total_duration,
+        "stops": option.stops,
+        "airline": option.airlines,
+        "departs": option.departs or None,
+        "arrives": option.arrives or None,
+    }
+
+
+def project_leg(options, top_k: int = FLIGHT_OPTIONS_PER_LEG) -> list:
+    """Cheapest top_k FlightOptions of one leg (options without a price go last)."""
+    return [_flight_option(o) for o in FlightTable(options or []).rank("cheapest", top_k=top_k)]
+
+
+def project_flights(flights, top_k: int = FLIGHT_OPTIONS_PER_LEG) -> dict:
+    flights = flights if isinstance(flights, dict) else {}
+    return {
+        "onward": project_leg(flights.get("onward"), top_k),
+        "return": project_leg(flights.get("return"), top_k),
+    }
+
+
+def project_hotels(hotels, top_amenities: int = HOTEL_AMENITIES) -> list:
+    return [
+        {
+            "name": hotel.name,
+            "rate": hotel.rate or None,
+            "rating": hotel.rating,
+            "amenities": list(hotel.amenities[:top_amenities]),
+        }
+        for hotel in hotels or []
+    ]
+
+
+def to_prompt_json(data) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough rule of thumb for Gemini/GPT tokenizers: ~4 characters per token
+    return (len(text) + 3) // 4
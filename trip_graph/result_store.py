@@ -0,0 +1,258 @@
+# trip_graph/result_store.py
+import os
+import pickle
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+
+from modules.metrics import registry
+from config import (
+    CACHE_DIR,
+    RESULT_STORE_MAX_BYTES,
+    RESULT_STORE_IDLE_SECONDS,
+    RESULT_STORE_DISK_TTL,
+)
+
+
+class ResultStore:
+    """
+    Server-side home for every session's trip result, so st.session_state only holds an ID.
+
+    Results stay in memory up to max_bytes (measured as their pickled size). Past that, the least
+    recently used are written zlib-compressed to local disk, as are results nobody has looked at
+    for idle_seconds. A session that comes back gets its result reloaded from disk transparently.
+    Spilled results are deleted after disk_ttl_seconds; a session whose result is gone gets None
+    and plans again.
+
+    get() hands out the stored object itself; after changing a result in place, put() it back
+    under the same ID so its size and its copy on disk stay right.
+    """
+
+    def __init__(self, max_bytes=RESULT_STORE_MAX_BYTES, idle_seconds=RESULT_STORE_IDLE_SECONDS,
+                 disk_ttl_seconds=RESULT_STORE_DISK_TTL, directory=None):
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.disk_ttl_seconds = disk_ttl_seconds
+        self.directory = directory or os.path.join(CACHE_DIR, "session_results")
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._resident = OrderedDict()  # id -> (last_access, size, result), least recently used first
+        self._spilled = {}              # id -> (spilled_at, compressed size on disk)
+        self._spilling = {}             # id -> size, for resident results being written out right now
+        self._sweeper = None
+        self.bytes = 0
+        self.disk_bytes = 0
+        self.evictions = 0              # spilled to stay under max_bytes
+        self.idle_spills = 0
+        self.reloads = 0
+        self.expired = 0
+        self.misses = 0
+        self._remove_stale_files()
+
+    def _path(self, result_id):
+        return os.path.join(self.directory, f"{result_id}.pkl.z")
+
+    def _remove_stale_files(self):
+        # Left behind by an earlier process; nothing refers to them any more once they're old
+        cutoff = time.time() - self.disk_ttl_seconds
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _drop_locked(self, result_id) -> list:
+        """Forgets result_id; returns the files the caller should delete once it lets go of the lock."""
+        entry = self._resident.pop(result_id, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+        spilled = self._spilled.pop(result_id, None)
+        if spilled is None:
+            return []
+        self.disk_bytes -= spilled[1]
+        return [self._path(result_id)]
+
+    @staticmethod
+    def _remove_files(paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _plan_sweep_locked(self):
+        """
+        Picks what to spill and expires old files. Writing is left to _finish_sweep, outside the
+        lock, so a big result or a slow disk doesn't hold up every other session.
+        """
+        now = time.time()
+        spills = []  # (result_id, resident entry, "evictions" or "idle_spills")
+        excess = self.bytes - self.max_bytes - sum(self._spilling.values())
+        last = len(self._resident) - 1
+        # Least recently used first: over budget they go to disk (all but the newest), and idle
+        # sessions go to disk even under budget
+        for position, (result_id, entry) in enumerate(self._resident.items()):
+            if result_id in self._spilling:
+                continue
+            if excess > 0 and position < last:
+                reason = "evictions"
+            elif now - entry[0] >= self.idle_seconds:
+                reason = "idle_spills"
+            else:
+                break
+            spills.append((result_id, entry, reason))
+            self._spilling[result_id] = entry[1]
+            excess -= entry[1]
+        stale = []
+        for result_id, (spilled_at, _) in list(self._spilled.items()):
+            if now - spilled_at >= self.disk_ttl_seconds:
+                stale += self._drop_locked(result_id)
+                self.expired += 1
+        return spills, stale
+
+    def _finish_sweep(self, spills, stale):
+        self._remove_files(stale)
+        for i, (result_id, entry, reason) in enumerate(spills):
+            try:
+                data = zlib.compress(pickle.dumps(entry[2], protocol=pickle.HIGHEST_PROTOCOL))
+                with open(self._path(result_id), "wb") as f:
+                    f.write(data)
+            except OSError as e:
+                # Stays in memory, over budget if need be, rather than being lost; the next sweep tries again
+                print(f"---Could not spill session result {result_id}: {e}---")
+                with self._lock:
+                    for pending, _, _ in spills[i:]:
+                        self._spilling.pop(pending, None)
+                return
+            with self._lock:
+                self._spilling.pop(result_id, None)
+                # Read or replaced while it was being written: it stays in memory after all
+                kept = self._resident.get(result_id) is not entry
+                if not kept:
+                    del self._resident[result_id]
+                    self.bytes -= entry[1]
+                    self._spilled[result_id] = (time.time(), len(data))
+                    self.disk_bytes += len(data)
+                    setattr(self, reason, getattr(self, reason) + 1)
+            if kept:
+                self._remove_files([self._path(result_id)])
+
+    def put(self, result, result_id: str = None) -> str:
+        """Stores result (replacing whatever result_id held) and returns its ID."""
+        result_id = result_id or uuid.uuid4().hex
+        size = len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            stale = self._drop_locked(result_id)
+            self._resident[result_id] = (time.time(), size, result)
+            self.bytes += size
+            spills, expired = self._plan_sweep_locked()
+        self._finish_sweep(spills, stale + expired)
+        return result_id
+
+    def get(self, result_id: str):
+        """The result stored under result_id, reloaded from disk if it was spilled; None if it's gone."""
+        if not result_id:
+            return None
+        with self._lock:
+            entry = self._resident.pop(result_id, None)
+            if entry is not None:
+                _, size, result = entry
+                self._resident[result_id] = (time.time(), size, result)
+                plan = self._plan_sweep_locked()
+            else:
+                spilled = self._spilled.get(result_id)
+                if spilled is None:
+                    self.misses += 1
+                    return None
+        if entry is not None:
+            self._finish_sweep(*plan)
+            return result
+
+        # Reading and unpickling happen without the lock; the bookkeeping is checked again after
+        error = None
+        try:
+            with open(self._path(result_id), "rb") as f:
+                result = pickle.loads(zlib.decompress(f.read()))
+            size = len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError) as e:
+            error = e
+        with self._lock:
+            current = self._resident.pop(result_id, None)
+            if current is not None:
+                # Another rerun reloaded it (and removed the file), or it was put again, meanwhile
+                stale = []
+                result = current[2]
+                self._resident[result_id] = (time.time(), current[1], result)
+            elif error is not None:
+                print(f"---Could not reload session result {result_id}: {error}---")
+                stale = self._drop_locked(result_id) if self._spilled.get(result_id) is spilled else []
+                self.misses += 1
+                result = None
+            elif self._spilled.get(result_id) is spilled:
+                stale = self._drop_locked(result_id)
+                self._resident[result_id] = (time.time(), size, result)
+                self.bytes += size
+                self.reloads += 1
+            else:
+                # Expired or discarded in the meantime
+                self.misses += 1
+                return None
+            spills, expired = self._plan_sweep_locked()
+        self._finish_sweep(spills, stale + expired)
+        return result
+
+    def sweep(self):
+        with self._lock:
+            plan = self._plan_sweep_locked()
+        self._finish_sweep(*plan)
+
+    def start_sweeper(self, interval_seconds: float = None):
+        """
+        Sweeps from a daemon thread every interval_seconds (by default a minute, or idle_seconds if
+        shorter). put() and get() sweep too, but without a timer idle results would stay in memory
+        until the next session shows up. Only the first call starts a thread.
+        """
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            interval_seconds = interval_seconds or min(60, self.idle_seconds)
+
+            def _loop():
+                while True:
+                    time.sleep(interval_seconds)
+                    try:
+                        self.sweep()
+                    except Exception as e:
+                        print(f"---Session result sweep failed: {e}---")
+
+            self._sweeper = threading.Thread(target=_loop, name="result-store-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def discard(self, result_id: str):
+        with self._lock:
+            stale = self._drop_locked(result_id)
+        self._remove_files(stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "resident_entries": len(self._resident),
+                "resident_bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "spilled_entries": len(self._spilled),
+                "spilled_bytes": self.disk_bytes,
+                "evictions": self.evictions,
+                "idle_spills": self.idle_spills,
+                "reloads": self.reloads,
+                "expired": self.expired,
+                "misses": self.misses,
+            }
+
+
+# One store per process, shared by every browser session
+result_store = ResultStore()
+registry.register_collector("session_results", result_store.stats)
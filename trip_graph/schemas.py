@@ -0,0 +1,58 @@
+# trip_graph/schemas.py
+# Response schemas handed to Gemini's structured-output mode, one per LLM node.
+# No field defaults: the Gemini API rejects schemas that declare them.
+from typing import List, Literal
+
+from pydantic import BaseModel
+
+
+class DayPlan(BaseModel):
+    day: int
+    Morning: str
+    Lunch: str
+    Afternoon: str
+    Evening: str
+
+
+class Itinerary(BaseModel):
+    days: List[DayPlan]
+
+    def to_display(self) -> dict:
+        """Converts to the {"Day N": {"Morning", "Lunch", "Afternoon", "Evening"}} shape the UI renders."""
+        return {
+            f"Day {plan.day}": plan.model_dump(exclude={"day"})
+            for plan in sorted(self.days, key=lambda plan: plan.day)
+        }
+
+
+class SkeletonDay(BaseModel):
+    day: int
+    area: str
+    theme: str
+
+
+class TripSkeleton(BaseModel):
+    """Where each day is spent, planned up front so day blocks can be generated independently."""
+    days: List[SkeletonDay]
+
+
+class TripSummary(BaseModel):
+    weather_tips: List[str]
+    flight: str
+    accomodation: str
+    activities: List[str]
+    dining: List[str]
+
+
+class WeatherDecision(BaseModel):
+    decision: Literal["favourable", "unfavourable"]
+    reason: str
+
+
+class AlternateSuggestion(BaseModel):
+    place: str
+    reason: str
+
+
+class AlternateSuggestions(BaseModel):
+    alternate_suggestions: List[AlternateSuggestion]
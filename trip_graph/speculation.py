@@ -0,0 +1,171 @@
+# trip_graph/speculation.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from modules.metrics import registry
+
+
+class SpeculationStats:
+    """Thread-safe counters for speculative runs of the favourable path."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0                   # speculative runs started
+        self.used = 0                   # runs whose results were handed to the graph
+        self.discarded = 0              # runs thrown away after an unfavourable decision
+        self.branches_cancelled = 0     # discarded branches that never started
+        self.branches_wasted = 0        # discarded branches that had already started or finished
+        self.wasted_seconds = 0.0       # branch time spent on work that was thrown away
+        self.latency_saved_seconds = 0.0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "used": self.used,
+                "discarded": self.discarded,
+                "branches_cancelled": self.branches_cancelled,
+                "branches_wasted": self.branches_wasted,
+                "wasted_seconds": round(self.wasted_seconds, 3),
+                "latency_saved_seconds": round(self.latency_saved_seconds, 3),
+            }
+
+
+speculation_stats = SpeculationStats()
+registry.register_collector("speculation", speculation_stats.snapshot)
+
+# Shared pool for speculative branches, sized for a handful of concurrent plans
+_executor = ThreadPoolExecutor(max_workers=12, thread_name_prefix="speculative")
+
+
+class BufferedListener:
+    """
+    Holds back a speculative branch's listener events (e.g. streamed itinerary days) until the
+    graph commits to the favourable path. release() replays them and passes later ones straight
+    through; drop() throws them away, so a discarded run never shows up in the UI.
+    """
+
+    def __init__(self, listener):
+        self.listener = listener
+        self._lock = threading.Lock()
+        self._events = []
+        self._state = "buffering"
+
+    def __call__(self, *args):
+        with self._lock:
+            if self._state == "buffering":
+                self._events.append(args)
+            elif self._state == "released":
+                self.listener(*args)
+
+    def release(self):
+        with self._lock:
+            if self._state != "buffering":
+                return
+            self._state = "released"
+            events, self._events = self._events, []
+            for args in events:
+                self.listener(*args)
+
+    def drop(self):
+        with self._lock:
+            self._state = "dropped"
+            self._events = []
+
+
+class SpeculativeRun:
+    """
+    Starts the favourable-path branches for one trip before the weather decision is known.
+
+    The graph claims each branch's result when it reaches that branch; if the decision comes
+    back unfavourable the run is discarded instead, cancelling whatever hasn't started yet.
+    Branches report to listener (a BufferedListener), which is only released on a claim.
+    """
+
+    def __init__(self, state: dict, branches: dict, listener: BufferedListener = None):
+        self.started_at = time.perf_counter()
+        self.durations = {}
+        self.waits = {}
+        self.listener = listener
+        self._lock = threading.Lock()
+        self._finished = False
+        self.futures = {
+            name: _executor.submit(copy_context().run, self._run, name, fn, dict(state))
+            for name, fn in branches.items()
+        }
+        speculation_stats.add(runs=1)
+
+    def _run(self, name, fn, state):
+        started = time.perf_counter()
+        try:
+            return fn(state)
+        finally:
+            self.durations[name] = time.perf_counter() - started
+
+    def has(self, name: str) -> bool:
+        return name in self.futures
+
+    def claim(self, name: str):
+        """Blocks until the speculative branch is done and returns its state update."""
+        self._release_listener()
+        waited_from = time.perf_counter()
+        result = self.futures[name].result()
+        self.waits[name] = time.perf_counter() - waited_from
+        return result
+
+    async def aclaim(self, name: str):
+        """Async counterpart of claim that waits without blocking the event loop."""
+        self._release_listener()
+        waited_from = time.perf_counter()
+        result = await asyncio.wrap_future(self.futures[name])
+        self.waits[name] = time.perf_counter() - waited_from
+        return result
+
+    def _release_listener(self):
+        # The graph only reaches a branch on the favourable path, so its events can be shown now
+        if self.listener is not None:
+            self.listener.release()
+
+    def finish(self):
+        """Records how much wall-clock time the speculation saved once the graph is done."""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        if not self.durations:
+            return
+        # The branches ran side by side, so without speculation the graph would have paid for
+        # the slowest one; with it, it only paid for the longest wait at a claim.
+        saved = max(self.durations.values()) - max(self.waits.values(), default=0.0)
+        speculation_stats.add(used=1, latency_saved_seconds=max(saved, 0.0))
+
+    def discard(self):
+        """Cancels branches that haven't started and counts the rest as wasted work."""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        if self.listener is not None:
+            self.listener.drop()
+        cancelled = 0
+        for name, future in self.futures.items():
+            if future.cancel():
+                cancelled += 1
+                continue
+            future.add_done_callback(lambda _f, name=name: speculation_stats.add(
+                wasted_seconds=self.durations.get(name, 0.0)
+            ))
+        speculation_stats.add(
+            discarded=1,
+            branches_cancelled=cancelled,
+            branches_wasted=len(self.futures) - cancelled,
+        )
+        print(f"---Speculation discarded: {cancelled} cancelled, {len(self.futures) - cancelled} wasted---")